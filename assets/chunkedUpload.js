@@ -0,0 +1,161 @@
+/*
+Rinkmenų įkėlimas dalimis į serverį per `upload` maršrutą (žr. main.py).
+
+Vietoj dcc.Upload, kuris visą rinkmeną siunčia kaip vieną base64 eilutę Dash užklausoje, rinkmena siunčiama
+nedidelėmis dalimis ir serveryje iš karto rašoma į diską. Įkėlimo identifikatorių sugeneruoja serveris; naršyklės
+kortelė jį įsimena (sessionStorage), tad nutrūkus ryšiui ar perkrovus puslapį įkėlimas tęsiamas nuo tos vietos,
+kurią nurodo serveris. Baigus įkelti, nustatoma dcc.Store reikšmė {"files": [{"upload_id", "filename"}], "timestamp"}.
+
+Python Dash programoje naudokite grapher_lib.gui_components.upload_data(), kuris sukuria html.Div su
+klase "chunked-upload" ir atributu "data-store-id".
+*/
+/*
+(c) 2025 Mindaugas B.
+This code is distributed under the MIT License. For more details, see the LICENSE file in the project root.
+
+*/
+
+(function() {
+    const CHUNK_SIZE = 4 * 1024 * 1024;  // 4 MiB - mažiau už įprastus tarpinių serverių užklausų dydžio ribojimus
+    const MAX_RETRIES = 5;
+    const UPLOAD_URL = 'upload';  // santykinis adresas, kad veiktų ir su "/pdsa_grapher/" priešdėliu
+
+    function uploadKey(file) {
+        // Tas pats failas (vardas, dydis, keitimo laikas) toje pačioje kortelėje tęsia tą patį įkėlimą
+        return `pdsa-grapher-upload|${file.name}|${file.size}|${file.lastModified}`;
+    }
+
+    async function readResponse(response) {
+        const data = await response.json().catch(() => ({}));
+        if (response.status === 413) {
+            const error = new Error(data.error || `HTTP ${response.status}`);
+            error.fatal = true;  // kartoti neverta
+            throw error;
+        }
+        if (!response.ok && response.status !== 409) {
+            throw new Error(data.error || `HTTP ${response.status}`);
+        }
+        return data;
+    }
+
+    async function startUpload(file) {
+        const response = await fetch(`${UPLOAD_URL}?size=${file.size}`, {method: 'POST'});
+        return (await readResponse(response)).upload_id;
+    }
+
+    function sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    async function getServerOffset(id) {
+        const response = await fetch(`${UPLOAD_URL}?upload_id=${encodeURIComponent(id)}`);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        return (await response.json()).offset;
+    }
+
+    async function postChunk(id, offset, chunk) {
+        const response = await fetch(
+            `${UPLOAD_URL}?upload_id=${encodeURIComponent(id)}&offset=${offset}`,
+            {method: 'POST', body: chunk, headers: {'Content-Type': 'application/octet-stream'}}
+        );
+        // Esant 409, serveris turi kitą kiekį - tęsti nuo jo nurodytos vietos; "busy" - ankstesnė užklausa dar rašo
+        return readResponse(response);
+    }
+
+    async function uploadFile(file, onProgress) {
+        const key = uploadKey(file);
+        let id = sessionStorage.getItem(key);
+        let offset = id ? await getServerOffset(id).catch(() => null) : null;
+        if (offset === null || offset > file.size) {
+            // serveryje tokio įkėlimo nebėra (pvz., išvalytas podėlis) - pradėti iš naujo
+            id = await startUpload(file);
+            offset = 0;
+            sessionStorage.setItem(key, id);
+        }
+        let retries = 0;
+        onProgress(offset);
+        while (offset < file.size) {
+            try {
+                const data = await postChunk(id, offset, file.slice(offset, offset + CHUNK_SIZE));
+                if (data.busy) {
+                    // pakartotinė dalis, kol pirmoji dar siunčiama - palaukti, kol ji baigs, ir tęsti nuo jos pabaigos
+                    await sleep(1000);
+                    offset = await getServerOffset(id).catch(() => offset);
+                    continue;
+                }
+                offset = data.offset;
+                retries = 0;
+                onProgress(offset);
+            } catch (error) {
+                retries += 1;
+                if (error.fatal || retries > MAX_RETRIES) {
+                    throw error;
+                }
+                await sleep(1000 * retries);
+                offset = await getServerOffset(id).catch(() => offset);
+            }
+        }
+        return {upload_id: id, filename: file.name};
+    }
+
+    async function uploadFiles(container, fileList) {
+        const storeId = container.dataset.storeId;
+        const progressDiv = container.querySelector('.chunked-upload-progress');
+        const files = Array.from(fileList || []);
+        if (!storeId || !files.length) {
+            return;
+        }
+        const totalSize = files.reduce((sum, file) => sum + file.size, 0) || 1;
+        let doneSize = 0;
+        const uploaded = [];
+        try {
+            for (const file of files) {
+                const info = await uploadFile(file, (offset) => {
+                    if (progressDiv) {
+                        progressDiv.textContent = `${Math.floor(100 * (doneSize + offset) / totalSize)}%`;
+                    }
+                });
+                doneSize += file.size;
+                uploaded.push(info);
+            }
+            if (progressDiv) {
+                progressDiv.textContent = '';
+            }
+            dash_clientside.set_props(storeId, {data: {files: uploaded, timestamp: Date.now()}});
+        } catch (error) {
+            if (progressDiv) {
+                progressDiv.textContent = `⚠ ${error}`;
+            }
+        }
+    }
+
+    // Įvykiai deleguojami per document, nes Dash perkuria išdėstymą (pvz., pakeitus kalbą)
+    document.addEventListener('click', function(event) {
+        const container = event.target.closest && event.target.closest('.chunked-upload');
+        if (!container) {
+            return;
+        }
+        const input = document.createElement('input');
+        input.type = 'file';
+        input.multiple = true;
+        input.addEventListener('change', () => uploadFiles(container, input.files));
+        input.click();
+    });
+
+    document.addEventListener('dragover', function(event) {
+        if (event.target.closest && event.target.closest('.chunked-upload')) {
+            event.preventDefault();  // leisti numesti rinkmeną
+        }
+    });
+
+    document.addEventListener('drop', function(event) {
+        const container = event.target.closest && event.target.closest('.chunked-upload');
+        if (!container) {
+            return;
+        }
+        event.preventDefault();
+        uploadFiles(container, event.dataTransfer.files);
+    });
+})();
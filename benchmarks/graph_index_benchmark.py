@@ -0,0 +1,87 @@
+"""
+Kaimynų ir ryšių paieškos palyginimas: kiek trunka atrinkti pasirinktų lentelių ryšius filtruojant visą ryšių lentelę
+ir kiek – per ryšių grafo indeksą (žr. `grapher_lib.utils_graph`); taip pat kiek trunka rasti tarpines lenteles,
+sujungiančias pasirinktas lenteles.
+Paleidimas iš projekto katalogo:
+python benchmarks/graph_index_benchmark.py [lentelių skaičius] [ryšių skaičius]
+"""
+"""
+(c) 2025 Mindaugas B.
+
+This code is distributed under the MIT License. For more details, see the LICENSE file in the project root.
+"""
+
+import os
+import sys
+import random
+import time
+import polars as pl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from grapher_lib import utils_graph as ug  # noqa: E402
+
+
+def get_sample_edges(n_tables, n_edges, seed=0):
+    """
+    Atsitiktiniai ryšiai tarp lentelių.
+    :param n_tables: lentelių skaičius
+    :param n_edges: ryšių skaičius
+    :param seed: atsitiktinių skaičių generatoriaus sėkla
+    :return: (ryšių pl.DataFrame, lentelių sąrašas)
+    """
+    rng = random.Random(seed)
+    tables = [f"Table{i}" for i in range(n_tables)]
+    df_edges = pl.DataFrame({
+        "source_tbl": [rng.choice(tables) for _i in range(n_edges)],
+        "source_col": [f"column_{i}" for i in range(n_edges)],
+        "target_tbl": [rng.choice(tables) for _i in range(n_edges)],
+        "target_col": ["id"] * n_edges,
+    })
+    return df_edges, tables
+
+
+def measure(func, repeat=20):
+    """
+    Geriausias f-jos vykdymo laikas sekundėmis.
+    :param func: f-ja be argumentų
+    :param repeat: pakartojimų skaičius
+    :return: laikas
+    """
+    best = None
+    for _i in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(n_tables=40_000, n_edges=200_000):
+    df_edges, tables = get_sample_edges(n_tables, n_edges)
+    selected = random.Random(1).sample(tables, 20)
+    print(f"Tables: {n_tables}, references: {n_edges}, selected tables: {len(selected)}")
+    time_build = measure(lambda: ug.build_graph_index(df_edges), repeat=3)
+    print(f"{'build index (once)':>28}: {time_build * 1000:.1f} ms")
+    index = ug.build_graph_index(df_edges)
+
+    def filter_incident():
+        return df_edges.filter(pl.col("source_tbl").is_in(selected) | pl.col("target_tbl").is_in(selected))
+
+    def filter_induced():
+        return df_edges.filter(pl.col("source_tbl").is_in(selected) & pl.col("target_tbl").is_in(selected))
+
+    cases = {
+        "incident, filter": filter_incident,
+        "incident, index": lambda: df_edges[ug.get_incident_edge_rows(index, selected)],
+        "induced, filter": filter_induced,
+        "induced, index": lambda: df_edges[ug.get_induced_edge_rows(index, selected)],
+        "connect 2 tables": lambda: ug.get_connecting_tables(index, selected[:2]),
+        "connect 5 tables": lambda: ug.get_connecting_tables(index, selected[:5]),
+        "connect 20 tables": lambda: ug.get_connecting_tables(index, selected),
+    }
+    for name, func in cases.items():
+        print(f"{name:>28}: {measure(func) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
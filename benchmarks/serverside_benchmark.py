@@ -0,0 +1,77 @@
+"""
+Serverside podėlių palyginimas: kiek trunka gauti pateiktų duomenų žodyną ir panaudoti vieną jo lentelę, kai
+viskas įrašyta viena pickle rinkmena (FileSystemBackend) ir kai lentelės įrašytos Arrow IPC (ArrowFileSystemBackend).
+Paleidimas iš projekto katalogo:
+python benchmarks/serverside_benchmark.py [eilučių skaičius]
+"""
+"""
+(c) 2025 Mindaugas B.
+
+This code is distributed under the MIT License. For more details, see the LICENSE file in the project root.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import polars as pl
+from dash_extensions.enrich import FileSystemBackend
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from grapher_lib.utils_serverside import ArrowFileSystemBackend  # noqa: E402
+
+
+def get_sample_data(n_rows):
+    """
+    Pateiktų duomenų struktūrą primenantis žodynas su keliomis lentelėmis.
+    :param n_rows: eilučių skaičius kiekvienoje lentelėje
+    :return: žodynas
+    """
+    df = pl.DataFrame({
+        "table": [f"Table{i % 1000}" for i in range(n_rows)],
+        "column": [f"column_{i}" for i in range(n_rows)],
+        "comment": [f"Comment about column {i}" for i in range(n_rows)],
+    })
+    return {
+        "node_data": {"tbl_sheet_data": df, "col_sheet_data": df, "col_sheet_data_orig": df, "sheet_tbl": "tables"},
+        "edge_data": {"ref_sheet_data": df.rename({"table": "source_tbl", "column": "source_col"})},
+    }
+
+
+def measure(func, repeat=5):
+    """
+    Geriausias f-jos vykdymo laikas sekundėmis.
+    :param func: f-ja be argumentų
+    :param repeat: pakartojimų skaičius
+    :return: laikas
+    """
+    best = None
+    for _i in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(n_rows=500_000):
+    data = get_sample_data(n_rows)
+    print(f"Rows per frame: {n_rows}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        backends = {
+            "FileSystemBackend": FileSystemBackend(cache_dir=os.path.join(tmp_dir, "pickle")),
+            "ArrowFileSystemBackend": ArrowFileSystemBackend(os.path.join(tmp_dir, "arrow")),
+        }
+        for name, backend in backends.items():
+            time_set = measure(lambda: backend.set("key", data), repeat=1)
+
+            def get_and_filter():
+                value = backend.get("key", ignore_expired=True)
+                return value["node_data"]["tbl_sheet_data"].filter(pl.col("table") == "Table1").height
+
+            time_get = measure(get_and_filter)
+            print(f"{name:>22}: set {time_set:.3f} s, get + filter one frame {time_get * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
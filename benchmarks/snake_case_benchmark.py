@@ -0,0 +1,71 @@
+"""
+snake_case() ir snake_case_short() spartos palyginimas: kiekvienai eilutei kviečiama Python f-ja (map_elements)
+ir tos pačios taisyklės polars išraiškomis (snake_case_expr, snake_case_short_expr).
+Paleidimas iš projekto katalogo:
+python benchmarks/snake_case_benchmark.py [eilučių skaičius]
+"""
+"""
+(c) 2025 Mindaugas B.
+
+This code is distributed under the MIT License. For more details, see the LICENSE file in the project root.
+"""
+
+import os
+import sys
+import time
+import random
+import polars as pl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from grapher_lib import utils as gu  # noqa: E402
+
+
+SAMPLE_WORDS = [
+    "Kliento", "identifikatorius", "Užsakymo", "numeris", "Prekių", "skaičius", "Data", "(pastaba)", "[id]",
+    "ŽodžioPradžia", "XMLHttpRequest", "camelCase", "snake_case", "su-brūkšniu", "su.tašku", "Čiuožėjas", "ĄČĘĖĮŠŲŪŽ",
+]
+
+
+def get_sample_df(n_rows, seed=0):
+    """
+    Atsitiktinių stulpelių vardų lentelė.
+    :param n_rows: eilučių skaičius
+    :param seed: atsitiktinių skaičių generatoriaus pradžia
+    :return: polars DataFrame su stulpeliu "name"
+    """
+    rng = random.Random(seed)
+    names = [" ".join(rng.choices(SAMPLE_WORDS, k=rng.randint(1, 4))) for _ in range(n_rows)]
+    return pl.DataFrame({"name": names})
+
+
+def measure(func, repeat=3):
+    """
+    Geriausias f-jos vykdymo laikas sekundėmis ir jos rezultatas.
+    :param func: f-ja be argumentų
+    :param repeat: pakartojimų skaičius
+    :return: (laikas, rezultatas)
+    """
+    best = None
+    result = None
+    for _i in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(n_rows=900_000):
+    df = get_sample_df(n_rows)
+    print(f"Rows: {df.height}")
+    for py_func, expr_func in [(gu.snake_case, gu.snake_case_expr), (gu.snake_case_short, gu.snake_case_short_expr)]:
+        time_py, res_py = measure(lambda: df.select(pl.col("name").map_elements(py_func, return_dtype=pl.String)))
+        time_expr, res_expr = measure(lambda: df.select(expr_func(pl.col("name"))))
+        print(
+            f"{py_func.__name__:>16}: map_elements {time_py:.3f} s, expressions {time_expr:.3f} s, "
+            f"x{time_py / time_expr:.1f}, identical: {res_py.equals(res_expr)}"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 900_000)
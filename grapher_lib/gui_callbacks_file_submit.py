@@ -10,54 +10,72 @@ This code is distributed under the MIT License. For more details, see the LICENS
 
 import os
 import re
+import warnings
+import diskcache
 import polars as pl
 from dash_extensions.enrich import (
-    Output, Input, State, Serverside, callback, callback_context, html
+    Output, Input, State, Serverside, callback, html
 )
 from grapher_lib import utils as gu
 from grapher_lib import utils_file_upload as fu
-from locale_utils.translations import pgettext
+from grapher_lib import utils_graph as ug
+from locale_utils.translations import pgettext, get_gettext_locale
 
 
 @callback(
     Output("memory-submitted-data", "data"),  # žodynas su PDSA ("node_data") ir ryšių ("edge_data") duomenimis
-    Output("button-submit", "color"),  # pateikimo mygtuko spalva
-    Output("submit-error-message", "children"),  # pateikimo klaidos paaiškinimas
-    Output("submit-warning-message", "children"),  # pateikimo įspėjimo paaiškinimas
+    Output("button-submit", "color", allow_duplicate=True),  # pateikimo mygtuko spalva
+    Output("submit-error-message", "children", allow_duplicate=True),  # pateikimo klaidos paaiškinimas
+    Output("submit-warning-message", "children", allow_duplicate=True),  # pateikimo įspėjimo paaiškinimas
     Output("tabs-container", "active_tab"),  # aktyvios kortelės identifikatorius (perjungimui, jei reikia)
     Output("memory-name", "data"),  # vardas, naudojamas eksportuojant duomenis
     State("memory-uploaded-pdsa", "data"),  # žodynas su PDSA duomenimis, papildytas
     State("memory-uploaded-refs", "data"),  # žodynas su ryšių tarp lentelių duomenimis
-    Input("radio-sheet-tbl", "value"),  # Naudotojo pasirinktas PDSA lentelių lakštas
-    Input("pdsa-tables-table", "value"),
-    Input("pdsa-tables-comment", "value"),
-    Input("pdsa-tables-records", "value"),
-    Input("pdsa-tables-selected", "value"),
-    Input("dropdown-sheet-tbl", "value"),
-    Input("radio-sheet-col", "value"),  # Naudotojo pasirinktas PDSA stulpelių lakštas
-    Input("pdsa-columns-table", "value"),
-    Input("pdsa-columns-column", "value"),
-    Input("pdsa-columns-primary", "value"),
-    Input("pdsa-columns-checkbox", "value"),
-    Input("pdsa-columns-comment", "value"),
-    Input("pdsa-columns-alias", "value"),
-    Input("dropdown-sheet-col", "value"),
-    Input("radio-sheet-refs", "value"),  # Pasirinktas ryšių lakštas
-    Input("ref-source-tables", "value"),
-    Input("ref-source-columns", "value"),
-    Input("ref-target-tables", "value"),
-    Input("ref-target-columns", "value"),
-    State("tabs-container", "active_tab"),
+    State("radio-sheet-tbl", "value"),  # Naudotojo pasirinktas PDSA lentelių lakštas
+    State("pdsa-tables-table", "value"),
+    State("pdsa-tables-comment", "value"),
+    State("pdsa-tables-records", "value"),
+    State("pdsa-tables-selected", "value"),
+    State("dropdown-sheet-tbl", "value"),
+    State("radio-sheet-col", "value"),  # Naudotojo pasirinktas PDSA stulpelių lakštas
+    State("pdsa-columns-table", "value"),
+    State("pdsa-columns-column", "value"),
+    State("pdsa-columns-primary", "value"),
+    State("pdsa-columns-checkbox", "value"),
+    State("pdsa-columns-comment", "value"),
+    State("pdsa-columns-alias", "value"),
+    State("dropdown-sheet-col", "value"),
+    State("radio-sheet-refs", "value"),  # Pasirinktas ryšių lakštas
+    State("ref-source-tables", "value"),
+    State("ref-source-columns", "value"),
+    State("ref-target-tables", "value"),
+    State("ref-target-columns", "value"),
     Input("button-submit", "n_clicks"),  # tik kaip f-jos paleidiklis paspaudžiant Pateikti
+    # Vykdyti fone, kad ilgas pateikimas neužimtų serverio gijos, ir rodyti pateikimo eigą pagal etapus
+    background=True,
+    interval=500,
+    progress=[
+        Output("progress-bar", "value"),
+        Output("progress-bar-label", "children"),
+    ],
     running=[
         (Output("button-submit", "disabled"), True, False),
         (Output("progress-bar", "style"),
             {"visibility": "visible"},
             {"visibility": "hidden"},
          ),
+        (Output("progress-bar", "value"), 0, 100),
+        (Output("progress-bar-label", "children"), "", ""),
     ],
+    # Įkėlus naują rinkmeną, dar vykdomas pateikimas nebeaktualus – jį nutraukti
+    cancel=[
+        Input("upload-data-pdsa", "data"),
+        Input("upload-data-refs", "data"),
+    ],
+    prevent_initial_call=True,
 )
 def summarize_submission(
+    set_progress,
     pdsa_file_data, refs_file_data,
     pdsa_tbl_sheet,
     pdsa_tbl_table, pdsa_tbl_comment, pdsa_tbl_records, pdsa_tbl_selected,
@@ -68,11 +86,12 @@ def summarize_submission(
     refs_sheet,
     ref_source_tbl, ref_source_col,
     ref_target_tbl, ref_target_col,
-    active_tab,
     submit_clicks,  # noqa
 ):
     """
     Suformuoti visuminę naudingų duomenų struktūrą, jei turime visus reikalingus PDSA ir ryšių duomenis.
+    Vykdoma tik paspaudus „Pateikti“; keičiant parinkimus juos greitai patikrina `validate_submission`.
+    :param set_progress: foninio kvietimo eigos f-ja, žr. `gu.get_progress_reporter`
     :param pdsa_file_data: žodynas su PDSA duomenimis:
         "file_data" - žodynas su visu PDSA turiniu;
         "sheet_tbl" - PDSA lakšto, aprašančio lenteles, pavadinimas
@@ -102,16 +121,15 @@ def summarize_submission(
     :param ref_target_tbl: vardas stulpelio, kuriame surašytos ryšio galų („Į“) lentelės (su pirminiu raktu)
     :param ref_target_col: vardas stulpelio, kuriame surašyti ryšio galų („Į“) stulpeliai (su pirminiu raktu)
     :param submit_clicks: mygtuko „Pateikti“ paspaudimų skaičius, bet pati reikšmė nenaudojama
-    :param active_tab: aktyvi kortelė "file_upload" arba "graph"
     :return: visų pagrindinių duomenų struktūra, pateikimo mygtuko spalva, paaiškinimai naudotojui, aktyvi kortelė.
 
     visų naudingų duomenų struktūros pavyzdys:
         data_final = {
             "node_data": {  # Mazgų duomenys iš PDSA
-                "tbl_sheet_data_orig": [],  # PDSA lakšto, aprašančio lenteles, turinys su originaliais stulpeliais
-                "col_sheet_data_orig": [],  # PDSA lakšto, aprašančio stulpelius, turinys su originaliais stulpeliais
-                "tbl_sheet_data": [],  # PDSA lakšto, aprašančio lenteles, turinys su pervadintais stulpeliais
-                "col_sheet_data": [],  # PDSA lakšto, aprašančio stulpelius, turinys su pervadintais stulpeliais
+                "tbl_sheet_data_orig": pl.DataFrame(),  # PDSA lakšto, aprašančio lenteles, turinys su originaliais stulpeliais
+                "col_sheet_data_orig": pl.DataFrame(),  # PDSA lakšto, aprašančio stulpelius, turinys su originaliais stulpeliais
+                "tbl_sheet_data": pl.DataFrame(),  # PDSA lakšto, aprašančio lenteles, turinys su pervadintais stulpeliais
+                "col_sheet_data": pl.DataFrame(),  # PDSA lakšto, aprašančio stulpelius, turinys su pervadintais stulpeliais
                 "tbl_sheet_renamed_cols": {},  # PDSA lakšte, aprašančiame lenteles, stulpelių vidiniai pervadinimai
                 "col_sheet_renamed_cols": {},  # PDSA lakšte, aprašančiame stulpelius, stulpelių vidiniai pervadinimai
                 "sheet_tbl": "",  # PDSA lakšto, aprašančio lenteles, pavadinimas
@@ -122,7 +140,10 @@ def summarize_submission(
                 "list_all_tables": [],  # visos lentelės iš duombazės lentelių ir stulpelių lakštų aprašų
             },
             "edge_data":{  # Ryšiai
-                "ref_sheet_data": [],  # Ryšių lakšto turinys
+                "ref_sheet_data": pl.DataFrame(),  # Ryšių lakšto turinys
+                "graph_nodes": pl.DataFrame(),  # ryšių grafo indekso mazgai (žr. `utils_graph.build_graph_index`)
+                "graph_out": pl.DataFrame(),  # ryšių grafo indekso išeinantys ryšiai
+                "graph_in": pl.DataFrame(),  # ryšių grafo indekso įeinantys ryšiai
                 "ref_sheet_name": "",  # Ryšių lakšto vardas
                 "ref_source_tbl":"",  # vardas stulpelio, kuriame surašytos ryšio pradžių („IŠ“) lentelės (su išoriniu raktu)
                 "ref_source_col": "",  # vardas stulpelio, kuriame surašyti ryšio pradžių („IŠ“) stulpeliai (su išoriniu raktu)
@@ -135,85 +156,462 @@ def summarize_submission(
     # Bandyti išvalyti seną podėlį prieš įrašant naujus duomenis, ne tik prieš programos paleidimą
     gu.cleanup_old_cache()
 
+    # Įkelta darbo sesija, kurios lakštų ir stulpelių parinkimas nepakeistas – jos duomenų iš naujo neapdoroti
+    session = fu.get_session_info(pdsa_file_data)
+    refs_session = fu.get_session_info(refs_file_data)
+    if session and refs_session and (session["key"] == refs_session["key"]):
+        submitted_mapping = {
+            "sheet_tbl": pdsa_tbl_sheet,
+            "sheet_col": pdsa_col_sheet,
+            "ref_sheet_name": refs_sheet,
+            "tbl_sheet_renamed_cols": {
+                "table": pdsa_tbl_table,
+                "comment": pdsa_tbl_comment,
+                "n_records": pdsa_tbl_records,
+                "selected": pdsa_tbl_selected
+            },
+            "col_sheet_renamed_cols": {
+                "table": pdsa_col_table,
+                "column": pdsa_col_column,
+                "is_primary": pdsa_col_primary,
+                "comment": pdsa_col_comment,
+                "checkbox": pdsa_col_checkbox,
+                "alias": pdsa_col_alias
+            },
+            "ref_renamed_cols": {
+                "ref_source_tbl": ref_source_tbl,
+                "ref_source_col": ref_source_col,
+                "ref_target_tbl": ref_target_tbl,
+                "ref_target_col": ref_target_col
+            },
+        }
+        # Švieslentėje rodomi stulpeliai turi būti nepakeisti (numatytieji – visi lakšto stulpeliai)
+        info_columns_unchanged = (
+            set(dropdown_sheet_tbl or []) == set(fu.get_sheet_columns(pdsa_file_data, pdsa_tbl_sheet)) and
+            set(dropdown_sheet_col or []) == set(fu.get_sheet_columns(pdsa_file_data, pdsa_col_sheet))
+        )
+        if (submitted_mapping == session["mapping"]) and info_columns_unchanged:
+            # Ankstesne versija įrašytoje sesijoje gali nebūti ryšių grafo indekso ar jo rodiklių – papildyti čia,
+            # kad grafiko kortelės f-jos jų neskaičiuotų kiekvieno kvietimo metu
+            session["data"]["edge_data"].update(ug.get_graph_index(session["data"]["edge_data"]))
+            return Serverside(session["data"]), "primary", [], [], "graph", session["name"]
+
     # Tikrinimai
     err_msg = []  # Klaidų sąrašas, rodomas po „Pateikimo“ mygtuku raudonai
     wrn_msg = []  # Įspėjimų sąrašas, rodomas po „Pateikimo“ mygtuku rudai
-    if (not refs_file_data) and (not pdsa_file_data):
-        err_msg.append(html.P(_("Please select PDSA and/or references document!")))
+    required = validate_mapping_required(
+        pdsa_file_data, refs_file_data, pdsa_tbl_sheet, pdsa_col_sheet, refs_sheet, ref_source_tbl, ref_target_tbl
+    )
+    wrn_msg.extend(html.P(msg) for msg in required["warnings"])
+    if required["errors"]:
+        err_msg.extend(html.P(msg) for msg in required["errors"])
+        return Serverside({}), "secondary", err_msg, wrn_msg, "file_upload", ""
+
+    # %% Surinktą informaciją transformuoju ir paruošiu graferiui.
+    # Kiekvienas etapas įsimenamas pagal savo parinkimus, tad pakeitus vieną parinkimą perskaičiuojamas tik tas etapas
+    pdsa_data_id = pdsa_file_data.get("data_id") if isinstance(pdsa_file_data, dict) else None
+    refs_data_id = refs_file_data.get("data_id") if isinstance(refs_file_data, dict) else None
+
+    progress = gu.get_progress_reporter(set_progress)
+
+    # PDSA lakšto (pdsa_tbl_sheet), aprašančio LENTELES, turinys
+    progress_text = _("Processing PDSA sheet describing %s") % pgettext("PDSA sheet describing...", "tables")
+    progress(0, SUBMISSION_STAGES, progress_text)
+    tbl_stage_key = (
+        pdsa_data_id, pdsa_tbl_sheet, pdsa_tbl_table, pdsa_tbl_comment, pdsa_tbl_records, pdsa_tbl_selected,
+        tuple(dropdown_sheet_tbl or [])
+    )
+    tbl_stage = get_cached_stage(
+        "tables", tbl_stage_key if pdsa_data_id else None,
+        lambda: prepare_tables_sheet(
+            pdsa_file_data, pdsa_tbl_sheet,
+            pdsa_tbl_table, pdsa_tbl_comment, pdsa_tbl_records, pdsa_tbl_selected,
+            dropdown_sheet_tbl
+        )
+    )
+    wrn_msg.extend(html.P(msg) for msg in tbl_stage["warnings"])
+    if tbl_stage["errors"]:
+        err_msg.extend(html.P(msg) for msg in tbl_stage["errors"])
+        return Serverside({}), "secondary", err_msg, wrn_msg, "file_upload", ""
+
+    progress(1, SUBMISSION_STAGES, _("%s (%d rows)") % (progress_text, tbl_stage["df_tbl"].height))
+
+    # PDSA lakšto (pdsa_col_sheet), aprašančio STULPELIUS, turinys
+    progress_text = _("Processing PDSA sheet describing %s") % pgettext("PDSA sheet describing...", "columns")
+    progress(1, SUBMISSION_STAGES, progress_text)
+    col_stage_key = (
+        pdsa_data_id, pdsa_col_sheet, pdsa_col_table, pdsa_col_column, pdsa_col_primary, pdsa_col_checkbox,
+        pdsa_col_comment, pdsa_col_alias, tuple(dropdown_sheet_col or [])
+    )
+    col_stage = get_cached_stage(
+        "columns", col_stage_key if pdsa_data_id else None,
+        lambda: prepare_columns_sheet(
+            pdsa_file_data, pdsa_col_sheet,
+            pdsa_col_table, pdsa_col_column, pdsa_col_primary, pdsa_col_checkbox, pdsa_col_comment, pdsa_col_alias,
+            dropdown_sheet_col
+        )
+    )
+    wrn_msg.extend(html.P(msg) for msg in col_stage["warnings"])
+    if col_stage["errors"]:
+        err_msg.extend(html.P(msg) for msg in col_stage["errors"])
+        return Serverside({}), "secondary", err_msg, wrn_msg, "file_upload", ""
+
+    progress(2, SUBMISSION_STAGES, _("%s (%d rows)") % (progress_text, col_stage["df_col"].height))
+
+    # RYŠIAI
+    progress_text = _("Processing references")
+    progress(2, SUBMISSION_STAGES, progress_text)
+    refs_stage_key = (refs_data_id, refs_sheet, ref_source_tbl, ref_source_col, ref_target_tbl, ref_target_col)
+    refs_stage = get_cached_stage(
+        "refs", refs_stage_key if refs_data_id else None,
+        lambda: prepare_refs_sheet(
+            refs_file_data, refs_sheet, ref_source_tbl, ref_source_col, ref_target_tbl, ref_target_col
+        )
+    )
+    wrn_msg.extend(html.P(msg) for msg in refs_stage["warnings"])
+    if refs_stage["errors"]:
+        err_msg.extend(html.P(msg) for msg in refs_stage["errors"])
         return Serverside({}), "secondary", err_msg, wrn_msg, "file_upload", ""
+
+    progress(3, SUBMISSION_STAGES, _("%s (%d rows)") % (progress_text, refs_stage["df_edges"].height))
+
+    # Sutikrinimai tarp lentelių, stulpelių ir ryšių lakštų
+    progress(3, SUBMISSION_STAGES, _("Cross-checking sheets"))
+    cross_stage_key = (tbl_stage_key, col_stage_key, refs_stage_key)
+    cross_stage = get_cached_stage(
+        "cross", cross_stage_key if (pdsa_data_id or refs_data_id) else None,
+        lambda: cross_check_sheets(
+            tbl_stage, col_stage, refs_stage, pdsa_tbl_sheet, pdsa_tbl_table, pdsa_col_sheet, pdsa_col_table
+        )
+    )
+    wrn_msg.extend(html.P(msg) for msg in cross_stage["warnings"])
+    progress(4, SUBMISSION_STAGES, _("Cross-checking sheets"))
+    pdsa_all_tables = cross_stage["list_all_tables"]
+    edge_tables = refs_stage["list_all_tables"]
+
+    if (not edge_tables) and (not pdsa_all_tables):
+        # Dokumentai įkelti, bet tušti
+        err_msg.append(html.P(_("Your selected document sheet has no required data.")))
+        return Serverside({}), "secondary", err_msg, wrn_msg, "file_upload", ""
+
+    # %% VISĄ SURINKTĄ INFORMACIJĄ SUKELIU Į VIENĄ STRUKTŪRĄ
+    data_final = {
+        # Mazgų duomenys iš PDSA
+        "node_data": {
+            "file_name": pdsa_file_data["file_name"] if pdsa_file_data and ("file_name" in pdsa_file_data) else "",
+            "tbl_sheet_data_orig": tbl_stage["df_tbl_orig"],  # PDSA lakšto, aprašančio lenteles, originalus turinys
+            "col_sheet_data_orig": col_stage["df_col_orig"],  # PDSA lakšto, aprašančio stulpelius, originalus turinys
+            "tbl_sheet_data": tbl_stage["df_tbl"],  # PDSA lakšto, aprašančio lenteles, turinys pervadinus stulpelius
+            "col_sheet_data": col_stage["df_col"],  # PDSA lakšto, aprašančio stulpelius, turinys pervadinus stulpelius
+            "tbl_sheet_renamed_cols": dict(tbl_stage["renamed_cols"]),  # PDSA lakšte, aprašančiame lenteles, stulpelių vidiniai pervadinimai
+            "col_sheet_renamed_cols": dict(col_stage["renamed_cols"]),  # PDSA lakšte, aprašančiame stulpelius, stulpelių vidiniai pervadinimai
+            "sheet_tbl": pdsa_tbl_sheet,  # PDSA lakšto, aprašančio lenteles, vardas
+            "sheet_col": pdsa_col_sheet,  # PDSA lakšto, aprašančio stulpelius, vardas
+            "list_tbl_tables": list(tbl_stage["list_tables"]),  # tikros lentelės iš PDSA lakšto, aprašančio lenteles
+            "list_tbl_tables_empty": list(tbl_stage["list_tables_empty"]),  # tuščios lentelės iš PDSA lakšto, aprašančio lenteles
+            "list_col_tables": list(col_stage["list_tables"] or []),  # lentelės iš PDSA lakšto, aprašančio stulpelius, gali būti papildyta rodiniais (views)
+            "list_all_tables": list(pdsa_all_tables),  # visos iš PDSA kartu
+        },
+        # Ryšių duomenys
+        "edge_data": {
+            "file_name": refs_file_data["file_name"] if refs_file_data and ("file_name" in refs_file_data) else "",
+            "ref_sheet_data": refs_stage["df_edges"],  # Ryšių lakšto turinys
+            # Ryšių grafo indeksas greitai kaimynų ir ryšių paieškai (žr. `utils_graph.build_graph_index`)
+            **{key: refs_stage[key] for key in ug.GRAPH_INDEX_KEYS},
+            "ref_sheet_name": refs_sheet,      # ryšių lakšto vardas
+            "ref_source_tbl": ref_source_tbl,  # stulpelis, kuriame pradžių („IŠ“) lentelės
+            "ref_source_col": ref_source_col,  # stulpelis, kuriame pradžių („IŠ“) stulpeliai
+            "ref_target_tbl": ref_target_tbl,  # stulpelis, kuriame galų („Į“) lentelės
+            "ref_target_col": ref_target_col,  # stulpelis, kuriame galų („Į“) stulpeliai
+            "list_all_tables": list(edge_tables),  # lentelės, kurios panaudotos ryšiuose
+        }
+    }
+
+    # Vardas naršyklės lango antraštei ir dokumentų saugojimui
+    if data_final["node_data"]["file_name"]:
+        doc_name = data_final["node_data"]["file_name"]
+    else:
+        doc_name = data_final["edge_data"]["file_name"]
+    doc_name = str(doc_name).split(";")[0]  # jei buvo keli dokumentai, jie bus atskirti per kabliataškį; imti tik pirmą
+    doc_name, ext = os.path.splitext(doc_name)
+
+    # Perduoti duomenis naudojimui grafiko kortelėje ir į ją pereiti
+    return Serverside(data_final), "primary", err_msg, wrn_msg, "graph", doc_name
+
+
+@callback(
+    Output("button-submit", "color"),  # pateikimo mygtuko spalva
+    Output("submit-error-message", "children"),  # pateikimo klaidos paaiškinimas
+    Output("submit-warning-message", "children"),  # pateikimo įspėjimo paaiškinimas
+    State("memory-uploaded-pdsa", "data"),  # žodynas su PDSA duomenimis, papildytas
+    State("memory-uploaded-refs", "data"),  # žodynas su ryšių tarp lentelių duomenimis
+    Input("radio-sheet-tbl", "value"),  # Naudotojo pasirinktas PDSA lentelių lakštas
+    Input("pdsa-tables-table", "value"),
+    Input("pdsa-tables-records", "value"),
+    Input("radio-sheet-col", "value"),  # Naudotojo pasirinktas PDSA stulpelių lakštas
+    Input("pdsa-columns-table", "value"),
+    Input("pdsa-columns-column", "value"),
+    Input("radio-sheet-refs", "value"),  # Pasirinktas ryšių lakštas
+    Input("ref-source-tables", "value"),
+    Input("ref-source-columns", "value"),
+    Input("ref-target-tables", "value"),
+    Input("ref-target-columns", "value"),
+    Input("memory-loaded-pdsa-sheets", "data"),  # tik kaip f-jos paleidiklis fone nuskaičius PDSA lakštus
+    Input("memory-loaded-refs-sheets", "data"),  # tik kaip f-jos paleidiklis fone nuskaičius ryšių lakštus
+    running=[
+        (Output("button-submit", "disabled"), True, False),
+        (Output("progress-bar", "style"),
+            {"visibility": "visible"},
+            {"visibility": "hidden"},
+         ),
+    ],
+)
+def validate_submission(
+    pdsa_file_data, refs_file_data,
+    pdsa_tbl_sheet, pdsa_tbl_table, pdsa_tbl_records,
+    pdsa_col_sheet, pdsa_col_table, pdsa_col_column,
+    refs_sheet,
+    ref_source_tbl, ref_source_col,
+    ref_target_tbl, ref_target_col,
+    loaded_pdsa_sheets, loaded_refs_sheets,  # noqa
+):
+    """
+    Keičiant parinkimus greitai patikrinti, ar jų pakanka pateikimui (žr. `validate_mapping_required`) ir
+    ar tinkami parinktų stulpelių tipai (žr. `validate_mapping_preview`). Patys duomenys apdorojami tik paspaudus
+    „Pateikti“ (žr. `summarize_submission`).
+    :param pdsa_file_data: žodynas su PDSA duomenimis
+    :param refs_file_data: žodynas su ryšių tarp lentelių duomenimis
+    :param pdsa_tbl_sheet: PDSA lakšto, aprašančio lenteles, vardas
+    :param pdsa_tbl_table: PDSA lentelių lakšte stulpelis su lentelių vardais
+    :param pdsa_tbl_records: PDSA lentelių lakšte stulpelis su eilučių (įrašų) skaičiumi
+    :param pdsa_col_sheet: PDSA lakšto, aprašančio stulpelius, vardas
+    :param pdsa_col_table: PDSA stulpelių lakšte stulpelis su lentelių vardais
+    :param pdsa_col_column: PDSA stulpelių lakšte stulpelis su stulpelių vardais
+    :param refs_sheet: pasirinktas ryšių lakštas
+    :param ref_source_tbl: vardas stulpelio, kuriame surašytos ryšio pradžių („IŠ“) lentelės (su išoriniu raktu)
+    :param ref_source_col: vardas stulpelio, kuriame surašyti ryšio pradžių („IŠ“) stulpeliai (su išoriniu raktu)
+    :param ref_target_tbl: vardas stulpelio, kuriame surašytos ryšio galų („Į“) lentelės (su pirminiu raktu)
+    :param ref_target_col: vardas stulpelio, kuriame surašyti ryšio galų („Į“) stulpeliai (su pirminiu raktu)
+    :param loaded_pdsa_sheets: fone nuskaityti PDSA lakštai – tik kaip f-jos paleidiklis
+    :param loaded_refs_sheets: fone nuskaityti ryšių lakštai – tik kaip f-jos paleidiklis
+    :return: pateikimo mygtuko spalva, klaidų ir įspėjimų paaiškinimai naudotojui
+    """
+    required = validate_mapping_required(
+        pdsa_file_data, refs_file_data, pdsa_tbl_sheet, pdsa_col_sheet, refs_sheet, ref_source_tbl, ref_target_tbl
+    )
+    wrn_msg = [html.P(msg) for msg in required["warnings"]]
+    err_msg = [html.P(msg) for msg in required["errors"]]
+    if err_msg:
+        return "secondary", err_msg, wrn_msg
+    preview = validate_mapping_preview(
+        pdsa_file_data, refs_file_data,
+        pdsa_tbl_sheet, pdsa_tbl_table, pdsa_tbl_records,
+        pdsa_col_sheet, pdsa_col_table, pdsa_col_column,
+        refs_sheet, [ref_source_tbl, ref_source_col, ref_target_tbl, ref_target_col]
+    )
+    wrn_msg.extend(html.P(msg) for msg in preview["warnings"])
+    err_msg.extend(html.P(msg) for msg in preview["errors"])
+    return "secondary" if err_msg else "primary", err_msg, wrn_msg
+
+
+def validate_mapping_required(
+    pdsa_file_data, refs_file_data, pdsa_tbl_sheet, pdsa_col_sheet, refs_sheet, ref_source_tbl, ref_target_tbl
+):
+    """
+    Patikrinti, ar įkelti dokumentai ir parinkti lakštai bei stulpeliai, be kurių pateikti negalima.
+    :param pdsa_file_data: žodynas su PDSA duomenimis
+    :param refs_file_data: žodynas su ryšių tarp lentelių duomenimis
+    :param pdsa_tbl_sheet: PDSA lakšto, aprašančio lenteles, vardas
+    :param pdsa_col_sheet: PDSA lakšto, aprašančio stulpelius, vardas
+    :param refs_sheet: ryšių lakšto vardas
+    :param ref_source_tbl: ryšių lakšto stulpelis su ryšio pradžių („IŠ“) lentelėmis
+    :param ref_target_tbl: ryšių lakšto stulpelis su ryšio galų („Į“) lentelėmis
+    :return: žodynas {"warnings": [], "errors": []} su įspėjimų ir klaidų tekstais
+    """
+    warnings_list = []
+    errors_list = []
+    if (not refs_file_data) and (not pdsa_file_data):
+        errors_list.append(_("Please select PDSA and/or references document!"))
+        return {"warnings": warnings_list, "errors": errors_list}
     if pdsa_file_data:
         if None in [pdsa_tbl_sheet, pdsa_col_sheet]:
-            err_msg.append(html.P(_("Please select PDSA document sheets!")))
+            errors_list.append(_("Please select PDSA document sheets!"))
     else:
-        wrn_msg.append(html.P(_("Please select PDSA document and its sheets!")))
+        warnings_list.append(_("Please select PDSA document and its sheets!"))
     if refs_file_data:
         if refs_sheet:
             if None in [ref_source_tbl, ref_target_tbl]:
-                if refs_file_data["file_data"][refs_sheet]["df"]:
-                    err_msg.append(html.P(_("Please select references columns that contain tables!")))
+                if not fu.is_sheet_empty(refs_file_data, refs_sheet):
+                    errors_list.append(_("Please select references columns that contain tables!"))
             elif ref_source_tbl == ref_target_tbl:
-                err_msg.append(html.P(_("Reference columns for source and target tables are the same!")))
+                errors_list.append(_("Reference columns for source and target tables are the same!"))
         else:
-            err_msg.append(html.P(_("Please select references document sheet!")))
+            errors_list.append(_("Please select references document sheet!"))
     else:
-        wrn_msg.append(html.P(_("Please select references document!")))
-    if err_msg:
-        return Serverside({}), "secondary", err_msg, wrn_msg, "file_upload", ""
-    if pdsa_col_sheet and pdsa_tbl_sheet == pdsa_col_sheet:
-        wrn_msg.append(html.P(_("PDSA sheets for tables and columns are the same!")))
+        warnings_list.append(_("Please select references document!"))
+    if (not errors_list) and pdsa_col_sheet and (pdsa_tbl_sheet == pdsa_col_sheet):
+        warnings_list.append(_("PDSA sheets for tables and columns are the same!"))
+    return {"warnings": warnings_list, "errors": errors_list}
+
+
+def validate_mapping_preview(
+    pdsa_file_data, refs_file_data,
+    pdsa_tbl_sheet, pdsa_tbl_table, pdsa_tbl_records,
+    pdsa_col_sheet, pdsa_col_table, pdsa_col_column,
+    refs_sheet, ref_columns
+):
+    """
+    Greitas parinkimų patikrinimas keičiant parinkimus: tikrinama tik, ar parinkti reikalingi stulpeliai ir
+    ar tinkami jų tipai. Naudojami tik lakštų stulpelių aprašai (žr. `fu.get_sheet_profile`), tad lakštai neperžiūrimi,
+    o pasikartojimai ir alternatyvūs vardai netikrinami – tai daroma tik pateikiant. Dar fone nenuskaitytų didelių
+    lakštų aprašai sudaromi pagal pirmąsias eilutes.
+    :param pdsa_file_data: žodynas su PDSA duomenimis
+    :param refs_file_data: žodynas su ryšių tarp lentelių duomenimis
+    :param pdsa_tbl_sheet: PDSA lakšto, aprašančio lenteles, vardas
+    :param pdsa_tbl_table: PDSA lentelių lakšte stulpelis su lentelių vardais
+    :param pdsa_tbl_records: PDSA lentelių lakšte stulpelis su eilučių (įrašų) skaičiumi
+    :param pdsa_col_sheet: PDSA lakšto, aprašančio stulpelius, vardas
+    :param pdsa_col_table: PDSA stulpelių lakšte stulpelis su lentelių vardais
+    :param pdsa_col_column: PDSA stulpelių lakšte stulpelis su stulpelių vardais
+    :param refs_sheet: ryšių lakšto vardas
+    :param ref_columns: ryšių lakšto parinkti stulpeliai
+    :return: žodynas {"warnings": [], "errors": []} su įspėjimų ir klaidų tekstais
+    """
+    warnings_list = []
+    errors_list = []
     pre_msg = _("Enhance analysis by selecting from the sheet defining the %s (%s), the column describing the %s.")
 
-    # %% Surinktą informaciją transformuoju ir paruošiu graferiui
+    # PDSA lakštas, aprašantis LENTELES
+    if pdsa_tbl_sheet and fu.is_sheet_empty(pdsa_file_data, pdsa_tbl_sheet):
+        msg = _("PDSA sheet describing %s (%s) has no data.")
+        warnings_list.append(msg % (pgettext("PDSA sheet describing...", "tables"), pdsa_tbl_sheet))
+    elif pdsa_tbl_sheet:
+        tbl_profile = fu.get_sheet_profile(pdsa_file_data, pdsa_tbl_sheet, load=False)
+        if not pdsa_tbl_table:
+            warnings_list.append(pre_msg % (
+                pgettext("PDSA sheet describing...", "tables"), pdsa_tbl_sheet, pgettext("pdsa column for", "tables")
+            ))
+        if pdsa_tbl_records in tbl_profile:
+            records_profile = tbl_profile[pdsa_tbl_records]
+            if not (records_profile["is_numeric"] or records_profile["is_string"]):
+                msg = _("In the PDSA sheet '%s', the column '%s' has unexpected dtype '%s'!")
+                warnings_list.append(msg % (pdsa_tbl_sheet, pdsa_tbl_records, records_profile["dtype"]))
+        if pdsa_tbl_table in tbl_profile:
+            if tbl_profile[pdsa_tbl_table]["is_empty"]:
+                msg = _("In the PDSA sheet '%s', the column '%s' is empty!")
+                warnings_list.append(msg % (pdsa_tbl_sheet, pdsa_tbl_table))
+            elif not tbl_profile[pdsa_tbl_table]["is_string"]:
+                msg = _("In the PDSA sheet '%s', the column '%s' some values are not strings!")
+                errors_list.append(msg % (pdsa_tbl_sheet, pdsa_tbl_table))
 
-    # PDSA lakšto (pdsa_tbl_sheet), aprašančio LENTELES, turinys
-    df_tbl = pdsa_file_data["file_data"][pdsa_tbl_sheet]["df"] if pdsa_tbl_sheet else {}
-    df_tbl = pl.DataFrame(df_tbl, infer_schema_length=None)
+    # PDSA lakštas, aprašantis STULPELIUS
+    if pdsa_col_sheet and fu.is_sheet_empty(pdsa_file_data, pdsa_col_sheet):
+        msg = _("PDSA sheet describing %s (%s) has no data.")
+        warnings_list.append(msg % (pgettext("PDSA sheet describing...", "columns"), pdsa_col_sheet))
+    elif pdsa_col_sheet:
+        col_profile = fu.get_sheet_profile(pdsa_file_data, pdsa_col_sheet, load=False)
+        if not pdsa_col_table:
+            warnings_list.append(pre_msg % (
+                pgettext("PDSA sheet describing...", "columns"), pdsa_col_sheet, pgettext("pdsa column for", "tables")
+            ))
+        elif pdsa_col_table in col_profile:
+            if col_profile[pdsa_col_table]["is_empty"]:
+                msg = _("In the PDSA sheet '%s', the column '%s' is empty!")
+                warnings_list.append(msg % (pdsa_col_sheet, pdsa_col_table))
+            elif not col_profile[pdsa_col_table]["is_string"]:
+                msg = _("In the PDSA sheet '%s', the column '%s' some values are not strings!")
+                errors_list.append(msg % (pdsa_col_sheet, pdsa_col_table))
+        if not pdsa_col_column:
+            warnings_list.append(pre_msg % (
+                pgettext("PDSA sheet describing...", "columns"), pdsa_col_sheet, pgettext("pdsa column for", "columns")
+            ))
+        elif (pdsa_col_column in col_profile) and not col_profile[pdsa_col_column]["is_string"]:
+            msg = _("In the PDSA sheet '%s', the column '%s' values are not strings!")
+            errors_list.append(msg % (pdsa_col_sheet, pdsa_col_column))
+
+    # RYŠIAI
+    if refs_file_data and fu.is_sheet_empty(refs_file_data, refs_sheet):
+        warnings_list.append(_("There are no relationships between different tables!"))
+    elif refs_sheet:
+        refs_profile = fu.get_sheet_profile(refs_file_data, refs_sheet, load=False)
+        for ref_col in dict.fromkeys(c for c in ref_columns if c):  # unikalūs netušti ryšių lakšto stulpeliai
+            if (ref_col in refs_profile) and not refs_profile[ref_col]["is_string"]:
+                msg = _("In the references sheet '%s', the column '%s' values are not strings!")
+                errors_list.append(msg % (refs_sheet, ref_col))
+    return {"warnings": warnings_list, "errors": errors_list}
+
+
+# Pateikimo etapų skaičius eigos juostai (žr. `summarize_submission`)
+SUBMISSION_STAGES = 4
+# Pateikimo etapų rezultatų struktūros versija; ją reikia padidinti pakeitus kurio nors etapo rezultatą,
+# kad nebūtų naudojami diske likę ankstesnės versijos rezultatai
+SUBMISSION_STAGE_CACHE_VERSION = 4
+# Pateikimo etapų podėlis: {(etapas, kalba, raktas): rezultatas}. Jame laikomi naujausi rezultatai, kad pakeitus vieną
+# parinkimą kitų etapų nereikėtų perskaičiuoti. `summarize_submission` vykdomas fone kaip atskiras procesas,
+# tad podėlis laikomas diske ir bendras visiems procesams; viršijus dydį šalinami seniausiai naudoti įrašai.
+SUBMISSION_STAGE_CACHE_DIR = os.path.join("data-tmp", "background", "submission-stages")
+# Didžiausias leistinas podėlio dydis baitais; keičiamas per aplinkos kintamąjį PDSA_GRAPHER_STAGE_CACHE_MB
+SUBMISSION_STAGE_CACHE_MAX_BYTES = int(os.environ.get("PDSA_GRAPHER_STAGE_CACHE_MB", "256")) * 1024 * 1024
+SUBMISSION_STAGE_CACHE = diskcache.Cache(
+    SUBMISSION_STAGE_CACHE_DIR,
+    size_limit=SUBMISSION_STAGE_CACHE_MAX_BYTES,
+    eviction_policy="least-recently-used",
+)
+
+
+def get_cached_stage(stage, key, compute):
+    """
+    Gauti pateikimo etapo rezultatą iš podėlio arba jį apskaičiuoti ir įsiminti.
+    Pranešimai etapuose jau išversti, tad į raktą įtraukiama ir dabartinė kalba.
+    :param stage: etapo vardas
+    :param key: etapo parinkimų rinkinys (tuple) su įkeltų duomenų ID; jei None – neįsiminti
+    :param compute: f-ja be argumentų, apskaičiuojanti etapo rezultatą
+    :return: etapo rezultatas
+    """
+    if key is None:
+        return compute()
+    # Trečias elementas – kalbos kodas
+    cache_key = (SUBMISSION_STAGE_CACHE_VERSION, stage, get_gettext_locale(), key)
+    result = SUBMISSION_STAGE_CACHE.get(cache_key)
+    if result is None:
+        result = compute()
+        try:
+            SUBMISSION_STAGE_CACHE.set(cache_key, result)
+        except Exception as e:
+            # Pvz., lakšte yra stulpelių, kurių polars nemoka įrašyti – tiesiog neįsiminti
+            warnings.warn(f"Submission stage {stage} was not cached: {e}")
+    return result
+
+
+def prepare_tables_sheet(
+    pdsa_file_data, pdsa_tbl_sheet,
+    pdsa_tbl_table, pdsa_tbl_comment, pdsa_tbl_records, pdsa_tbl_selected,
+    dropdown_sheet_tbl
+):
+    """
+    Pateikimo etapas: PDSA lakšto, aprašančio LENTELES, paruošimas.
+    :param pdsa_file_data: žodynas su PDSA duomenimis
+    :param pdsa_tbl_sheet: PDSA lakšto, aprašančio lenteles, vardas
+    :param pdsa_tbl_table: stulpelis su lentelių vardais
+    :param pdsa_tbl_comment: stulpelis su lentelių apibūdinimais
+    :param pdsa_tbl_records: stulpelis su eilučių (įrašų) skaičiumi
+    :param pdsa_tbl_selected: stulpelis su vertingumo žyma
+    :param dropdown_sheet_tbl: stulpeliai, kuriuos pasilikti švieslentėje
+    :return: žodynas {
+            "df_tbl_orig": pl.DataFrame(),  # originalūs stulpeliai
+            "df_tbl": pl.DataFrame(),  # pervadinti stulpeliai
+            "renamed_cols": {},  # stulpelių vidiniai pervadinimai
+            "list_tables": [],  # lentelės
+            "list_tables_empty": [],  # tuščios lentelės (n_records=0)
+            "warnings": [],  # įspėjimų tekstai
+            "errors": [],  # klaidų tekstai
+        }
+    """
+    warnings_list = []
+    pre_msg = _("Enhance analysis by selecting from the sheet defining the %s (%s), the column describing the %s.")
+    df_tbl = fu.get_sheet_df(pdsa_file_data, pdsa_tbl_sheet)
     list_tbl_tables_empty = []  # Tuščių lentelių (t.y. su n_records=0) kintamasis;
     dropdown_sheet_tbl = dropdown_sheet_tbl or []
-    if df_tbl.height == 0:
-        if pdsa_tbl_sheet:
-            msg = _("PDSA sheet describing %s (%s) has no data.")
-            msg = msg % (pgettext("PDSA sheet describing...", "tables"), pdsa_tbl_sheet)
-            wrn_msg.append(html.P(msg))
-        df_tbl_orig = df_tbl  # Tuščias df
-        pdsa_tbl_tables = []
-    else:
-        if not pdsa_tbl_table:
-            msg = pre_msg % (  # Analizė bus naudingesnė, jei lakšte, aprašančiame ...
-                pgettext("PDSA sheet describing...", "tables"),  # lenteles
-                pdsa_tbl_sheet,
-                pgettext("pdsa column for", "tables")  # ... nurodysite stulpelį, kuriame yra lentelės.
-            )
-            wrn_msg.append(html.P(msg))
-        elif dropdown_sheet_tbl and (pdsa_tbl_table not in dropdown_sheet_tbl):
-            dropdown_sheet_tbl = [pdsa_tbl_table] + dropdown_sheet_tbl  # lentelės vardas privalomas
-        df_tbl_orig = df_tbl[dropdown_sheet_tbl].clone()
-        # Persivadinti standartiniais PDSA stulpelių vardais vidiniam naudojimui
-        selected_tbl_columns = [pdsa_tbl_table, pdsa_tbl_comment, pdsa_tbl_records, pdsa_tbl_selected]
-        internal_tbl_columns = ["table", "comment", "n_records", "selected"]
-        df_tbl = fu.select_renamed_or_add_columns(df_tbl, selected_tbl_columns, internal_tbl_columns)
-        if pdsa_tbl_records:
-            # Rasti lenteles, kuriose eilučių skaičius yra 0 (bet palikti jei jų yra None).
-            # Tačiau vėliau gali kilti painiavos vėlesniuose įspėjimuose, pvz., neva nėra apibrėžtų kai kurių lentelių
-            n_records_dtype = df_tbl.schema["n_records"]
-            if  n_records_dtype.is_numeric():
-                list_tbl_tables_empty = df_tbl.filter(pl.col("n_records") == 0)["table"].to_list()
-            elif n_records_dtype == pl.Utf8:  # pl.String
-                list_tbl_tables_empty = df_tbl.filter(pl.col("n_records") == "0")["table"].to_list()
-            else:
-                msg = _("In the PDSA sheet '%s', the column '%s' has unexpected dtype '%s'!")
-                msg = msg % (pdsa_tbl_sheet, pdsa_tbl_records, n_records_dtype)
-                wrn_msg.append(html.P(msg))
-        pdsa_tbl_tables = df_tbl["table"].drop_nulls().to_list()
-        pdsa_tbl_tables = sorted(list(set(pdsa_tbl_tables)))
-        if pdsa_tbl_table and (not pdsa_tbl_tables):
-            warning_str = _("In the PDSA sheet '%s', the column '%s' is empty!") % (pdsa_tbl_sheet, pdsa_tbl_table)
-            wrn_msg.append(html.P(warning_str))
-        if not all([isinstance(x, str) for x in pdsa_tbl_tables]):
-            error_str = _("In the PDSA sheet '%s', the column '%s' some values are not strings!")
-            error_str = error_str  % (pdsa_tbl_sheet, pdsa_tbl_table)
-            err_msg.append(html.P(error_str))
-            return Serverside({}), "secondary", err_msg, wrn_msg, "file_upload", ""
     # Prisiminti naudotojo pasirinktas lentelių lakšto stulpelių sąsajas; bet tai nereiškia, kad tie stulpeliai iš tiesų yra!
     tbl_sheet_renamed_cols = {
         "table": pdsa_tbl_table,
@@ -221,18 +619,96 @@ def summarize_submission(
         "n_records": pdsa_tbl_records,
         "selected": pdsa_tbl_selected
     }
+    stage = {
+        "df_tbl_orig": df_tbl, "df_tbl": df_tbl, "renamed_cols": tbl_sheet_renamed_cols,
+        "list_tables": [], "list_tables_empty": list_tbl_tables_empty, "warnings": warnings_list, "errors": [],
+    }
+    if df_tbl.height == 0:
+        if pdsa_tbl_sheet:
+            msg = _("PDSA sheet describing %s (%s) has no data.")
+            msg = msg % (pgettext("PDSA sheet describing...", "tables"), pdsa_tbl_sheet)
+            warnings_list.append(msg)
+        return stage  # Tuščias df
 
-    # PDSA lakšto (pdsa_col_sheet), aprašančio STULPELIUS, turinys
-    df_col = pdsa_file_data["file_data"][pdsa_col_sheet]["df"] if pdsa_col_sheet else {}
-    df_col = pl.DataFrame(df_col, infer_schema_length=None)
+    if not pdsa_tbl_table:
+        msg = pre_msg % (  # Analizė bus naudingesnė, jei lakšte, aprašančiame ...
+            pgettext("PDSA sheet describing...", "tables"),  # lenteles
+            pdsa_tbl_sheet,
+            pgettext("pdsa column for", "tables")  # ... nurodysite stulpelį, kuriame yra lentelės.
+        )
+        warnings_list.append(msg)
+    elif dropdown_sheet_tbl and (pdsa_tbl_table not in dropdown_sheet_tbl):
+        dropdown_sheet_tbl = [pdsa_tbl_table] + dropdown_sheet_tbl  # lentelės vardas privalomas
+    stage["df_tbl_orig"] = df_tbl[dropdown_sheet_tbl].clone()
+    # Persivadinti standartiniais PDSA stulpelių vardais vidiniam naudojimui
+    selected_tbl_columns = [pdsa_tbl_table, pdsa_tbl_comment, pdsa_tbl_records, pdsa_tbl_selected]
+    internal_tbl_columns = ["table", "comment", "n_records", "selected"]
+    df_tbl = fu.select_renamed_or_add_columns(df_tbl, selected_tbl_columns, internal_tbl_columns)
+    stage["df_tbl"] = df_tbl
+    if pdsa_tbl_records:
+        # Rasti lenteles, kuriose eilučių skaičius yra 0 (bet palikti jei jų yra None).
+        # Tačiau vėliau gali kilti painiavos vėlesniuose įspėjimuose, pvz., neva nėra apibrėžtų kai kurių lentelių
+        n_records_dtype = df_tbl.schema["n_records"]
+        if  n_records_dtype.is_numeric():
+            list_tbl_tables_empty.extend(df_tbl.filter(pl.col("n_records") == 0)["table"].to_list())
+        elif n_records_dtype == pl.Utf8:  # pl.String
+            list_tbl_tables_empty.extend(df_tbl.filter(pl.col("n_records") == "0")["table"].to_list())
+        else:
+            msg = _("In the PDSA sheet '%s', the column '%s' has unexpected dtype '%s'!")
+            msg = msg % (pdsa_tbl_sheet, pdsa_tbl_records, n_records_dtype)
+            warnings_list.append(msg)
+    pdsa_tbl_tables = df_tbl["table"].drop_nulls().to_list()
+    pdsa_tbl_tables = sorted(list(set(pdsa_tbl_tables)))
+    stage["list_tables"] = pdsa_tbl_tables
+    if pdsa_tbl_table and (not pdsa_tbl_tables):
+        warning_str = _("In the PDSA sheet '%s', the column '%s' is empty!") % (pdsa_tbl_sheet, pdsa_tbl_table)
+        warnings_list.append(warning_str)
+    if not all([isinstance(x, str) for x in pdsa_tbl_tables]):
+        error_str = _("In the PDSA sheet '%s', the column '%s' some values are not strings!")
+        error_str = error_str  % (pdsa_tbl_sheet, pdsa_tbl_table)
+        stage["errors"].append(error_str)
+    return stage
+
+
+def prepare_columns_sheet(
+    pdsa_file_data, pdsa_col_sheet,
+    pdsa_col_table, pdsa_col_column, pdsa_col_primary, pdsa_col_checkbox, pdsa_col_comment, pdsa_col_alias,
+    dropdown_sheet_col
+):
+    """
+    Pateikimo etapas: PDSA lakšto, aprašančio STULPELIUS, paruošimas.
+    :param pdsa_file_data: žodynas su PDSA duomenimis
+    :param pdsa_col_sheet: PDSA lakšto, aprašančio stulpelius, vardas
+    :param pdsa_col_table: stulpelis su lentelių vardais
+    :param pdsa_col_column: stulpelis su stulpelių vardais
+    :param pdsa_col_primary: stulpelis su požymiu, ar stulpelis yra pirminis raktas
+    :param pdsa_col_checkbox: stulpelis su vertingumo žyma ar spalvotų langelių simboliais
+    :param pdsa_col_comment: stulpelis su stulpelių apibūdinimais
+    :param pdsa_col_alias: stulpelis su alternatyviu vardu rodymui (gali baigtis @snake_case() ar @snake_case_short())
+    :param dropdown_sheet_col: stulpeliai, kuriuos pasilikti švieslentėje
+    :return: žodynas {
+            "df_col_orig": pl.DataFrame(),  # originalūs stulpeliai
+            "df_col": pl.DataFrame(),  # pervadinti stulpeliai
+            "renamed_cols": {},  # stulpelių vidiniai pervadinimai
+            "list_tables": [] arba None,  # lentelės; None, jei lentelių stulpelis neparinktas arba lakštas tuščias
+            "warnings": [],  # įspėjimų tekstai
+            "errors": [],  # klaidų tekstai
+        }
+    """
+    warnings_list = []
+    pre_msg = _("Enhance analysis by selecting from the sheet defining the %s (%s), the column describing the %s.")
+    df_col = fu.get_sheet_df(pdsa_file_data, pdsa_col_sheet)
     dropdown_sheet_col = dropdown_sheet_col or []
+    stage = {
+        "df_col_orig": df_col, "df_col": df_col, "renamed_cols": {},
+        "list_tables": None,  # Tyčia ne [], kad būtų galima atskirti vėlesniame etape
+        "warnings": warnings_list, "errors": [],
+    }
     if df_col.height == 0:
         if pdsa_col_sheet:
             msg = _("PDSA sheet describing %s (%s) has no data.")
             msg = msg % (pgettext("PDSA sheet describing...", "columns"), pdsa_col_sheet)
-            wrn_msg.append(html.P(msg))
-        df_col_orig = df_col  # Tuščias df
-        pdsa_col_tables = None  # Tyčia ne [], kad būtų galima atskirti vėlesniame etape
+            warnings_list.append(msg)
         pdsa_col_checkbox = None
     else:
         if dropdown_sheet_col:
@@ -241,7 +717,7 @@ def summarize_submission(
                 dropdown_sheet_col = [pdsa_col_column] + dropdown_sheet_col
             if pdsa_col_table and (pdsa_col_table not in dropdown_sheet_col):
                 dropdown_sheet_col = [pdsa_col_table] + dropdown_sheet_col
-        df_col_orig = df_col[dropdown_sheet_col].clone()
+        stage["df_col_orig"] = df_col[dropdown_sheet_col].clone()
         if pdsa_col_alias:
             # Pakeisti specialius alt. vardo raktus tikromis standartizuotomis reikšmėmis, jei reikia
             if pdsa_col_alias.endswith("@snake_case()"):
@@ -249,22 +725,22 @@ def summarize_submission(
                 pdsa_col_alias_target = re.sub(r"@snake_case\(\)$", "", pdsa_col_alias)
                 if pdsa_col_alias_target in df_col.columns:
                     df_col = df_col.with_columns(
-                        pl.when(pl.col(pdsa_col_alias_target).is_null())
-                        .then(pl.col(pdsa_col_column))
-                        .otherwise(pl.col(pdsa_col_alias_target))
-                        .map_elements(gu.snake_case, return_dtype=pl.String)
-                        .alias(pdsa_col_alias)
+                        gu.snake_case_expr(
+                            pl.when(pl.col(pdsa_col_alias_target).is_null())
+                            .then(pl.col(pdsa_col_column))
+                            .otherwise(pl.col(pdsa_col_alias_target))
+                        ).alias(pdsa_col_alias)
                     )
             if pdsa_col_alias.endswith("@snake_case_short()"):
                 # standartizuoti sutrumpinti alt. vardai; bet jei jų nėra, imti tikrus vardus standartizavimui
                 pdsa_col_alias_target = re.sub(r"@snake_case_short\(\)$", "", pdsa_col_alias)
                 if pdsa_col_alias_target in df_col.columns:
                     df_col = df_col.with_columns(
-                        pl.when(pl.col(pdsa_col_alias_target).is_null())
-                        .then(pl.col(pdsa_col_column))
-                        .otherwise(pl.col(pdsa_col_alias_target))
-                        .map_elements(gu.snake_case_short, return_dtype=pl.String)
-                        .alias(pdsa_col_alias)
+                        gu.snake_case_short_expr(
+                            pl.when(pl.col(pdsa_col_alias_target).is_null())
+                            .then(pl.col(pdsa_col_column))
+                            .otherwise(pl.col(pdsa_col_alias_target))
+                        ).alias(pdsa_col_alias)
                     )
         # Persivadinti standartiniais PDSA stulpelių vardais vidiniam naudojimui
         selected_col_columns = [
@@ -272,36 +748,37 @@ def summarize_submission(
         ]
         internal_col_columns = ["table", "column", "is_primary", "comment", "checkbox", "alias"]
         df_col = fu.select_renamed_or_add_columns(df_col, selected_col_columns, internal_col_columns)
+        stage["df_col"] = df_col
         if pdsa_col_table:
             pdsa_col_tables = df_col["table"].drop_nulls().unique().sort().to_list()
+            stage["list_tables"] = pdsa_col_tables
             if not pdsa_col_tables:
                 warning_str = _("In the PDSA sheet '%s', the column '%s' is empty!") % (pdsa_col_sheet, pdsa_col_table)
-                wrn_msg.append(html.P(warning_str))
+                warnings_list.append(warning_str)
             if not all([isinstance(x, str) for x in pdsa_col_tables]):
                 error_str = _("In the PDSA sheet '%s', the column '%s' some values are not strings!")
                 error_str = error_str  % (pdsa_col_sheet, pdsa_col_table)
-                err_msg.append(html.P(error_str))
-                return Serverside({}), "secondary", err_msg, wrn_msg, "file_upload", ""
+                stage["errors"].append(error_str)
+                return stage
         else:
-            pdsa_col_tables = None
             msg = pre_msg % (  # Analizė bus naudingesnė, jei lakšte, aprašančiame ...
                 pgettext("PDSA sheet describing...", "columns"),  # stulpelius
                 pdsa_col_sheet,
                 pgettext("pdsa column for", "tables")  # ... nurodysite stulpelį, kuriame yra lentelės.
             )
-            wrn_msg.append(html.P(msg))
+            warnings_list.append(msg)
         if not pdsa_col_column:
             msg = pre_msg % (  # Analizė bus naudingesnė, jei lakšte, aprašančiame ...
                 pgettext("PDSA sheet describing...", "columns"),  # stulpelius
                 pdsa_col_sheet,
                 pgettext("pdsa column for", "columns")  # ... nurodysite stulpelį, kuriame yra stulpeliai.
             )
-            wrn_msg.append(html.P(msg))
+            warnings_list.append(msg)
         elif df_col.schema["column"] != pl.Utf8:
             error_str = _("In the PDSA sheet '%s', the column '%s' values are not strings!")
             error_str = error_str % (pdsa_col_sheet, pdsa_col_column)
-            err_msg.append(html.P(error_str))
-            return Serverside({}), "secondary", err_msg, wrn_msg, "file_upload", ""
+            stage["errors"].append(error_str)
+            return stage
         elif pdsa_col_table:
             # Tikrinti, ar nėra besidubliuojančių stulpelių vardų toje pačioje lentelėje
             df_cols_dupl = fu.find_duplicates_in_group(df_col, "table", "column")
@@ -317,7 +794,7 @@ def summarize_submission(
                     warning_str = _("In the PDSA sheet '%s', the column '%s' values are not unique within '%s'!")
                     warning_str = warning_str % (pdsa_col_sheet, pdsa_col_column, pdsa_col_table)
                     warning_str += " " + ", ".join(duplicated_cols_list)
-                    wrn_msg.append(html.P(warning_str))
+                    warnings_list.append(warning_str)
         if pdsa_col_table and pdsa_col_alias and (pdsa_col_alias != pdsa_col_column):
             # Tikrinti, ar nėra besidubliuojančių stulpelių alternatyvių vardų toje pačioje lentelėje
             df_alias_dupl = fu.find_duplicates_in_group(df_col, "table", "alias")
@@ -333,9 +810,9 @@ def summarize_submission(
                     warning_str = _("In the PDSA sheet '%s', the column '%s' values are not unique within '%s'!")
                     warning_str = warning_str % (pdsa_col_sheet, pdsa_col_alias, pdsa_col_table)
                     warning_str += " " + ", ".join(duplicated_alias_list)
-                    wrn_msg.append(html.P(warning_str))
+                    warnings_list.append(warning_str)
     # Prisiminti naudotojo pasirinktas stulpelių lakšto stulpelių sąsajas; bet tai nereiškia, kad tie stulpeliai iš tiesų yra!
-    col_sheet_renamed_cols = {
+    stage["renamed_cols"] = {
         "table": pdsa_col_table,
         "column": pdsa_col_column,
         "is_primary": pdsa_col_primary,
@@ -343,12 +820,35 @@ def summarize_submission(
         "checkbox": pdsa_col_checkbox,
         "alias": pdsa_col_alias
     }
+    return stage
 
-    # RYŠIAI
-    df_edges = refs_file_data["file_data"][refs_sheet]["df"] if refs_file_data else {}
-    df_edges = pl.DataFrame(df_edges, infer_schema_length=None)
+
+def prepare_refs_sheet(refs_file_data, refs_sheet, ref_source_tbl, ref_source_col, ref_target_tbl, ref_target_col):
+    """
+    Pateikimo etapas: RYŠIŲ lakšto paruošimas.
+    :param refs_file_data: žodynas su ryšių tarp lentelių duomenimis
+    :param refs_sheet: ryšių lakšto vardas
+    :param ref_source_tbl: stulpelis, kuriame pradžių („IŠ“) lentelės
+    :param ref_source_col: stulpelis, kuriame pradžių („IŠ“) stulpeliai
+    :param ref_target_tbl: stulpelis, kuriame galų („Į“) lentelės
+    :param ref_target_col: stulpelis, kuriame galų („Į“) stulpeliai
+    :return: žodynas {
+            "df_edges": pl.DataFrame(),  # ryšiai su vidiniais stulpelių vardais, be pasikartojimų
+            "list_all_tables": [],  # lentelės, kurios panaudotos ryšiuose
+            "graph_nodes": pl.DataFrame(),  # ryšių grafo indeksas (žr. `utils_graph.build_graph_index`)
+            "graph_out": pl.DataFrame(),
+            "graph_in": pl.DataFrame(),
+            "warnings": [],  # įspėjimų tekstai
+            "errors": [],  # klaidų tekstai
+        }
+    """
+    stage = {
+        "df_edges": pl.DataFrame(), "list_all_tables": [], "warnings": [], "errors": [],
+        **ug.build_graph_index(pl.DataFrame(schema=gu.EDGES_SCHEMA)),
+    }
+    df_edges = fu.get_sheet_df(refs_file_data, refs_sheet)
     if refs_file_data and df_edges.height == 0:
-        wrn_msg.append(html.P(_("There are no relationships between different tables!")))
+        stage["warnings"].append(_("There are no relationships between different tables!"))
     selected_refs_columns = [ref_source_tbl, ref_source_col, ref_target_tbl, ref_target_col]
     ref_cols_uniq = list(set(selected_refs_columns))  # unikalūs ryšių lakšto stulpeliai
     ref_cols_uniq = [c for c in ref_cols_uniq if c]  # netušti ryšių lakšto stulpeliai
@@ -356,13 +856,49 @@ def summarize_submission(
         if (ref_col in df_edges.columns) and (df_edges.schema[ref_col] != pl.Utf8):
             error_str = _("In the references sheet '%s', the column '%s' values are not strings!")
             error_str = error_str % (refs_sheet, ref_col)
-            err_msg.append(html.P(error_str))
-    if err_msg:
-        return Serverside({}), "secondary", err_msg, wrn_msg, "file_upload", ""
-    # Pervadinti stulpelius į toliau viduje sistemiškai naudojamus
-    internal_refs_columns = ["source_tbl", "source_col", "target_tbl", "target_col"]
-    df_edges = fu.select_renamed_or_add_columns(df_edges, selected_refs_columns, internal_refs_columns)
-    df_edges = df_edges.filter(~pl.all_horizontal(pl.all().is_null()))  # išmesti tuščias eilutes
+            stage["errors"].append(error_str)
+    if stage["errors"]:
+        return stage
+    # Pervadinti stulpelius į toliau viduje sistemiškai naudojamus ir įtvirtinti jų tipus (gu.EDGES_SCHEMA):
+    # tekstiniai jau patikrinti, o nepasirinkti stulpeliai tušti; tad ryšių nebereikės kaskart tipizuoti iš naujo
+    df_edges = (
+        fu.select_renamed_or_add_columns(df_edges.lazy(), selected_refs_columns, list(gu.EDGES_SCHEMA))
+        .cast(gu.EDGES_SCHEMA)
+        .filter(~pl.all_horizontal(pl.all().is_null()))  # išmesti tuščias eilutes
+        .collect()
+    )
+
+    # Visų unikalių lentelių, turinčių ryšių, sąrašas
+    edge_source_tbl = df_edges["source_tbl"].drop_nulls().to_list()  # ryšių pradžių lentelės
+    edge_target_tbl = df_edges["target_tbl"].drop_nulls().to_list()  # ryšių galų lentelės
+    stage["list_all_tables"] = sorted(list(set(edge_source_tbl + edge_target_tbl)))
+    # Paprastai neturėtų būti pasikartojančių ryšių, nebent nebuvo nurodyti ryšių stulpeliai apie DB lentelės stulpelius
+    stage["df_edges"] = df_edges.unique()
+    # Indekse nurodomi ryšių eilučių numeriai, tad jis sudaromas jau galutiniam ryšių sąrašui
+    stage.update(ug.build_graph_index(stage["df_edges"]))
+    return stage
+
+
+def cross_check_sheets(
+    tbl_stage, col_stage, refs_stage, pdsa_tbl_sheet, pdsa_tbl_table, pdsa_col_sheet, pdsa_col_table
+):
+    """
+    Pateikimo etapas: lentelių, stulpelių ir ryšių lakštų sutikrinimas tarpusavyje.
+    :param tbl_stage: `prepare_tables_sheet` rezultatas
+    :param col_stage: `prepare_columns_sheet` rezultatas
+    :param refs_stage: `prepare_refs_sheet` rezultatas
+    :param pdsa_tbl_sheet: PDSA lakšto, aprašančio lenteles, vardas
+    :param pdsa_tbl_table: PDSA lentelių lakšte stulpelis su lentelių vardais
+    :param pdsa_col_sheet: PDSA lakšto, aprašančio stulpelius, vardas
+    :param pdsa_col_table: PDSA stulpelių lakšte stulpelis su lentelių vardais
+    :return: žodynas {
+            "list_all_tables": [],  # visos lentelės iš duombazės lentelių ir stulpelių lakštų aprašų
+            "warnings": [],  # įspėjimų tekstai
+        }
+    """
+    warnings_list = []
+    pdsa_tbl_tables = tbl_stage["list_tables"]
+    pdsa_col_tables = col_stage["list_tables"]
 
     # Sutikrinimas tarp pdsa_tbl_sheet ir pdsa_col_sheet „table“ stulpelių
     if pdsa_tbl_table and pdsa_col_table and (pdsa_col_tables is not None):
@@ -376,81 +912,17 @@ def summarize_submission(
             )
             warning_str = warning_str % (pdsa_tbl_sheet, pdsa_tbl_table, len(tables_diff), pdsa_col_sheet, pdsa_col_table)
             warning_str += " " + ", ".join(tables_diff) + "."
-            wrn_msg.append(html.P(warning_str))
+            warnings_list.append(warning_str)
 
     # visos lentelės iš duombazės lentelių ir stulpelių lakštų aprašų
     pdsa_all_tables = sorted(list(set(pdsa_col_tables or []) | set(pdsa_tbl_tables)))
 
-    # Visų unikalių lentelių, turinčių ryšių, sąrašas
-    edge_source_tbl = df_edges["source_tbl"].drop_nulls().to_list()  # ryšių pradžių lentelės
-    edge_target_tbl = df_edges["target_tbl"].drop_nulls().to_list()  # ryšių galų lentelės
-    edge_tables = sorted(list(set(edge_source_tbl + edge_target_tbl)))
-    edge_tables_extra = list(set(edge_tables) - set(pdsa_all_tables))
+    # Ryšiuose minimos lentelės, kurių nėra PDSA
+    edge_tables_extra = list(set(refs_stage["list_all_tables"]) - set(pdsa_all_tables))
     if pdsa_tbl_table and pdsa_col_table and edge_tables_extra:
         # Įspėjimas gali klaidinti, jei dalis lentelių pašalinta ties `if pdsa_tbl_records and pdsa_tbl_exclude_empty`
         warning_str = _("References contain some tables (%d) that are not present in the defined tables:")
         warning_str = warning_str % len(edge_tables_extra)
         warning_str += " " + ", ".join(edge_tables_extra) + "."
-        wrn_msg.append(html.P(warning_str))
-        ## Lentelės, tik esančios PDSA dokumente:
-        # df_edges = df_edges.loc[
-        #     df_edges["source_tbl"].isin(pdsa_all_tables) & df_edges["target_tbl"].isin(pdsa_all_tables), :
-        # ]
-    # Paprastai neturėtų būti pasikartojančių ryšių, nebent nebuvo nurodyti ryšių stulpeliai apie DB lentelės stulpelius
-    df_edges = df_edges.unique()
-
-    if (not edge_tables) and (not pdsa_all_tables):
-        # Dokumentai įkelti, bet tušti
-        err_msg.append(html.P(_("Your selected document sheet has no required data.")))
-        return Serverside({}), "secondary", err_msg, wrn_msg, "file_upload", ""
-
-    # %% VISĄ SURINKTĄ INFORMACIJĄ SUKELIU Į VIENĄ STRUKTŪRĄ
-    data_final = {
-        # Mazgų duomenys iš PDSA
-        "node_data": {
-            "file_name": pdsa_file_data["file_name"] if pdsa_file_data and ("file_name" in pdsa_file_data) else "",
-            "tbl_sheet_data_orig": df_tbl_orig.to_dicts(),  # PDSA lakšto, aprašančio lenteles, originalus turinys
-            "col_sheet_data_orig": df_col_orig.to_dicts(),  # PDSA lakšto, aprašančio stulpelius, originalus turinys
-            "tbl_sheet_data": df_tbl.to_dicts(),  # PDSA lakšto, aprašančio lenteles, turinys pervadinus stulpelius
-            "col_sheet_data": df_col.to_dicts(),  # PDSA lakšto, aprašančio stulpelius, turinys pervadinus stulpelius
-            "tbl_sheet_renamed_cols": tbl_sheet_renamed_cols,  # PDSA lakšte, aprašančiame lenteles, stulpelių vidiniai pervadinimai
-            "col_sheet_renamed_cols": col_sheet_renamed_cols,  # PDSA lakšte, aprašančiame stulpelius, stulpelių vidiniai pervadinimai
-            "sheet_tbl": pdsa_tbl_sheet,  # PDSA lakšto, aprašančio lenteles, vardas
-            "sheet_col": pdsa_col_sheet,  # PDSA lakšto, aprašančio stulpelius, vardas
-            "list_tbl_tables": pdsa_tbl_tables,  # tikros lentelės iš PDSA lakšto, aprašančio lenteles
-            "list_tbl_tables_empty": list_tbl_tables_empty,  # tuščios lentelės iš PDSA lakšto, aprašančio lenteles
-            "list_col_tables": pdsa_col_tables or [],  # lentelės iš PDSA lakšto, aprašančio stulpelius, gali būti papildyta rodiniais (views)
-            "list_all_tables": pdsa_all_tables,  # visos iš PDSA kartu
-        },
-        # Ryšių duomenys
-        "edge_data": {
-            "file_name": refs_file_data["file_name"] if refs_file_data and ("file_name" in refs_file_data) else "",
-            "ref_sheet_data": df_edges.to_dicts(),  # Ryšių lakšto turinys
-            "ref_sheet_name": refs_sheet,      # ryšių lakšto vardas
-            "ref_source_tbl": ref_source_tbl,  # stulpelis, kuriame pradžių („IŠ“) lentelės
-            "ref_source_col": ref_source_col,  # stulpelis, kuriame pradžių („IŠ“) stulpeliai
-            "ref_target_tbl": ref_target_tbl,  # stulpelis, kuriame galų („Į“) lentelės
-            "ref_target_col": ref_target_col,  # stulpelis, kuriame galų („Į“) stulpeliai
-            "list_all_tables": edge_tables,  # lentelės, kurios panaudotos ryšiuose
-        }
-    }
-
-    # Vardas naršyklės lango antraštei ir dokumentų saugojimui
-    if data_final["node_data"]["file_name"]:
-        doc_name = data_final["node_data"]["file_name"]
-    else:
-        doc_name = data_final["edge_data"]["file_name"]
-    doc_name = str(doc_name).split(";")[0]  # jei buvo keli dokumentai, jie bus atskirti per kabliataškį; imti tik pirmą
-    doc_name, ext = os.path.splitext(doc_name)
-
-    # Sužinoti, kuris mygtukas buvo paspaustas, pvz., „Pateikti“
-    changed_id = [p["prop_id"] for p in callback_context.triggered][0]
-
-    if "button-submit" in changed_id:  # Paspaustas „Pateikti“ mygtukas
-        # Perduoti duomenis naudojimui grafiko kortelėje ir į ją pereiti
-        active_tab = "graph"
-    else:
-        # Perduoti duomenis naudojimui grafiko kortelėje, bet likti pirmoje kortelėje.
-        # active_tab gali neturėti reikšmės darbo pradžioje ar pakeitus kalbą. Tai padeda išlaikyti kortelę
-        active_tab = active_tab or "file_upload"  # jei nėra, pereiti į rinkmenų įkėlimą;
-    return Serverside(data_final), "primary", err_msg, wrn_msg, active_tab, doc_name
+        warnings_list.append(warning_str)
+    return {"list_all_tables": pdsa_all_tables, "warnings": warnings_list}
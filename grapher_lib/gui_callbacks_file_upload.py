@@ -8,10 +8,13 @@ PDSA grapher Dash app callbacks in "File upload" tab for PDSA and refences uploa
 This code is distributed under the MIT License. For more details, see the LICENSE file in the project root.
 """
 
+import uuid
+from dash.exceptions import PreventUpdate
 from dash_extensions.enrich import (
-    Output, Input, State, Serverside, callback, callback_context, dash_table, html, no_update
+    Output, Input, State, Serverside, callback, callback_context, html, no_update
 )
 from grapher_lib import utils as gu
+from grapher_lib import gui_components as gc
 from grapher_lib import utils_file_upload as fu
 
 
@@ -23,35 +26,49 @@ from grapher_lib import utils_file_upload as fu
 @callback(
     Output("memory-uploaded-pdsa", "data"),  # nuskaitytas pasirinktos PDSA rinkmenos turinys
     Output("upload-data-pdsa-label", "children"),  # užrašas apie pasirinktą PDSA rinkmeną
-    Input("upload-data-pdsa", "contents"),  # pasirinktos(-ų) PDSA rinkmenos(-ų) turinys
-    State("upload-data-pdsa", "filename"),  # pasirinktos(-ų) PDSA rinkmenos(-ų) vardas(-ai)
+    Input("upload-data-pdsa", "data"),  # serveryje įrašytos PDSA rinkmenos(-ų) ID ir vardas(-ai)
     State("memory-uploaded-pdsa", "data"),  # žodynas su PDSA duomenimis
-    # Pradėti rodyti eigos juostą, bet jos pabaigus kelti dokumentą nepaslėpti – ją paslėps summarize_submission()
+    # Vykdyti fone, kad ilgas nuskaitymas neužimtų serverio gijos, ir rodyti nuskaitymo eigą pagal lakštus
+    background=True,
+    interval=500,
+    progress=[
+        Output("progress-bar", "value"),
+        Output("progress-bar-label", "children"),
+    ],
+    # Pradėti rodyti eigos juostą, bet jos pabaigus kelti dokumentą nepaslėpti – ją paslėps validate_submission()
     running=[
         (Output("button-submit", "disabled"), True, True),
         (Output("progress-bar", "style"),
          {"visibility": "visible"},
          {"visibility": "visible"},
          ),
+        (Output("progress-bar", "value"), 0, 100),
+        (Output("progress-bar-label", "children"), "", ""),
     ],
+    # Įkėlus kitą rinkmeną, dar vykdomas ankstesnės nuskaitymas nebeaktualus – jį nutraukti (ir išimti iš eilės)
+    cancel=[Input("upload-data-pdsa", "data")],
 )
-def set_pdsa_memory(uploaded_content, list_of_names, pdsa_dict):
+def set_pdsa_memory(set_progress, upload_data, pdsa_dict):
     """
     PDSA rinkmenos įkėlimas.
     Teoriškai galima paduoti kelis, bet praktiškai visada imama pirmoji rinkmena.
-    :param uploaded_content: įkeltų XLSX arba CSV rinkmenų turinys sąrašo pavidalu, kur
-        vienas elementas – vienos rinkmenos base64 turinys.
-    :param list_of_names: įkeltų XLSX arba CSV rinkmenų vardų sąrašas.
+    :param set_progress: foninio kvietimo eigos f-ja, žr. `gu.get_progress_reporter`
+    :param upload_data: per `/upload` maršrutą serveryje įrašytų rinkmenų aprašas
+        {"files": [{"upload_id": "", "filename": ""}], "timestamp": 0}, žr. gui_components.upload_data()
     :param pdsa_dict: žodynas su pdsa duomenimis {"file_data": {lakštas: {"df: df, ""df_columns": []}}}
     :return: naujas refs_dict
     """
-    if uploaded_content is not None:
-        parse_output = fu.parse_file(uploaded_content, list_of_names)
+    uploaded_paths, list_of_names = fu.get_uploaded_files(upload_data)
+    if uploaded_paths:
+        parse_output = fu.parse_file(uploaded_paths, list_of_names, progress=gu.get_progress_reporter(set_progress))
         list_of_names_str = "; ".join(list_of_names)
         if isinstance(parse_output, dict):
             # Sėkmingai įkelti nauji duomenys
             parse_output["file_name"] = list_of_names_str
-            return Serverside(parse_output), html.B(list_of_names_str)
+            parse_output["data_id"] = uuid.uuid4().hex  # pateikimo etapų podėlio raktui
+            encodings = fu.get_file_encodings(parse_output)
+            parse_time = fu.get_parse_time(parse_output)
+            return Serverside(parse_output), gc.uploaded_file_label(list_of_names_str, encodings, parse_time)
         elif isinstance(parse_output, str):
             # Klaida nuskaitant
             return (
@@ -74,26 +91,36 @@ def set_pdsa_memory(uploaded_content, list_of_names, pdsa_dict):
 @callback(
     Output("memory-uploaded-refs", "data"),  # žodynas su ryšių tarp lentelių duomenimis
     Output("upload-data-refs-label", "children"),  # užrašas apie pasirinktą ryšių rinkmeną
-    Input("upload-data-refs", "contents"),  # pasirinktos(-ų) ryšių rinkmenos(-ų) turinys
-    State("upload-data-refs", "filename"),  # pasirinktos(-ų) ryšių rinkmenos(-ų) vardas(-ai)
+    Input("upload-data-refs", "data"),  # serveryje įrašytos ryšių rinkmenos(-ų) ID ir vardas(-ai)
     State("memory-uploaded-refs", "data"),  # žodynas su ryšių tarp lentelių duomenimis
     Input("memory-uploaded-pdsa", "data"),  # nuskaitytas pasirinktos PDSA rinkmenos turinys
-    # Pradėti rodyti eigos juostą, bet jos pabaigus kelti dokumentą nepaslėpti – ją paslėps summarize_submission()
+    # Vykdyti fone, kad ilgas nuskaitymas neužimtų serverio gijos, ir rodyti nuskaitymo eigą pagal lakštus
+    background=True,
+    interval=500,
+    progress=[
+        Output("progress-bar", "value"),
+        Output("progress-bar-label", "children"),
+    ],
+    # Pradėti rodyti eigos juostą, bet jos pabaigus kelti dokumentą nepaslėpti – ją paslėps validate_submission()
     running=[
         (Output("button-submit", "disabled"), True, True),
         (Output("progress-bar", "style"),
          {"visibility": "visible"},
          {"visibility": "visible"},
         ),
+        (Output("progress-bar", "value"), 0, 100),
+        (Output("progress-bar-label", "children"), "", ""),
     ],
+    # Įkėlus kitą rinkmeną, dar vykdomas ankstesnės nuskaitymas nebeaktualus – jį nutraukti (ir išimti iš eilės)
+    cancel=[Input("upload-data-refs", "data")],
 )
-def set_refs_memory(uploaded_content, list_of_names, refs_dict, pdsa_dict):
+def set_refs_memory(set_progress, upload_data, refs_dict, pdsa_dict):
     """
     Ryšių (pvz., sql_2_references.xlsx) rinkmenos įkėlimas.
     Teoriškai galima paduoti kelis, bet praktiškai visada imama pirmoji rinkmena.
-    :param uploaded_content: įkeltų XLSX arba CSV rinkmenų turinys sąrašo pavidalu, kur
-        vienas elementas – vienos rinkmenos base64 turinys.
-    :param list_of_names: įkeltų XLSX arba CSV rinkmenų vardų sąrašas.
+    :param set_progress: foninio kvietimo eigos f-ja, žr. `gu.get_progress_reporter`
+    :param upload_data: per `/upload` maršrutą serveryje įrašytų rinkmenų aprašas
+        {"files": [{"upload_id": "", "filename": ""}], "timestamp": 0}, žr. gui_components.upload_data()
     :param refs_dict: (nebūtinas) žodynas su ryšių tarp lentelių duomenimis {"file_data": {lakštas: {"df: df, ""df_columns": []}}}
     :param pdsa_dict: (nebūtinas) žodynas su pdsa duomenimis {"file_data": {lakštas: {"df: df, ""df_columns": []}}},
         kuris gali būti naudojamas jei nėra kitų duomenų, o PDSA turi "refs" lakštą, kas leidžia vienu įkėlimu
@@ -101,14 +128,18 @@ def set_refs_memory(uploaded_content, list_of_names, refs_dict, pdsa_dict):
     :return: naujas refs_dict
     """
     changed_id = [p["prop_id"] for p in callback_context.triggered][0]  # Sužinoti, kuris mygtukas buvo paspaustas
-    if (changed_id == "upload-data-refs.contents") and (uploaded_content is not None):
+    uploaded_paths, list_of_names = fu.get_uploaded_files(upload_data)
+    if (changed_id == "upload-data-refs.data") and uploaded_paths:
         # Įkelti nauji ryšių duomenys
-        parse_output = fu.parse_file(uploaded_content, list_of_names)
+        parse_output = fu.parse_file(uploaded_paths, list_of_names, progress=gu.get_progress_reporter(set_progress))
         list_of_names_str = "; ".join(list_of_names)
         if isinstance(parse_output, dict):
             # Sėkmingai į įkelti nauji duomenys
             parse_output["file_name"] = list_of_names_str
-            return Serverside(parse_output), html.B(list_of_names_str)
+            parse_output["data_id"] = uuid.uuid4().hex  # pateikimo etapų podėlio raktui
+            encodings = fu.get_file_encodings(parse_output)
+            parse_time = fu.get_parse_time(parse_output)
+            return Serverside(parse_output), gc.uploaded_file_label(list_of_names_str, encodings, parse_time)
         elif isinstance(parse_output, str):
             # Klaida nuskaitant
             return (
@@ -120,11 +151,14 @@ def set_refs_memory(uploaded_content, list_of_names, refs_dict, pdsa_dict):
             )
     elif (
             isinstance(pdsa_dict, dict) and ("file_data" in pdsa_dict) and ("refs" in pdsa_dict["file_data"]) and
-            ("df" in pdsa_dict["file_data"]["refs"]) and (pdsa_dict["file_data"]["refs"]["df"])
+            (not fu.is_sheet_empty(pdsa_dict, "refs"))
         ):
         # Galimai naudotojas kaip PDSA įkėlė JSON arba DBML
         file_name = pdsa_dict["file_name"] if "file_name" in pdsa_dict else None
         refs_dict = {"file_name": file_name, "file_data": {"refs": pdsa_dict["file_data"]["refs"]}}
+        refs_dict["data_id"] = pdsa_dict.get("data_id")
+        if fu.get_session_info(pdsa_dict):
+            refs_dict["session"] = pdsa_dict["session"]  # įkelta darbo sesija
         return Serverside(refs_dict), html.B(file_name) if file_name else _("Previously uploaded data")
     elif isinstance(refs_dict, dict) and refs_dict:
         # Panaudoti iš atminties; atmintyje galėjo likti, jei naudotojas pakeitė kalbą arbą iš naujo atidarė puslapį
@@ -135,6 +169,105 @@ def set_refs_memory(uploaded_content, list_of_names, refs_dict, pdsa_dict):
     return Serverside({}), no_update
 
 
+# PDSA
+@callback(
+    Output("memory-loaded-pdsa-sheets", "data"),  # fone visiškai nuskaityti PDSA lakštai
+    Input("radio-sheet-tbl", "value"),  # Naudotojo pasirinktas PDSA lentelių lakštas
+    Input("radio-sheet-col", "value"),  # Naudotojo pasirinktas PDSA stulpelių lakštas
+    State("memory-uploaded-pdsa", "data"),  # žodynas su PDSA duomenimis
+    # Didelius lakštus nuskaityti fone, kad neužimtų serverio gijos, ir rodyti nuskaitymo eigą
+    background=True,
+    interval=500,
+    progress=[
+        Output("progress-bar", "value"),
+        Output("progress-bar-label", "children"),
+    ],
+    running=[
+        (Output("button-submit", "disabled"), True, False),
+        (Output("progress-bar", "style"),
+         {"visibility": "visible"},
+         {"visibility": "hidden"},
+         ),
+        (Output("progress-bar", "value"), 0, 100),
+        (Output("progress-bar-label", "children"), "", ""),
+    ],
+    # Įkėlus kitą rinkmeną, ankstesnės lakštų nuskaitymas nebeaktualus
+    cancel=[Input("upload-data-pdsa", "data")],
+    prevent_initial_call=True,
+)
+def load_selected_pdsa_sheets(set_progress, pdsa_tbl_sheet, pdsa_col_sheet, pdsa_dict):
+    """
+    Pasirinktų PDSA lakštų, kurių įkeliant buvo nuskaitytos tik pirmosios eilutės, nuskaitymas.
+    :param set_progress: foninio kvietimo eigos f-ja, žr. `gu.get_progress_reporter`
+    :param pdsa_tbl_sheet: PDSA lentelių lakšto vardas
+    :param pdsa_col_sheet: PDSA stulpelių lakšto vardas
+    :param pdsa_dict: žodynas su pdsa duomenimis {"file_data": {lakštas: {"df: df, ""df_columns": []}}}
+    :return: nuskaitytų lakštų aprašas, žr. `load_selected_sheets`
+    """
+    return load_selected_sheets(set_progress, pdsa_dict, [pdsa_tbl_sheet, pdsa_col_sheet])
+
+
+# Ryšiai tarp lentelių
+@callback(
+    Output("memory-loaded-refs-sheets", "data"),  # fone visiškai nuskaityti ryšių lakštai
+    Input("radio-sheet-refs", "value"),  # Pasirinktas ryšių lakštas
+    State("memory-uploaded-refs", "data"),  # žodynas su ryšių tarp lentelių duomenimis
+    # Didelius lakštus nuskaityti fone, kad neužimtų serverio gijos, ir rodyti nuskaitymo eigą
+    background=True,
+    interval=500,
+    progress=[
+        Output("progress-bar", "value"),
+        Output("progress-bar-label", "children"),
+    ],
+    running=[
+        (Output("button-submit", "disabled"), True, False),
+        (Output("progress-bar", "style"),
+         {"visibility": "visible"},
+         {"visibility": "hidden"},
+         ),
+        (Output("progress-bar", "value"), 0, 100),
+        (Output("progress-bar-label", "children"), "", ""),
+    ],
+    # Įkėlus kitą rinkmeną, ankstesnės lakštų nuskaitymas nebeaktualus
+    cancel=[Input("upload-data-refs", "data")],
+    prevent_initial_call=True,
+)
+def load_selected_refs_sheets(set_progress, refs_sheet, refs_dict):
+    """
+    Pasirinkto ryšių lakšto, kurio įkeliant buvo nuskaitytos tik pirmosios eilutės, nuskaitymas.
+    :param set_progress: foninio kvietimo eigos f-ja, žr. `gu.get_progress_reporter`
+    :param refs_sheet: pasirinktas ryšių lakštas
+    :param refs_dict: žodynas su ryšių tarp lentelių duomenimis {"file_data": {lakštas: {"df: df, ""df_columns": []}}}
+    :return: nuskaitytų lakštų aprašas, žr. `load_selected_sheets`
+    """
+    return load_selected_sheets(set_progress, refs_dict, [refs_sheet])
+
+
+def load_selected_sheets(set_progress, dict_data, sheets):
+    """
+    Pagalbinė f-ja pasirinktiems lakštams nuskaityti fone. Visas lakštas įrašomas į nuskaitymų podėlį, iš kurio
+    jį greitai gauna ir ne foniniai kvietimai (žr. `fu.is_sheet_loaded`), tad jų nebereikia riboti pirmosiomis eilutėmis.
+    :param set_progress: foninio kvietimo eigos f-ja, žr. `gu.get_progress_reporter`
+    :param dict_data: žodynas, kaip aprašyta prie `fu.parse_file` f-jos
+    :param sheets: pasirinktų lakštų vardai
+    :return: {"data_id": duomenų ID, "sheets": [nuskaityti lakštai]} – tik kaip kitų kvietimų paleidiklis
+    """
+    if not (isinstance(dict_data, dict) and isinstance(dict_data.get("file_data"), dict)):
+        raise PreventUpdate
+    sheets = [
+        sheet for sheet in dict.fromkeys(sheets)
+        if (sheet in dict_data["file_data"]) and not fu.is_sheet_loaded(dict_data, sheet)
+    ]
+    if not sheets:
+        raise PreventUpdate  # nėra ką nuskaityti – ne foniniai kvietimai jau turi visus lakštus
+    progress = gu.get_progress_reporter(set_progress)
+    for i, sheet in enumerate(sheets):
+        progress(i, len(sheets), _("Reading sheet %s") % sheet)
+        fu.get_sheet_df(dict_data, sheet)
+    progress(len(sheets), len(sheets), "")
+    return {"data_id": dict_data.get("data_id"), "sheets": sheets}
+
+
 # PDSA
 @callback(
     Output("pdsa-sheets-selection", "style"),  # PDSA lakšto pasirinkimo blokas
@@ -176,6 +309,11 @@ def set_pdsa_sheet_radios(pdsa_dict, div_style):
                 preselect_col_sheet = next(
                     (sheet for sheet in sheets if sheet.endswith("columns")), None
                 )
+        session = fu.get_session_info(pdsa_dict)
+        if session:
+            # Įkelta darbo sesija – parinkti tuos pačius lakštus, kaip ją įrašant
+            preselect_tbl_sheet = session["mapping"]["sheet_tbl"]
+            preselect_col_sheet = session["mapping"]["sheet_col"]
 
         # Nerodyti lakštų pasirinkimo, jei importuota iš JSON arba DBML
         visibility = set(sheets) != {"tables", "columns", "refs"}
@@ -212,6 +350,9 @@ def set_refs_sheet_radios(refs_dict, div_style):
                     "refs", "references", "sql_2_references", "sql_2_references(in)", "SQL lentelių ryšiai", "sql_2"
                 ] if sheet in sheets), None
             )
+        session = fu.get_session_info(refs_dict)
+        if session:
+            preselect_refs_sheet = session["mapping"]["ref_sheet_name"]  # įkelta darbo sesija
         visibility = (len(sheets) > 1) and set(sheets) != {"tables", "columns", "refs"}
         div_style = gu.change_style_for_visibility(visibility, div_style)
         return div_style, sheet_options, preselect_refs_sheet
@@ -264,16 +405,21 @@ def set_pdsa_columns_sheet_names(sheet_name, div_style):
     Input("memory-uploaded-pdsa", "data"),
     Input("radio-sheet-tbl", "value"),  # Naudotojo pasirinktas PDSA lentelių lakštas
     State("radio-sheet-col", "value"),  # Naudotojo pasirinktas PDSA stulpelių lakštas
+    Input("memory-loaded-pdsa-sheets", "data"),  # tik kaip f-jos paleidiklis fone nuskaičius lakštus
 )
-def create_pdsa_tables_sheet_column_dropdowns_for_graph(pdsa_dict, pdsa_tbl_sheet, pdsa_col_sheet):
+def create_pdsa_tables_sheet_column_dropdowns_for_graph(pdsa_dict, pdsa_tbl_sheet, pdsa_col_sheet, loaded_sheets):  # noqa
     """
     Sukurti pasirinkimus, kuriuos PDSA lentelių lakšto stulpelius rodyti pačiuose grafikuose
     :param pdsa_dict: žodynas su pdsa duomenimis {"file_data": {lakštas: {"df: df, ""df_columns": []}}}
     :param pdsa_tbl_sheet: PDSA lentelių lakšto vardas
     :param pdsa_col_sheet: PDSA stulpelių lakšto vardas
+    :param loaded_sheets: fone nuskaityti lakštai – tik kaip f-jos paleidiklis
     """
-    columns = fu.get_sheet_columns(pdsa_dict, pdsa_tbl_sheet, not_null_type=True)  # netušti stulpeliai
-    columns_str = fu.get_sheet_columns(pdsa_dict, pdsa_tbl_sheet, string_type=True, not_null_type=True)  # tekstiniai
+    # Kol didelis lakštas fone nenuskaitytas (žr. `load_selected_pdsa_sheets`), stulpeliai tikrinami pagal pradžią
+    columns = fu.get_sheet_columns(pdsa_dict, pdsa_tbl_sheet, not_null_type=True, load=False)  # netušti stulpeliai
+    columns_str = fu.get_sheet_columns(  # tekstiniai
+        pdsa_dict, pdsa_tbl_sheet, string_type=True, not_null_type=True, load=False
+    )
     columns_not_str = list(set(columns) - set(columns_str))  # ne tekstiniai stulpeliai
     columns_not_str = columns_not_str or columns
 
@@ -302,6 +448,14 @@ def create_pdsa_tables_sheet_column_dropdowns_for_graph(pdsa_dict, pdsa_tbl_shee
         (col for col in ["selected", "checkbox", "Ar vertinga?"] if col in columns), None
     )
 
+    session = fu.get_session_info(pdsa_dict)
+    if session and (pdsa_tbl_sheet == session["mapping"]["sheet_tbl"]):
+        # Įkelta darbo sesija – parinkti tuos pačius stulpelius, kaip ją įrašant
+        renamed_cols = session["mapping"]["tbl_sheet_renamed_cols"]
+        tables_col, comments_col, n_records_col, selected_col = [
+            renamed_cols.get(col) for col in ["table", "comment", "n_records", "selected"]
+        ]
+
     return columns_str, tables_col, columns, comments_col, columns_not_str, n_records_col, columns, selected_col
 
 
@@ -326,14 +480,16 @@ def change_pdsa_tables_excluding_checkbox_visibility(n_records_col, style):
     Output("dropdown-sheet-tbl", "value"),
     Input("memory-uploaded-pdsa", "data"),  # žodynas su PDSA duomenimis
     Input("radio-sheet-tbl", "value"),  # Naudotojo pasirinktas PDSA lentelių lakštas
+    Input("memory-loaded-pdsa-sheets", "data"),  # tik kaip f-jos paleidiklis fone nuskaičius lakštus
 )
-def create_pdsa_tables_sheet_column_dropdowns_for_info(pdsa_dict, pdsa_tbl_sheet):
+def create_pdsa_tables_sheet_column_dropdowns_for_info(pdsa_dict, pdsa_tbl_sheet, loaded_sheets):  # noqa
     """
     Sukurti pasirinkimus, kuriuos PDSA lentelių lakšto stulpelius norite pasilikti švieslentėje
     :param pdsa_dict: žodynas su pdsa duomenimis {"file_data": {lakštas: {"df: df, ""df_columns": []}}}
     :param pdsa_tbl_sheet: PDSA lentelių lakšto vardas
+    :param loaded_sheets: fone nuskaityti lakštai – tik kaip f-jos paleidiklis
     """
-    columns = fu.get_sheet_columns(pdsa_dict, pdsa_tbl_sheet)
+    columns = fu.get_sheet_columns(pdsa_dict, pdsa_tbl_sheet, load=False)
     return columns, columns
 
 
@@ -353,16 +509,21 @@ def create_pdsa_tables_sheet_column_dropdowns_for_info(pdsa_dict, pdsa_tbl_sheet
     Input("memory-uploaded-pdsa", "data"),
     Input("radio-sheet-col", "value"),  # Naudotojo pasirinktas PDSA stulpelių lakštas
     State("pdsa-tables-table", "value"),
+    Input("memory-loaded-pdsa-sheets", "data"),  # tik kaip f-jos paleidiklis fone nuskaičius lakštus
 )
-def create_pdsa_columns_sheet_column_dropdowns_for_graph(pdsa_dict, pdsa_col_sheet, tbl_tables_col):
+def create_pdsa_columns_sheet_column_dropdowns_for_graph(pdsa_dict, pdsa_col_sheet, tbl_tables_col, loaded_sheets):  # noqa
     """
     Sukurti pasirinkimus, kuriuos PDSA lentelių lakšto stulpelius rodyti pačiuose grafikuose
     :param pdsa_dict: žodynas su pdsa duomenimis {"file_data": {lakštas: {"df: df, ""df_columns": []}}}
     :param pdsa_col_sheet: PDSA stulpelių lakšto vardas
     :param tbl_tables_col: PDSA lentelių lakšte parinkto lentelių stulpelio vardas
+    :param loaded_sheets: fone nuskaityti lakštai – tik kaip f-jos paleidiklis
     """
-    columns = fu.get_sheet_columns(pdsa_dict, pdsa_col_sheet, not_null_type=True)  # netušti stulpeliai
-    columns_str = fu.get_sheet_columns(pdsa_dict, pdsa_col_sheet, string_type=True, not_null_type=True)  # tekstiniai
+    # Kol didelis lakštas fone nenuskaitytas (žr. `load_selected_pdsa_sheets`), stulpeliai tikrinami pagal pradžią
+    columns = fu.get_sheet_columns(pdsa_dict, pdsa_col_sheet, not_null_type=True, load=False)  # netušti stulpeliai
+    columns_str = fu.get_sheet_columns(  # tekstiniai
+        pdsa_dict, pdsa_col_sheet, string_type=True, not_null_type=True, load=False
+    )
 
     # PDSA lakšto stulpelis, kuriame surašyti duombazės lentelių vardai
     tables_col = next(
@@ -403,6 +564,14 @@ def create_pdsa_columns_sheet_column_dropdowns_for_graph(pdsa_dict, pdsa_col_she
     else:
         alias_col = "alias" if ("alias" in columns_str) else None
 
+    session = fu.get_session_info(pdsa_dict)
+    if session and (pdsa_col_sheet == session["mapping"]["sheet_col"]):
+        # Įkelta darbo sesija – parinkti tuos pačius stulpelius, kaip ją įrašant
+        renamed_cols = session["mapping"]["col_sheet_renamed_cols"]
+        tables_col, columns_col, primary_col, comments_col, checkbox_col, alias_col = [
+            renamed_cols.get(col) for col in ["table", "column", "is_primary", "comment", "checkbox", "alias"]
+        ]
+
     # Galimi alt. vardo pasirinkimai:
     alias_label_suffix1 = _(" (standardized)")  # apdorojimui su gu.snake_case()
     alias_label_suffix2 = _(" (standardized, shorter)")  # apdorojimui su gu.snake_case_short()
@@ -426,74 +595,135 @@ def create_pdsa_columns_sheet_column_dropdowns_for_graph(pdsa_dict, pdsa_col_she
     Output("dropdown-sheet-col", "value"),
     Input("memory-uploaded-pdsa", "data"),
     Input("radio-sheet-col", "value"),  # Naudotojo pasirinktas PDSA stulpelių lakštas
+    Input("memory-loaded-pdsa-sheets", "data"),  # tik kaip f-jos paleidiklis fone nuskaičius lakštus
 )
-def create_pdsa_columns_sheet_column_dropdowns_for_info(pdsa_dict, pdsa_col_sheet):
+def create_pdsa_columns_sheet_column_dropdowns_for_info(pdsa_dict, pdsa_col_sheet, loaded_sheets):  # noqa
     """
     Sukurti pasirinkimus, kuriuos PDSA stulpelių lakšto stulpelius norite pasilikti švieslentėje
     :param pdsa_dict: žodynas su pdsa duomenimis {"file_data": {lakštas: {"df: df, ""df_columns": []}}}
     :param pdsa_col_sheet: PDSA stulpelių lakšto vardas
+    :param loaded_sheets: fone nuskaityti lakštai – tik kaip f-jos paleidiklis
     """
-    columns = fu.get_sheet_columns(pdsa_dict, pdsa_col_sheet)
+    columns = fu.get_sheet_columns(pdsa_dict, pdsa_col_sheet, load=False)
     return columns, columns
 
 
 # PDSA
 @callback(
-    Output("sheet-tbl-preview", "children"),
+    Output("sheet-tbl-preview-table", "data"),
+    Output("sheet-tbl-preview-table", "columns"),
+    Output("sheet-tbl-preview-table", "page_count"),
+    Output("sheet-tbl-preview-table", "page_current"),
     Input("memory-uploaded-pdsa", "data"),
     Input("radio-sheet-tbl", "value"),
     Input("dropdown-sheet-tbl", "value"),
+    Input("sheet-tbl-preview-table", "page_current"),
+    Input("sheet-tbl-preview-table", "sort_by"),
+    State("sheet-tbl-preview-table", "page_size"),
+    Input("memory-loaded-pdsa-sheets", "data"),  # tik kaip f-jos paleidiklis fone nuskaičius lakštus
 )
 def create_preview_of_pdsa_tbl_sheet(
-    pdsa_dict, pdsa_tbl_sheet, sheet_tbl_selection
+    pdsa_dict, pdsa_tbl_sheet, sheet_tbl_selection, page_current, sort_by, page_size, loaded_sheets  # noqa
 ):
     """
     PDSA lakšto apie lenteles peržiūra
     :param pdsa_dict: žodynas su pdsa duomenimis {"file_data": {lakštas: {"df: df, ""df_columns": []}}}
     :param pdsa_tbl_sheet: PDSA lentelių lakšto vardas
     :param sheet_tbl_selection: pasirinktieji PDSA lentelių lakšto stulpeliai išplėstinei informacijai
+    :param page_current: rodomo puslapio numeris
+    :param sort_by: rikiavimo aprašas
+    :param page_size: eilučių skaičius puslapyje
+    :param loaded_sheets: fone nuskaityti lakštai – tik kaip f-jos paleidiklis
+    :return: puslapio eilutės, stulpeliai, puslapių skaičius, rodomo puslapio numeris
     """
-    if (
-        (not pdsa_dict) or (not sheet_tbl_selection) or ("file_data" not in pdsa_dict) or
-        (pdsa_tbl_sheet not in pdsa_dict["file_data"]) or ("df" not in pdsa_dict["file_data"][pdsa_tbl_sheet])
-    ):
-        return dash_table.DataTable()
-    df_tbl = pdsa_dict["file_data"][pdsa_tbl_sheet]["df"]
-    children_df_tbl = dash_table.DataTable(
-        df_tbl,
-        [{"name": i, "id": i} for i in sheet_tbl_selection],
-        style_table={"overflowX": "scroll"},
-        page_size=5,
-        sort_action="native",
-    )
-    return children_df_tbl
+    return get_sheet_preview_page(pdsa_dict, pdsa_tbl_sheet, sheet_tbl_selection, page_current, sort_by, page_size)
 
 
 # PDSA
 @callback(
-    Output("sheet-col-preview", "children"),
+    Output("sheet-col-preview-table", "data"),
+    Output("sheet-col-preview-table", "columns"),
+    Output("sheet-col-preview-table", "page_count"),
+    Output("sheet-col-preview-table", "page_current"),
     Input("memory-uploaded-pdsa", "data"),
     Input("radio-sheet-col", "value"),
     Input("dropdown-sheet-col", "value"),
+    Input("sheet-col-preview-table", "page_current"),
+    Input("sheet-col-preview-table", "sort_by"),
+    State("sheet-col-preview-table", "page_size"),
+    Input("memory-loaded-pdsa-sheets", "data"),  # tik kaip f-jos paleidiklis fone nuskaičius lakštus
 )
-def create_preview_of_pdsa_col_sheet(pdsa_dict, pdsa_col_sheet, sheet_col_selection):
+def create_preview_of_pdsa_col_sheet(
+    pdsa_dict, pdsa_col_sheet, sheet_col_selection, page_current, sort_by, page_size, loaded_sheets  # noqa
+):
     """
     PDSA lakšto apie stulpelius peržiūra
     :param pdsa_dict: žodynas su pdsa duomenimis {"file_data": {lakštas: {"df: df, ""df_columns": []}}}
     :param pdsa_col_sheet: PDSA stulpelių lakšto vardas
     :param sheet_col_selection: pasirinktieji PDSA stulpelių lakšto stulpeliai išplėstinei informacijai
+    :param page_current: rodomo puslapio numeris
+    :param sort_by: rikiavimo aprašas
+    :param page_size: eilučių skaičius puslapyje
+    :param loaded_sheets: fone nuskaityti lakštai – tik kaip f-jos paleidiklis
+    :return: puslapio eilutės, stulpeliai, puslapių skaičius, rodomo puslapio numeris
     """
-    if not pdsa_dict or not sheet_col_selection:
-        return dash_table.DataTable()
-    df_col = pdsa_dict["file_data"][pdsa_col_sheet]["df"]
-    children_df_col = dash_table.DataTable(
-        df_col,
-        [{"name": i, "id": i} for i in sheet_col_selection],
-        style_table={"overflowX": "scroll"},
-        page_size=10,
-        sort_action="native",
-    )
-    return children_df_col
+    return get_sheet_preview_page(pdsa_dict, pdsa_col_sheet, sheet_col_selection, page_current, sort_by, page_size)
+
+
+# Ryšiai tarp lentelių
+@callback(
+    Output("refs-tbl-preview-table", "data"),
+    Output("refs-tbl-preview-table", "columns"),
+    Output("refs-tbl-preview-table", "page_count"),
+    Output("refs-tbl-preview-table", "page_current"),
+    Input("memory-uploaded-refs", "data"),  # žodynas su ryšių tarp lentelių duomenimis
+    Input("radio-sheet-refs", "value"),  # Pasirinktas ryšių lakštas
+    Input("refs-tbl-preview-table", "page_current"),
+    Input("refs-tbl-preview-table", "sort_by"),
+    State("refs-tbl-preview-table", "page_size"),
+    Input("memory-loaded-refs-sheets", "data"),  # tik kaip f-jos paleidiklis fone nuskaičius lakštus
+)
+def create_preview_of_refs_sheet(refs_data, refs_sheet, page_current, sort_by, page_size, loaded_sheets):  # noqa
+    """
+    Ryšių lakšto peržiūra
+    :param refs_data: nuskaitytas pasirinktos ryšių XLSX ar CSV rinkmenos turinys
+    :param refs_sheet: pasirinktas ryšių lakštas
+    :param page_current: rodomo puslapio numeris
+    :param sort_by: rikiavimo aprašas
+    :param page_size: eilučių skaičius puslapyje
+    :param loaded_sheets: fone nuskaityti lakštai – tik kaip f-jos paleidiklis
+    :return: puslapio eilutės, stulpeliai, puslapių skaičius, rodomo puslapio numeris
+    """
+    columns = fu.get_sheet_columns(refs_data, refs_sheet, load=False)  # visi stulpeliai
+    return get_sheet_preview_page(refs_data, refs_sheet, columns, page_current, sort_by, page_size)
+
+
+def get_sheet_preview_page(dict_data, sheet, selected_columns, page_current, sort_by, page_size):
+    """
+    Pagalbinė f-ja lakšto peržiūros puslapiui gauti: į naršyklę siunčiamos tik rodomo puslapio eilutės.
+    Pasikeitus pačiam lakštui ar rodomiems stulpeliams, grįžtama į pirmą puslapį. Kol didelis lakštas fone
+    nenuskaitytas (žr. `load_selected_sheets`), rodomos tik pirmosios jo eilutės.
+    :param dict_data: žodynas, kaip aprašyta prie `parse_file` f-jos
+    :param sheet: lakšto vardas
+    :param selected_columns: rodomi lakšto stulpeliai
+    :param page_current: rodomo puslapio numeris
+    :param sort_by: rikiavimo aprašas
+    :param page_size: eilučių skaičius puslapyje
+    :return: puslapio eilutės, stulpeliai, puslapių skaičius, rodomo puslapio numeris
+    """
+    if (
+        (not dict_data) or (not selected_columns) or ("file_data" not in dict_data) or
+        (sheet not in dict_data["file_data"])
+    ):
+        return [], [], 0, 0
+    changed_id = [p["prop_id"] for p in callback_context.triggered][0]
+    if not changed_id.endswith((".page_current", ".sort_by")):
+        page_current = 0
+    df = fu.get_sheet_df(dict_data, sheet, load=False)
+    df = df.select([col for col in selected_columns if col in df.columns])  # tik rodomi stulpeliai
+    page_data, page_count = fu.get_df_page(df, page_current, page_size, sort_by)
+    columns = [{"name": i, "id": i} for i in selected_columns]
+    return page_data, columns, page_count, min(page_current or 0, max(page_count - 1, 0))
 
 
 # Ryšiai tarp lentelių
@@ -506,19 +736,21 @@ def create_preview_of_pdsa_col_sheet(pdsa_dict, pdsa_col_sheet, sheet_col_select
     Output("ref-target-tables", "value"),
     Output("ref-target-columns", "options"),
     Output("ref-target-columns", "value"),
-    Output("refs-tbl-preview", "children"),
     Input("memory-uploaded-refs", "data"),  # žodynas su ryšių tarp lentelių duomenimis
     Input("radio-sheet-refs", "value"),  # Pasirinktas ryšių lakštas
+    Input("memory-loaded-refs-sheets", "data"),  # tik kaip f-jos paleidiklis fone nuskaičius lakštus
 )
-def create_refs_dropdowns_and_preview(refs_data, refs_sheet):
+def create_refs_dropdowns(refs_data, refs_sheet, loaded_sheets):  # noqa
     """
     Galimų naudotojui pasirinkimų sukūrimas pagal įkeltą ryšių dokumentą.
     :param refs_data: nuskaitytas pasirinktos ryšių XLSX ar CSV rinkmenos turinys
     :param refs_sheet: pasirinktas ryšių lakštas
+    :param loaded_sheets: fone nuskaityti lakštai – tik kaip f-jos paleidiklis
     """
     # Jei refs_data yra None arba tuščias - dar neįkelta; jei string – įkėlimo klaida
-    columns = fu.get_sheet_columns(refs_data, refs_sheet)  # visi stulpeliai
-    columns_str = fu.get_sheet_columns(refs_data, refs_sheet, string_type=True, not_null_type=True)  # tekstiniai
+    columns_str = fu.get_sheet_columns(  # tekstiniai
+        refs_data, refs_sheet, string_type=True, not_null_type=True, load=False
+    )
     if columns_str:
         # Numatytieji vardai stulpelių, kuriuose yra LENTELĖS, naudojančios IŠORINIUS raktus
         preselected_source_tables = next(
@@ -555,22 +787,20 @@ def create_refs_dropdowns_and_preview(refs_data, refs_sheet):
              ), None
         )
 
-        df = refs_data["file_data"][refs_sheet]["df"]
-
-        children_df_tbl = dash_table.DataTable(
-            df,
-            [{"name": i, "id": i} for i in columns],
-            style_table={"overflowX": "scroll"},
-            page_size=10,
-            sort_action="native",
-        )
+        session = fu.get_session_info(refs_data)
+        if session and (refs_sheet == session["mapping"]["ref_sheet_name"]):
+            # Įkelta darbo sesija – parinkti tuos pačius stulpelius, kaip ją įrašant
+            renamed_cols = session["mapping"]["ref_renamed_cols"]
+            (
+                preselected_source_tables, preselected_source_columns,
+                preselected_target_tables, preselected_target_columns
+            ) = [renamed_cols[col] for col in ["ref_source_tbl", "ref_source_col", "ref_target_tbl", "ref_target_col"]]
 
         return (
             columns_str, preselected_source_tables,
             columns_str, preselected_source_columns,
             columns_str, preselected_target_tables,
             columns_str, preselected_target_columns,
-            children_df_tbl
         )
     else:
-        return [], None, [], None, [], None, [], None, dash_table.DataTable(style_table={"overflowX": "scroll"})
+        return [], None, [], None, [], None, [], None
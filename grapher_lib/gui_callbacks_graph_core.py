@@ -13,6 +13,7 @@ from dash_extensions.enrich import (
     Output, Input, State, callback, callback_context, dash_table, no_update
 )
 from grapher_lib import utils as gu
+from grapher_lib import utils_graph as ug
 import csv
 from io import StringIO
 import fnmatch
@@ -83,11 +84,13 @@ def set_dropdown_tables_for_selected_table_cols_info(data_submitted):
     Input("draw-tables-common", "n_clicks"),  # Pagal PDSA lentelių lakštą, kurios turi ryšių
     Input("draw-tables-all", "n_clicks"),  # Visos visos
     Input("draw-tables-auto", "n_clicks"),  # Automatiškai parinkti
+    Input("dropdown-partitions", "value"),  # Silpnai jungioji komponentė arba bendruomenė
 )
 def set_dropdown_tables_for_graph(
     old_tables, data_submitted, pdsa_tbl_exclude_empty, key_press,
     selected_nodes_in_graph_id, current_dropdown_tables_vals, current_dropdown_tables_opts,
-    _dtr, _dtp, _dtc, _dtl, _dta  # noqa
+    _dtr, _dtp, _dtc, _dtl, _dta,  # noqa
+    partition_value=None
 ):
     """
     Nustatyti galimus pasirinkimus braižytinoms lentelėms.
@@ -99,6 +102,7 @@ def set_dropdown_tables_for_graph(
     :param selected_nodes_in_graph_id: pele pažymėtų mazgų sąrašas
     :param current_dropdown_tables_vals: dabartinis lentelių pasirinkimas
     :param current_dropdown_tables_opts: dabartinis lentelių galimas sąrašas
+    :param partition_value: braižytina grafo dalis, pvz., "component:0" arba "community:3" (žr. `set_dropdown_partitions`)
     :return: "dropdown-tables" galimų pasirinkimų sąrašas ir iš anksto parinktos reikšmės
     """
     # Tikrinimas
@@ -138,16 +142,15 @@ def set_dropdown_tables_for_graph(
     # Visų visų lentelių sąrašas - tiek iš PDSA, tiek iš ryšių dokumento
     tables_all = sorted(list(set(tables_pdsa) | set(tables_refs)))
 
-    # Ryšiai
-    df_edges = pl.DataFrame(data_submitted["edge_data"]["ref_sheet_data"], infer_schema_length=None)
+    # Ryšiai ir jų grafo indeksas su iš anksto apskaičiuotais lentelių rodikliais
+    df_edges = gu.to_polars_df(data_submitted["edge_data"]["ref_sheet_data"], gu.EDGES_SCHEMA)
     if df_edges.height == 0:  # jei nėra eilučių, nėra ir reikalingų stulpelių struktūros
-        df_edges = pl.DataFrame(schema={
-            "source_tbl": pl.Utf8, "source_col": pl.Utf8, "target_tbl": pl.Utf8, "target_col": pl.Utf8
-        })
+        df_edges = pl.DataFrame(schema=gu.EDGES_SCHEMA)
+    graph_index = ug.get_graph_index(data_submitted["edge_data"])
 
     # Iš PDSA susijungiančios lentelės
     tables_pdsa_refs_intersect = list(set(tables_pdsa_real) & set(tables_refs))
-    tables_pdsa_refs_intersect = gu.remove_orphaned_nodes_from_sublist(tables_pdsa_refs_intersect, df_edges)
+    tables_pdsa_refs_intersect = ug.remove_orphaned_tables(graph_index, tables_pdsa_refs_intersect)
 
     def get_interconnected_tables(df_edges1, excludable_tables):
         # Gauti susijungiančias lenteles. Netinka imti tiesiog `tables_refs`, nes tarp jų gali būti nuorodos į save
@@ -158,7 +161,13 @@ def set_dropdown_tables_for_graph(
     # Pagal naudotojo pasirinkimą arba automatiškai žymėti lenteles piešimui.
     # Atsižvelgimas į naudotojo pasirinkimus turi būti išdėstytas aukščiau nei automatiniai
     preselected_tables = []  # Numatyta laikina tuščia reikšmė išvedimui
-    if "draw-tables-all.n_clicks" in changed_ids:
+    if ("dropdown-partitions.value" in changed_ids) and partition_value:
+        # visos pasirinktos silpnai jungiosios komponentės arba bendruomenės lentelės
+        partition, number = partition_value.split(":")
+        preselected_tables = list(
+            set(ug.get_partition_tables(graph_index, partition, int(number))) - set(tables_excludable)
+        )
+    elif "draw-tables-all.n_clicks" in changed_ids:
         # visos visos lentelės
         preselected_tables = tables_all
     elif "draw-tables-pdsa.n_clicks" in changed_ids:
@@ -220,7 +229,7 @@ def set_dropdown_tables_for_graph(
         if (not preselected_tables) and df_edges.is_empty():
             # Nėra ryšių
             if tables_pdsa_real:
-                df_tbl = pl.DataFrame(data_submitted["node_data"]["tbl_sheet_data"], infer_schema_length=None)
+                df_tbl = gu.to_polars_df(data_submitted["node_data"]["tbl_sheet_data"])
                 if df_tbl.height > 0:
 
                     if data_submitted["node_data"]["tbl_sheet_renamed_cols"]["n_records"]:
@@ -241,33 +250,21 @@ def set_dropdown_tables_for_graph(
             # Susijungiančios ir turinčios ryšių, iki 10
             preselected_tables = tables_pdsa_refs_intersect
         if not preselected_tables:
-            # iki 10 populiariausių lentelių tarpusavio ryšiuose; nebūtinai tarpusavyje susijungiančios
-            # ryšių su lentele dažnis mažėjančia tvarka
-            df_edges_tbl = df_edges[["source_tbl", "target_tbl"]].unique()  # tik lentelės, be stulpelių
-            df_edges_tbl = df_edges_tbl.filter(pl.col("source_tbl") != pl.col("target_tbl"))  # neskaičiuoti ryšių į save
-            df_edges_tbl_ = pl.concat([df_edges_tbl["source_tbl"], df_edges_tbl["target_tbl"]]).alias("table")
-            table_links_n = df_edges_tbl_.value_counts(sort=True, name="n")
-            if tables_pdsa_refs_intersect:  # Jei yra bendrų ryšių ir PDSA lentelių
-                # Atrinkti tik lenteles, esančias abiejuose dokumentuose: tiek PDSA, tiek ryšių
-                table_links_n = table_links_n.filter(pl.col("table").is_in(tables_pdsa_refs_intersect))
-            if tables_excludable:
-                # Neįtraukti šalintinų lentelių
-                table_links_n = table_links_n.filter(~pl.col("table").is_in(tables_excludable))
-            if (len(table_links_n["n"]) < 10) or (table_links_n["n"][8] < table_links_n["n"][9]):
-                preselected_tables = table_links_n["table"][:10].to_list()
-            else:
-                table_links_n_threshold = table_links_n["n"][9] + 1
-                preselected_tables = table_links_n.filter(pl.col("n") >= table_links_n_threshold)["table"].to_list()
-            # Pašalinti mazgus, kurie neturi tarpusavio ryšių su parinktaisiais
-            preselected_tables = gu.remove_orphaned_nodes_from_sublist(preselected_tables, df_edges_tbl)
-            if not preselected_tables:  # jei netyčia nei vienas tarpusavyje nesijungia, imti du su daugiausia kt. ryšių
-                preselected_tables = table_links_n["table"][:2].to_list()
+            # iki 10 svarbiausių tarpusavyje susijungiančių lentelių pagal pateikiant duomenis apskaičiuotus rodiklius
+            # (skirtingų kaimyninių lentelių skaičių, paskui PageRank), žr. `utils_graph.get_node_stats`
+            preselected_tables = ug.get_top_connected_tables(
+                graph_index,
+                # Jei yra bendrų ryšių ir PDSA lentelių, rinktis tik iš lentelių, esančių abiejuose dokumentuose
+                candidate_tables=tables_pdsa_refs_intersect or None,
+                excluded_tables=tables_excludable,  # neįtraukti šalintinų lentelių
+                n=10,
+            )
 
     preselected_tables = sorted(preselected_tables)  # aukščiau galėjo būti nerikiuotos; rikiuoti abėcėliškai
 
     user_dropdown_triggers = [
         "draw-tables-refs.n_clicks", "draw-tables-pdsa.n_clicks", "draw-tables-common.n_clicks",
-        "draw-tables-all.n_clicks", "draw-tables-auto.n_clicks"
+        "draw-tables-all.n_clicks", "draw-tables-auto.n_clicks", "dropdown-partitions.value"
     ]
     if not tables_all:
         info_msg = [
@@ -304,6 +301,36 @@ def set_dropdown_tables_for_graph(
         )
 
 
+@callback(
+    Output("dropdown-partitions", "options"),  # grafo dalys, kurias galima braižyti atskirai
+    Output("dropdown-partitions", "value"),
+    Input("memory-submitted-data", "data"),  # žodynas su PDSA ("node_data") ir ryšių ("edge_data") duomenimis
+)
+def set_dropdown_partitions(data_submitted):
+    """
+    Nustatyti grafo dalis, kurias galima braižyti atskirai: silpnai jungiąsias komponentes ir bendruomenes,
+    apskaičiuotas pateikiant duomenis (žr. `utils_graph.get_partitions`). Naudinga didelėms schemoms, kurių visų
+    lentelių nubraižyti neįmanoma.
+    :param data_submitted: žodynas su PDSA ("node_data") ir ryšių ("edge_data") duomenimis
+    :return: "dropdown-partitions" galimų pasirinkimų sąrašas ir tuščia reikšmė
+    """
+    if not data_submitted:
+        return [], None
+    df_partitions = ug.get_partitions(ug.get_graph_index(data_submitted["edge_data"]))
+    labels = {
+        "component": _("Component %d (%d tables)"),
+        "community": _("Community %d (%d tables)"),
+    }
+    options = [
+        {
+            "label": labels[partition] % (number + 1, size),  # naudotojui numeruoti nuo 1
+            "value": f"{partition}:{number}",
+        }
+        for partition, number, size in df_partitions.iter_rows()
+    ]
+    return options, None
+
+
 @callback(
     Output("memory-filtered-data", "data"),
     Output("memory-selected-tables", "data"),  # pasirinktos lentelės, bet be kaimynų
@@ -314,6 +341,8 @@ def set_dropdown_tables_for_graph(
     Input("input-list-tables", "value"),
     Input("checkbox-get-neighbours", "value"),
     Input("dropdown-neighbors", "value"),
+    Input("input-neighbours-depth", "value"),
+    Input("checkbox-connect-tables", "value"),
     Input("pdsa-tables-records", "value"),
     Input("checkbox-tables-no-records", "value"),
     Input("viz-keyboard-press-store", "data"),
@@ -322,7 +351,7 @@ def set_dropdown_tables_for_graph(
 )
 def get_filtered_data_for_network(
     active_tab, data_submitted, selected_dropdown_tables, input_list_tables_str,
-    get_neighbours, neighbours_type, pdsa_tbl_records, pdsa_tbl_exclude_empty,
+    get_neighbours, neighbours_type, neighbours_depth, connect_tables, pdsa_tbl_records, pdsa_tbl_exclude_empty,
     key_press, selected_nodes_in_graph_id,
     filtered_elements_old=None  # Tik dėl suderinamumo su v2.2 šaka, vėlesnėse versijose None galima nuimti
 ):
@@ -334,6 +363,8 @@ def get_filtered_data_for_network(
     :param input_list_tables_str: tekstiniame lauke surašytos papildomos braižytinos lentelės
     :param get_neighbours: ar rodyti kaimynus
     :param neighbours_type: kaimynystės tipas: "all" (visi), "source" (iš), "target" (į)
+    :param neighbours_depth: per kiek žingsnių ieškoti kaimynų (kaimynų kaimynų ir t.t.)
+    :param connect_tables: ar pridėti tarpines lenteles, per kurias pasirinktos lentelės sujungiamos ryšiais
     :param pdsa_tbl_records: PDSA lakšte, aprašančiame lenteles, stulpelis su eilučių (įrašų) skaičiumi
     :param pdsa_tbl_exclude_empty: ar išmesti PDSA lentelių lakšto lenteles, kuriose nėra įrašų
     :param key_press: žodynas apie paspaustą klavišą, pvz.
@@ -411,71 +442,73 @@ def get_filtered_data_for_network(
         if isinstance(key_press, dict) and (key_press.get("key") == "k") and selected_nodes_in_graph_id:
             selected_tables_for_neighbours.extend(selected_nodes_in_graph_id)
 
-    # Ryšiai
-    df_edges0 = pl.DataFrame(data_submitted["edge_data"]["ref_sheet_data"], infer_schema_length=None)
+    # Ryšiai ir jų grafo indeksas, per kurį kaimynai ir ryšiai randami neperžiūrint visų ryšių
+    df_edges0 = gu.to_polars_df(data_submitted["edge_data"]["ref_sheet_data"], gu.EDGES_SCHEMA)
+    graph_index = ug.get_graph_index(data_submitted["edge_data"])
 
     # Priklausomai nuo langelio „Rodyti kaimynus“/„Get neighbours“, taip pat jei paspaustas K klavišas
+    neighbours_note = ""  # paaiškinimas, jei kaimynų paieška sustabdyta ties braižomų lentelių riba
     if df_edges0.is_empty():
         neighbors = []
         selected_tables_and_neighbors = selected_tables
         df_edges = pl.DataFrame()
     elif not selected_tables_for_neighbours:
         # Nei langelis „Rodyti kaimynus“/„Get neighbours“ nuspaustas, nei K klavišas nuspaustas, tad
-        # atrenkami tik tie ryšiai, kurie viename ar kitame gale turi bent vieną iš pasirinktų lentelių
+        # atrenkami tik tie ryšiai, kurių abiejuose galuose yra pasirinktos lentelės
         neighbors = []
         selected_tables_and_neighbors = selected_tables
-        df_edges = df_edges0.filter(
-            pl.col("source_tbl").is_in(selected_tables) &
-            pl.col("target_tbl").is_in(selected_tables)
-        )
+        df_edges = df_edges0[ug.get_induced_edge_rows(graph_index, selected_tables)]
     else:
-        # Pirminė ryšių atranka, kuri reikalinga kaimynų radimui; pvz., A>B, A>C ras ryšį, bet praleis B>C.
-        # tik žinodami kaimynus vėliau iš naujo ieškosime ryšių, nes ryšių galėjo būti tarp pačių kaimynų
+        # Kaimynų paieška per tiek žingsnių, kiek nurodyta, bet neviršijant braižomų lentelių ribos
         if neighbours_type == "source":
-            # turime target, bet papildomai rodyti source
-            df_edges = df_edges0.filter(
-                pl.col("target_tbl").is_in(selected_tables_for_neighbours)
-            )
+            # turime target, bet papildomai rodyti source – einama prieš ryšių kryptį
+            direction = "in"
         elif neighbours_type == "target":
-            # turime source, bet papildomai rodyti target
-            df_edges = df_edges0.filter(
-                pl.col("source_tbl").is_in(selected_tables_for_neighbours)
-            )
+            # turime source, bet papildomai rodyti target – einama ryšių kryptimi
+            direction = "out"
         else:  # visi kaimynai
-            df_edges = df_edges0.filter(
-                pl.col("source_tbl").is_in(selected_tables_for_neighbours) |
-                pl.col("target_tbl").is_in(selected_tables_for_neighbours)
+            direction = "all"
+        try:
+            neighbours_depth = max(1, int(neighbours_depth))
+        except (TypeError, ValueError):
+            neighbours_depth = 1  # laukas tuščias arba netinkama reikšmė
+        reached_tables, reached_depth, truncated = ug.expand_neighbourhood(
+            graph_index, selected_tables_for_neighbours, direction=direction, depth=neighbours_depth,
+            max_tables=max(ug.NEIGHBOURS_MAX_TABLES, len(selected_tables)),
+            excluded_tables=tables_excludable,  # kaimynuose negali būti šalintinų lentelių
+        )
+        # naudotojo nurodytos lentelės turi likti
+        selected_tables_and_neighbors = list(set(selected_tables) | set(reached_tables))
+        neighbors = list(set(selected_tables_and_neighbors) - set(selected_tables))
+        if truncated:
+            neighbours_note = _("neighbours only up to depth %d: limit of %d tables") % (
+                reached_depth, ug.NEIGHBOURS_MAX_TABLES
             )
 
-        if df_edges.height == 0:
-            neighbors = []
-            selected_tables_and_neighbors = selected_tables
-        else:
-            selected_tables_and_neighbors = list(
-                set(selected_tables) | set(  # naudotojo nurodytos lentelės turi likti
-                    set(  # kaimyninės lentelės
-                        df_edges["source_tbl"].unique().to_list() +
-                        df_edges["target_tbl"].unique().to_list()
-                    ) - set(tables_excludable)  # kaimynuose negali būti šalintinų lentelių
-                )
-            )
+        # Ryšiai tarp visų rodomų lentelių, įskaitant jungtis tarp pačių kaimynų,
+        # pvz., jei pasirinkus A rasti kaimynai B ir C, tai bus rastas ne tik A>B ir A>C, bet ir B>C.
+        df_edges = df_edges0[ug.get_induced_edge_rows(graph_index, selected_tables_and_neighbors)]
+
+    # Langelis „Sujungti pasirinktas lenteles“/„Connect selected tables“ nuspaustas – pridėti tarpines lenteles,
+    # per kurias pasirinktos lentelės sujungiamos trumpiausiais ryšių keliais; jos rodomos kaip kaimynai
+    if connect_tables and (len(selected_tables) > 1) and not df_edges0.is_empty():
+        connecting_tables = set(ug.get_connecting_tables(
+            graph_index, selected_tables,
+            excluded_tables=tables_excludable,  # per šalintinas lenteles nejungti
+        )) - set(selected_tables_and_neighbors)
+        if connecting_tables:
+            selected_tables_and_neighbors = list(set(selected_tables_and_neighbors) | connecting_tables)
             neighbors = list(set(selected_tables_and_neighbors) - set(selected_tables))
-
-        # Ryšius atsirenkame iš naujo, nes jungčių galėjo būti tarp pačių kaimynų,
-        # pvz., jei iš pradžių turėjome A>B ir A>C, tai dabar jau ras ir B>C.
-        df_edges = df_edges0.filter(
-            pl.col("source_tbl").is_in(selected_tables_and_neighbors) &
-            pl.col("target_tbl").is_in(selected_tables_and_neighbors)
-        )
+            df_edges = df_edges0[ug.get_induced_edge_rows(graph_index, selected_tables_and_neighbors)]
 
     depicted_tables_msg = _("%d of %d") % (len(selected_tables_and_neighbors), tables_not_excluded_n)
+    if neighbours_note:
+        depicted_tables_msg = f"{depicted_tables_msg} ({neighbours_note})"
     if not selected_tables_and_neighbors:
         return {}, [], depicted_tables_msg
 
     if df_edges.height == 0:
-        df_edges = pl.DataFrame(schema={
-            "source_tbl": pl.Utf8, "source_col": pl.Utf8, "target_tbl": pl.Utf8, "target_col": pl.Utf8
-        })
+        df_edges = pl.DataFrame(schema=gu.EDGES_SCHEMA)
     filtered_elements_new = {
         "node_elements": selected_tables_and_neighbors,
         "node_neighbors": neighbors,
@@ -553,7 +586,7 @@ def create_dash_table_about_selected_table_cols(data_submitted, selected_dropdow
     if not (data_submitted and selected_dropdown_tables):
         return dash_table.DataTable()
     data_about_nodes = data_submitted["node_data"]["col_sheet_data_orig"]
-    df_col = pl.DataFrame(data_about_nodes, infer_schema_length=None)
+    df_col = gu.to_polars_df(data_about_nodes)
 
     if type(selected_dropdown_tables) == str:
         selected_dropdown_tables = [selected_dropdown_tables]
@@ -609,7 +642,7 @@ def create_dash_table_about_displayed_tables(data_submitted, filtered_elements,
     if (not data_submitted) or (not filtered_elements):
         return dash_table.DataTable()
     data_about_nodes = data_submitted["node_data"]["tbl_sheet_data_orig"]
-    df_tbl = pl.DataFrame(data_about_nodes, infer_schema_length=None)
+    df_tbl = gu.to_polars_df(data_about_nodes)
     col = data_submitted["node_data"]["tbl_sheet_renamed_cols"]["table"]
     if get_displayed_nodes_info and (col in df_tbl):
         # tinklo mazgai turi raktą "id" ir "label", bet jungimo linijos jų neturi (jos turi tik "source" ir "target")
@@ -643,7 +676,7 @@ def change_pdsa_tables_info_visibility(pdsa_tbl_table, data_submitted, div_style
     :param div_style: html.Div stiliaus žodynas
     :return: pakeistas "style" žodynas.
     """
-    visibility = pdsa_tbl_table and data_submitted and data_submitted["node_data"]["tbl_sheet_data_orig"]
+    visibility = pdsa_tbl_table and data_submitted and (len(data_submitted["node_data"]["tbl_sheet_data_orig"]) > 0)
     return gu.change_style_for_visibility(visibility, div_style)
 
 
@@ -661,5 +694,5 @@ def change_pdsa_columns_info_visibility(pdsa_col_table, data_submitted, div_styl
     :param div_style: html.Div stiliaus žodynas
     :return: pakeistas "style" žodynas.
     """
-    visibility = pdsa_col_table and data_submitted and data_submitted["node_data"]["col_sheet_data_orig"]
+    visibility = pdsa_col_table and data_submitted and (len(data_submitted["node_data"]["col_sheet_data_orig"]) > 0)
     return gu.change_style_for_visibility(visibility, div_style)
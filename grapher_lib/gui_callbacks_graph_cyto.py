@@ -76,7 +76,7 @@ def get_network_cytoscape_chart(
         return {}
 
     # Išsitraukti reikalingus kintamuosius
-    df_edges = pl.DataFrame(filtered_elements["edge_elements"], infer_schema_length=None)  # ryšių lentelė
+    df_edges = gu.to_polars_df(filtered_elements["edge_elements"], gu.EDGES_SCHEMA)  # ryšių lentelė
     nodes = filtered_elements["node_elements"]  # mazgai (įskaitant kaimynus)
     neighbors = filtered_elements["node_neighbors"]  # kaimyninių mazgų sąrašas
 
@@ -10,13 +10,14 @@ This code is distributed under the MIT License. For more details, see the LICENS
 import os
 import polars as pl
 from dash_extensions.enrich import (
-    Output, Input, State, callback, callback_context, html, no_update
+    Output, Input, State, callback, callback_context, dcc, html, no_update
 )
 import json
 from io import StringIO
 from datetime import datetime
 from grapher_lib import utils as gu
 from grapher_lib import utils_file_upload as fu
+from grapher_lib import utils_session as us
 
 
 @callback(
@@ -189,7 +190,7 @@ def display_tap_node_tooltip(
     # %% Antraštė
     tooltip_header = [html.H6(node_id)]
     data_about_nodes_tbl = data_submitted["node_data"]["tbl_sheet_data"]
-    df_tbl = pl.DataFrame(data_about_nodes_tbl, infer_schema_length=None)
+    df_tbl = gu.to_polars_df(data_about_nodes_tbl)
     if "table" in df_tbl:
         df_tbl1 = df_tbl.filter(pl.col("table") == node_id).unique()
         df_tbl1 = fu.select_renamed_or_add_columns(df_tbl1, old_columns=None, new_columns=["comment", "n_records"])
@@ -214,7 +215,7 @@ def display_tap_node_tooltip(
 
     # Turinys: stulpeliai
     data_about_nodes_col = data_submitted["node_data"]["col_sheet_data"]
-    df_col = pl.DataFrame(data_about_nodes_col, infer_schema_length=None)
+    df_col = gu.to_polars_df(data_about_nodes_col)
     if all(col in df_col.columns for col in ["table", "column"]):
         df_col = df_col.filter(pl.col("table") == node_id)  # atsirinkti tik šios lentelės stulpelius
         if df_col.height:  # netuščia lentelė
@@ -239,11 +240,9 @@ def display_tap_node_tooltip(
 
     # Turinys: ryšiai
     def get_df_edges_from_dict(edges_dict):
-        df = pl.DataFrame(edges_dict, infer_schema_length=None)
+        df = gu.to_polars_df(edges_dict, gu.EDGES_SCHEMA)
         if df.height == 0:  # jei nėra eilučių, nėra ir reikalingų stulpelių struktūros
-            df = pl.DataFrame(schema={
-                "source_tbl": pl.Utf8, "source_col": pl.Utf8, "target_tbl": pl.Utf8, "target_col": pl.Utf8
-            })
+            df = pl.DataFrame(schema=gu.EDGES_SCHEMA)
         return df
     df_edges = get_df_edges_from_dict(data_submitted["edge_data"]["ref_sheet_data"])
     df_edges_visib = get_df_edges_from_dict(filtered_elements["edge_elements"])
@@ -345,12 +344,14 @@ def display_tap_node_tooltip(
     Input("input-list-tables", "value"),
     Input("checkbox-get-neighbours", "value"),
     Input("dropdown-neighbors", "value"),
+    Input("input-neighbours-depth", "value"),
+    Input("checkbox-connect-tables", "value"),
     Input("checkbox-tables-no-records", "value"),
     Input("dropdown-tables", "options"),  # galimos pasirinkti braižymui lentelės
 )
 def change_graph_tooltip_visibility(
     graph_info_visibility, graph_info, viz_clicked_node_data,  # noqa
-     _csn, _ctn, _cse, _cte, _ddt, _ilt, _cgn, _ddn, _ctr, _ddto  # noqa
+     _csn, _ctn, _cse, _cte, _ddt, _ilt, _cgn, _ddn, _ind, _cct, _ctr, _ddto  # noqa
 ):
     """
     Rodyti užrašą darbo pradžioje, jei ne visos lentelės matomos arba nėra ką pasirinkti,
@@ -411,7 +412,10 @@ def save_displayed_nodes_to_json(
 
     tables_data = {}
     columns_data = {}
-    refs_data = filtered_elements["edge_elements"] if only_displayed else data_submitted["edge_data"]["ref_sheet_data"]
+    if only_displayed:
+        refs_data = filtered_elements["edge_elements"]
+    else:
+        refs_data = gu.to_polars_df(data_submitted["edge_data"]["ref_sheet_data"], gu.EDGES_SCHEMA).to_dicts()
 
     displayed_nodes = filtered_elements["node_elements"]  # visos rodomos lentelės (gali įtraukti kaimynus, jei prašoma)
     neighbor_nodes = filtered_elements["node_neighbors"]  # kaimyninės lentelės
@@ -426,7 +430,7 @@ def save_displayed_nodes_to_json(
 
     # Lentelės
     data_about_nodes_tbl = data_submitted["node_data"]["tbl_sheet_data"]
-    df_tbl = pl.DataFrame(data_about_nodes_tbl, infer_schema_length=None)
+    df_tbl = gu.to_polars_df(data_about_nodes_tbl)
     if "table" in df_tbl:
         df_tbl = df_tbl.filter(pl.col("table").is_in(exportable_nodes))  # atrenkamos tik eksportuojamos lentelės
         df_tbl = df_tbl.with_columns(pl.col("table").is_in(selected_nodes).alias("selected"))  # pasirinkimo žyma
@@ -434,7 +438,7 @@ def save_displayed_nodes_to_json(
 
         # Stulpeliai
         data_about_nodes_col = data_submitted["node_data"]["col_sheet_data"]
-        df_col = pl.DataFrame(data_about_nodes_col, infer_schema_length=None)
+        df_col = gu.to_polars_df(data_about_nodes_col)
         if ("table" in df_col) and ("column" in df_col):
             if "checkbox" in df_col:
                 df_col = df_col.drop("checkbox")  # išmesti seną stulpelį, nes prijungsim naujas reikšmes iš df_checkboxes
@@ -457,6 +461,47 @@ def save_displayed_nodes_to_json(
     return dict(content=json_content, filename=filename, type="application/json")
 
 
+@callback(
+    Output("download-session", "data"),
+    State("memory-submitted-data", "data"),
+    State("memory-filtered-data", "data"),
+    State("memory-viz-clicked-checkbox", "data"),
+    State("memory-name", "data"),  # dokumento vardas antraštėje ir saugant duomenis
+    Input("viz-save-session", "n_clicks"),  # paspaudimas per Viz grafiko ☰ meniu
+    Input("cyto-save-session", "n_clicks"),  # paspaudimas per Cytoscape grafiko ☰ meniu
+)
+def save_session(data_submitted, filtered_elements, viz_selection_dict, name, _viz_trigger, _cyto_trigger):  # noqa
+    """
+    Įrašyti darbo sesiją: visus pateiktus duomenis, žymimųjų langelių žymėjimus ir pasirinktas lenteles
+    (žr. utils_session.py). Vėliau ją įkėlus kaip PDSA, nebereikia iš naujo parinkinėti lakštų ir stulpelių.
+    :param data_submitted: žodynas su PDSA ("node_data") ir ryšių ("edge_data") duomenimis
+    :param filtered_elements: žodynas {
+        "node_elements": [],  # mazgai (įskaitant kaimynus)
+        "node_neighbors": []  # kaimyninių mazgų sąrašas
+        "edge_elements": df  # ryšių lentelė
+        }
+    :param viz_selection_dict: Visų sužymėtų langelių simboliai žodyne,
+        kur pirmasis lygis yra lentelės, antrasis – stulpeliai, pvz:
+        {
+            "Skaitytojas": {"ID": "⬜"},
+            "Rezervacija": {"ClientID": "🟩", "BookCopyID": "🟥"}}
+        }
+    :param name: dokumento vardas antraštėje ir saugant duomenis
+    :return: sesijos rinkmena atsisiuntimui
+    """
+    if (not filtered_elements) or (not data_submitted):
+        return no_update
+
+    displayed_nodes = filtered_elements["node_elements"]  # visos rodomos lentelės (gali įtraukti kaimynus, jei prašoma)
+    neighbor_nodes = filtered_elements["node_neighbors"]  # kaimyninės lentelės
+    selected_nodes = [table for table in displayed_nodes if table not in neighbor_nodes]  # tikrai pasirinktos lentelės
+
+    data_session = us.mark_session_selections(data_submitted, viz_selection_dict, selected_nodes)
+    session_content = us.save_session(data_session, name or "")
+    filename = (name or "pdsa-grapher") + " " + datetime.now().strftime("%Y-%m-%d_%H%M%S") + us.SESSION_EXTENSION
+    return dcc.send_bytes(session_content, filename)
+
+
 @callback(
     Output("cyto-mouse-nodes-plain-clipboard-dropdown-item", "style"),
     Output("cyto-mouse-nodes-quoted-clipboard-dropdown-item", "style"),
@@ -524,12 +569,14 @@ def copy_mouse_selected_nodes_to_clipboard_quoted(selected_nodes, _cyto_trigger,
     Output("cyto-graph-nodes-quoted-clipboard-dropdown-item", "style"),
     Output("cyto-save-json-displayed", "style"),
     Output("cyto-save-json-all", "style"),
+    Output("cyto-save-session", "style"),
     Output("cyto-graph-nodes-metadata-tab-clipboard-dropdown-item", "style"),
     Output("viz-graph-nodes-plain-clipboard-dropdown-item", "style"),
     Output("viz-graph-nodes-quoted-clipboard-dropdown-item", "style"),
     Output("viz-graph-nodes-metadata-tab-clipboard-dropdown-item", "style"),
     Output("viz-save-json-displayed", "style"),
     Output("viz-save-json-all", "style"),
+    Output("viz-save-session", "style"),
     Output("viz-save-svg", "style"),
     Output("upload-data-viz-checkbox-dropdown-item", "style"),
     Input("memory-filtered-data", "data"),
@@ -546,7 +593,7 @@ def change_displayed_nodes_copy_option_visibility(filtered_elements):
     condition = isinstance(filtered_elements, dict) and filtered_elements.get("node_elements")
     old_style = {"width": "300px"}  # nurodyti tiksliai, nes neprisitaiko pagal copy_div_with_label() plotį
     new_style = gu.change_style_for_activity(condition, old_style)
-    return (new_style, ) * 12
+    return (new_style, ) * 14
 
 
 @callback(
@@ -646,11 +693,11 @@ def copy_displayed_nodes_metadata_to_clipboard(
         return ("", ) * outputs_n
 
     # Išsitraukti reikalingus kintamuosius
-    df_edges = pl.DataFrame(filtered_elements["edge_elements"], infer_schema_length=None)  # ryšių lentelė
+    df_edges = gu.to_polars_df(filtered_elements["edge_elements"], gu.EDGES_SCHEMA)  # ryšių lentelė
     displayed_nodes = filtered_elements["node_elements"]  # mazgai (įskaitant kaimynus)
 
     # Lentelių metaduomenys
-    df_nodes_tbl = pl.DataFrame(data_submitted["node_data"]["tbl_sheet_data"], infer_schema_length=None)
+    df_nodes_tbl = gu.to_polars_df(data_submitted["node_data"]["tbl_sheet_data"])
     if "table" in df_nodes_tbl.columns:
         # Atrinkti tik braižytas lenteles
         df_tbl = df_nodes_tbl.filter(pl.col("table").is_in(displayed_nodes))
@@ -661,7 +708,7 @@ def copy_displayed_nodes_metadata_to_clipboard(
         df_tbl = pl.DataFrame(schema={"table": pl.String})
 
     # Stulpelių metaduomenys
-    df_nodes_col = pl.DataFrame(data_submitted["node_data"]["col_sheet_data"], infer_schema_length=None)
+    df_nodes_col = gu.to_polars_df(data_submitted["node_data"]["col_sheet_data"])
     if ("table" in df_nodes_col.columns) and ("column" in df_nodes_col.columns):
         df_col = df_nodes_col.filter(pl.col("table").is_in(displayed_nodes))
     else:
@@ -79,11 +79,11 @@ def get_network_viz_chart(
         return ""
 
     # Išsitraukti reikalingus kintamuosius
-    df_edges = pl.DataFrame(filtered_elements["edge_elements"], infer_schema_length=None)  # ryšių lentelė
+    df_edges = gu.to_polars_df(filtered_elements["edge_elements"], gu.EDGES_SCHEMA)  # ryšių lentelė
     nodes = filtered_elements["node_elements"]  # mazgai (įskaitant kaimynus)
     neighbors = filtered_elements["node_neighbors"]  # kaimyninių mazgų sąrašas
-    df_nodes_tbl = pl.DataFrame(data_submitted["node_data"]["tbl_sheet_data"], infer_schema_length=None)
-    df_nodes_col = pl.DataFrame(data_submitted["node_data"]["col_sheet_data"], infer_schema_length=None)
+    df_nodes_tbl = gu.to_polars_df(data_submitted["node_data"]["tbl_sheet_data"])
+    df_nodes_col = gu.to_polars_df(data_submitted["node_data"]["col_sheet_data"])
     changed_ids = [p["prop_id"] for p in callback_context.triggered]  # Sužinoti, kas iškvietė f-ją.
 
     # Atrinkti lenteles
@@ -152,9 +152,9 @@ def import_checkbox_markings(uploaded_content, uploaded_filenames, pdsa_dict):
         if (
                 isinstance(parse_output, dict) and ("file_data" in parse_output) and (
                 "columns" in parse_output["file_data"]) and
-                ("df" in parse_output["file_data"]["columns"]) and parse_output["file_data"]["columns"]["df"]
+                (not fu.is_sheet_empty(parse_output, "columns"))
         ):
-            df_checkboxes = pl.DataFrame(parse_output["file_data"]["columns"]["df"], infer_schema_length=None)
+            df_checkboxes = fu.get_sheet_df(parse_output, "columns")
             df_checkboxes = fu.select_renamed_or_add_columns(
                 df_checkboxes, old_columns=None, new_columns=["table", "column", "checkbox"]
             )
@@ -250,7 +250,7 @@ def viz_clicked_checkbox_visibility(data_submitted, viz_uploaded_checkboxes, viz
         checkbox_col = data_submitted["node_data"]["col_sheet_renamed_cols"]["checkbox"]  # naudotojo pasirinktas stulp.
         # Nuo 2025 m. kovo summarize_submission naudotojo stulpelį pervadino į "checkbox";
         # bet "checkbox" būna net jei naudotojas nepasirenka stulpelio – naujose versijose jis gali būti tuščias
-        df = pl.DataFrame(data_submitted["node_data"]["col_sheet_data"], infer_schema_length=None)
+        df = gu.to_polars_df(data_submitted["node_data"]["col_sheet_data"])
         if checkbox_col and ("checkbox" in df.columns):  # tikrinti abi sąlygas dėl suderinamumo su senomis versijomis
             df = df.filter(
                 pl.when(
@@ -313,9 +313,9 @@ def copy_mouse_selected_nodes_metadata_to_clipboard(
         return ""
 
     # Išsitraukti reikalingus kintamuosius
-    df_edges = pl.DataFrame(filtered_elements["edge_elements"], infer_schema_length=None)  # ryšių lentelė
+    df_edges = gu.to_polars_df(filtered_elements["edge_elements"], gu.EDGES_SCHEMA)  # ryšių lentelė
     # Stulpelių metaduomenys
-    df_nodes_col = pl.DataFrame(data_submitted["node_data"]["col_sheet_data"], infer_schema_length=None)
+    df_nodes_col = gu.to_polars_df(data_submitted["node_data"]["col_sheet_data"])
     if ("table" in df_nodes_col.columns) and ("column" in df_nodes_col.columns):
         # Atrinkti tik naudotojo pele pasirinktas lenteles pačiame grafike (g.b. ne visos iš nubraižytųjų)
         df_col = df_nodes_col.filter(pl.col("table").is_in(selected_nodes))
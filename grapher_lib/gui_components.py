@@ -89,6 +89,14 @@ def div_for_cyto():
                             style={"marginLeft": "20px"},
                         ),
                     ),
+                    dbc.DropdownMenuItem(  # Visų duomenų, žymėjimų ir pasirinkimų įrašymas į darbo sesijos rinkmeną
+                        id="cyto-save-session",
+                        n_clicks=0,
+                        children=html.Span(
+                            _("Save session"),
+                            style={"marginLeft": "20px"},
+                        ),
+                    ),
                     html.Hr(style={"margin": 0}),
 
                     # Cyto grafiko rodymo parinktys
@@ -318,6 +326,14 @@ def div_for_viz():
                             style={"marginLeft": "20px"},  # lygiavimo suvienodinimui su checkbox tekstu
                         ),
                     ),
+                    dbc.DropdownMenuItem(  # Visų duomenų, žymėjimų ir pasirinkimų įrašymas į darbo sesijos rinkmeną
+                        id="viz-save-session",
+                        n_clicks=0,
+                        children=html.Span(
+                            _("Save session"),
+                            style={"marginLeft": "20px"},  # lygiavimo suvienodinimui su checkbox tekstu
+                        ),
+                    ),
                     dbc.DropdownMenuItem(  # Visų nubraižytų lentelių ir ryšių įrašymas į SVG vektorinį paveiksliuką
                         id="viz-save-svg",
                         n_clicks=0,
@@ -384,20 +400,28 @@ def div_for_viz():
 
 def upload_data(upload_id, upload_label_id, upload_label=None):
     """
-    Rinkmenos įkėlimo laukelis
-    :param upload_id: pagrindinio objekto identifikatorius, t.y. dcc.Upload() "id"
+    Rinkmenos įkėlimo laukelis: rinkmeną galima nutempti arba spragtelėjus pasirinkti.
+    Rinkmenos į serverį siunčiamos dalimis per `/upload` maršrutą (žr. main.py ir assets/chunkedUpload.js),
+    o ne per dcc.Upload base64 turinį, tad dideli dokumentai nebestringa Dash užklausose.
+    Įkėlus rinkmenas, naršyklė nustato `upload_id` dcc.Store reikšmę {"files": [{"upload_id": "", "filename": ""}]}.
+    :param upload_id: įkėlimo rezultato objekto identifikatorius, t.y. dcc.Store() "id"
     :param upload_label_id: užrašo objekto identifikatorius, t.y. html.A() "id"
     :param upload_label: užrašas, t.y. html.A() "children"
-    :return: dcc.Upload()
+    :return: html.Div()
     """
-    return dcc.Upload(
-        id=upload_id,
-        children=html.Div([
-            html.A(
-                id=upload_label_id,
-                children=upload_label or _("Drag and Drop"),
-            ),
-        ]),
+    return html.Div(
+        className="chunked-upload",
+        children=[
+            dcc.Store(id=upload_id, storage_type="memory"),
+            html.Div([
+                html.A(
+                    id=upload_label_id,
+                    children=upload_label or _("Drag and Drop"),
+                ),
+                html.Div(className="chunked-upload-progress"),  # įkėlimo eigą rašys assets/chunkedUpload.js
+            ]),
+        ],
+        **{"data-store-id": upload_id},
         style={
             "minHeight": "60px",
             "borderWidth": "1px",
@@ -408,11 +432,30 @@ def upload_data(upload_id, upload_label_id, upload_label=None):
             "justifyContent": "center",  # teksto pačio stačiakampio lygiavimas centre
             "textAlign": "center",  # teksto stačiakampio viduje lygiavimas centre
             "margin": "10px",
+            "cursor": "pointer",
         },
-        multiple=True,  # iš tiesų neįkeliam kelių, bet dėl sintaksės suderinamumo paliekam po senovei
     )
 
 
+def uploaded_file_label(file_name, encodings=None, parse_time=None):
+    """
+    Užrašas apie įkeltą rinkmeną įkėlimo laukelyje (žr. `upload_data`).
+    :param file_name: rinkmenos vardas (ar keli vardai, atskirti kabliataškiu)
+    :param encodings: tekstinių rinkmenų nustatytų koduočių sąrašas
+    :param parse_time: kiek sekundžių truko nuskaitymas
+    :return: html.Span()
+    """
+    details = []
+    if encodings:
+        details.append(f"{_('Text encoding')}: {', '.join(encodings)}")
+    if parse_time is not None:
+        details.append(_("parsed in %s s") % f"{parse_time:.2f}")
+    children = [html.B(file_name)]
+    if details:
+        children.append(html.Small(f" ({'; '.join(details)})"))
+    return html.Span(children)
+
+
 def refs_sheet_selection_components(id_radio_sheet_refs):
     """
     Ryšių lakštų pasirinkimas
@@ -493,8 +536,28 @@ def pdsa_dropdown_columns_components(id_dropdown_sheet_type):
     return dropdown_sheet_type
 
 
-def table_preview():
-    return dash_table.DataTable()
+def table_preview(table_id=None, page_size=10):
+    """
+    Lentelės peržiūra. Jei nurodytas identifikatorius, puslapiai ir rikiavimas vykdomi serveryje
+    (page_action="custom", sort_action="custom"), tad į naršyklę siunčiamos tik rodomo puslapio eilutės.
+    :param table_id: dash_table.DataTable identifikatorius
+    :param page_size: eilučių skaičius viename puslapyje
+    """
+    if table_id is None:
+        return dash_table.DataTable()
+    return dash_table.DataTable(
+        id=table_id,
+        data=[],
+        columns=[],
+        style_table={"overflowX": "scroll"},
+        page_action="custom",
+        page_current=0,
+        page_size=page_size,
+        page_count=0,
+        sort_action="custom",
+        sort_mode="single",
+        sort_by=[],
+    )
 
 
 def dropdown_with_label(dropdown_id, label):
@@ -550,12 +613,24 @@ def dropdown_clipboard_item_with_label(clipboard_id, label="", target_id=None):
 
 
 def progress_bar(progress_bar_id):
+    """
+    Eigos juosta. Trumpiems veiksmams ji rodoma visa (value=100), o foniniai kvietimai (background callbacks)
+    keičia jos reikšmę ir po ja esantį užrašą (id su „-label“ galūne) apie atliekamą etapą.
+    :param progress_bar_id: eigos juostos identifikatorius
+    """
     return dmc.MantineProvider(
-        dmc.Progress(
-            id=progress_bar_id,
-            value=100,
-            striped=True,
-            animated=True,
-            style={"visibility": "hidden"},
-        ),
+        children=[
+            dmc.Progress(
+                id=progress_bar_id,
+                value=100,
+                striped=True,
+                animated=True,
+                style={"visibility": "hidden"},
+            ),
+            html.Div(
+                id=f"{progress_bar_id}-label",
+                # Neužimti vietos, kad atsiradus užrašui nepasislinktų visas turinys
+                style={"position": "absolute", "marginLeft": "20px", "fontSize": "small", "color": "gray"},
+            ),
+        ],
     )
@@ -68,7 +68,7 @@ def file_uploading_tab_layout():
                     ),
                     html.Div(
                         id="sheet-tbl-preview",
-                        children=gc.table_preview(),
+                        children=gc.table_preview("sheet-tbl-preview-table", page_size=5),
                     ),
                 ],
             ),
@@ -142,7 +142,7 @@ def file_uploading_tab_layout():
                     ),
                     html.Div(
                         id="sheet-col-preview",
-                        children=gc.table_preview(),
+                        children=gc.table_preview("sheet-col-preview-table"),
                     ),
                 ],
             ),
@@ -243,7 +243,7 @@ def file_uploading_tab_layout():
             html.Br(),
             html.Div(
                 id="refs-tbl-preview",
-                children=gc.table_preview(),
+                children=gc.table_preview("refs-tbl-preview-table"),
             ),
             html.Div(
                 style={"marginTop": "20px"},
@@ -199,6 +199,21 @@ def graph_tab_layout():
                                         ),
                                     ],
                                 ),
+                                # Grafo dalis (silpnai jungioji komponentė arba bendruomenė) braižymui
+                                html.Div(
+                                    children=[
+                                        html.Br(),
+                                        html.P(
+                                            _("Draw a group of related tables")
+                                        ),
+                                        dcc.Dropdown(
+                                            id="dropdown-partitions",
+                                            options=[],
+                                            value=None,
+                                            placeholder=_("Select..."),
+                                        ),
+                                    ],
+                                ),
                                 html.Br(),
 
                                 # Rodyti kaimynus
@@ -233,6 +248,37 @@ def graph_tab_layout():
                                         style={"width": "50%"},
                                     ),
                                 ]),
+                                # Per kiek žingsnių ieškoti kaimynų (kaimynų kaimynų ir t.t.)
+                                dbc.Row([
+                                    dbc.Col(
+                                        children=[
+                                            html.P(_("Neighbour depth")),
+                                        ],
+                                        style={"width": "50%"},
+                                    ),
+                                    dbc.Col(
+                                        children=[
+                                            dcc.Input(
+                                                id="input-neighbours-depth",
+                                                type="number",
+                                                min=1,
+                                                step=1,
+                                                value=1,
+                                                style={"width": "100%"},
+                                            ),
+                                        ],
+                                        style={"width": "50%"},
+                                    ),
+                                ]),
+
+                                # Pridėti tarpines lenteles, per kurias pasirinktos lentelės sujungiamos ryšiais
+                                html.Div(
+                                    children=dbc.Checkbox(
+                                        id="checkbox-connect-tables",
+                                        label=_("Connect selected tables"),
+                                        value=False
+                                    ),
+                                ),
                                 html.Br(),
 
                                 # Neįtraukti lentelių be įrašų
@@ -358,5 +404,6 @@ def graph_tab_layout():
             gi.active_element_info("active-node-info"),  # apie mazgus, t.y. duombazių lenteles
             gi.active_element_info("active-edge-info"),  # apie jungtis, t.y. ryšius tarp lentelių
             dcc.Download(id="download-json"),
+            dcc.Download(id="download-session"),
         ],
     )
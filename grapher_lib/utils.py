@@ -13,8 +13,33 @@ import polars as pl
 import unicodedata
 import warnings
 import time
+import shutil
 from pathlib import Path
 
+# Ryšių lentelės schema: tokia ji tampa pateikus duomenis (žr. `gui_callbacks_file_submit.prepare_refs_sheet`),
+# tad atmintyje kaip žodynai laikomus ryšius galima atkurti nenustatinėjant tipų pagal visas eilutes
+EDGES_SCHEMA = {"source_tbl": pl.Utf8, "source_col": pl.Utf8, "target_tbl": pl.Utf8, "target_col": pl.Utf8}
+
+
+def to_polars_df(df, schema=None):
+    """
+    Užtikrinti, kad lentelė būtų polars DataFrame. Jau esamas polars DataFrame grąžinamas nekopijuojant.
+    Eilučių žodynų sąrašas (pvz., iš dcc.Store) sudaromas pagal nurodytą schemą, o jos nesant –
+    peržiūrint visas eilutes tipams nustatyti.
+    :param df: polars DataFrame, LazyFrame, eilučių žodynų sąrašas arba stulpelių žodynas
+    :param schema: žinoma schema {stulpelis: tipas}, kai df dar nėra polars DataFrame; kitų stulpelių neįtraukia
+    :return: polars DataFrame
+    """
+    if isinstance(df, pl.DataFrame):
+        return df
+    if isinstance(df, pl.LazyFrame):
+        return df.collect()
+    if schema is not None:
+        return pl.DataFrame(df or None, schema=schema)
+    if not df:
+        return pl.DataFrame()
+    return pl.DataFrame(df, infer_schema_length=None)
+
 
 def get_fig_cytoscape_elements(
         node_elements=None, df_edges=None, node_neighbors=None, set_link_info_str=True
@@ -52,7 +77,7 @@ def get_fig_cytoscape_elements(
     if not isinstance(df_edges, pl.DataFrame):
         if df_edges in [[], None]:
             return node_elements  # Grąžinti mazgus, jei nėra jungčių tarp mazgų (ryšių tarp lentelių)
-        df_edges = pl.DataFrame(df_edges, infer_schema_length=None)
+        df_edges = to_polars_df(df_edges, EDGES_SCHEMA)
 
     # Tikrinti ryšių lentelę. Ar turi įrašų
     if df_edges.height == 0:
@@ -328,10 +353,8 @@ def merge_pdsa_and_refs_columns(df_col, df_edges, table, get_all_columns=True, t
     :param tables_in_context: sąrašas su mazgų/lentelių pavadinimais, kurie tikrintini ryšiuose
     :return: DOT sintaksės tekstas
     """
-    if not isinstance(df_col, pl.DataFrame):
-        df_col = pl.DataFrame(df_col, infer_schema_length=None)
-    if not isinstance(df_edges, pl.DataFrame):
-        df_edges = pl.DataFrame(df_edges, infer_schema_length=None)
+    df_col = to_polars_df(df_col)
+    df_edges = to_polars_df(df_edges, EDGES_SCHEMA)
 
     if ("table" in df_col.columns) and (df_col["table"].dtype == pl.String):
         df_col1 = df_col.filter(pl.col("table") == table)  # atsirinkti tik pasirinktos lentelės stulpelius
@@ -477,7 +500,7 @@ def filter_df_by_checkbox(df, column="checkbox", include_unexpected=False):
     :param include_unexpected: ar netikėtas reikšmes užskaityti kaip grąžintinas
     :return: polars DataFrame
     """
-    df = pl.DataFrame(df, infer_schema_length=None)
+    df = to_polars_df(df)
     df = df.filter(
         pl.when(
             pl.col(column).is_null() |
@@ -519,7 +542,7 @@ def remove_orphaned_nodes_from_sublist(nodes_sublist, df_edges):
     :param df_edges: ryšių poros, surašytais polars.DataFrame su "source_tbl" ir "target_tbl" stulpeliuose
     :return: tik tarpusavyje tiesioginių ryšių turinčių mazgų sąrašas
     """
-    df_edges = pl.DataFrame(df_edges, infer_schema_length=None)
+    df_edges = to_polars_df(df_edges, EDGES_SCHEMA)
     # Filter df_edges to include only rows where both source_tbl and target_tbl are in selected_items
     filtered_edges = df_edges.filter(
         pl.col("source_tbl").is_in(nodes_sublist) &
@@ -564,7 +587,7 @@ def convert_df2nested_dict(df, col_names):
     :param col_names: trijų stulpelių vardų sąrašas
     :return: dviejų lygių žodynas
     """
-    df = pl.DataFrame(df, infer_schema_length=None)  # užtikrinti, kad tikrai turim polars df
+    df = to_polars_df(df)  # užtikrinti, kad tikrai turim polars df
     if (not col_names) and (len(df.columns) == 3):
         col_names = df.columns
     elif len(col_names) != 3:
@@ -622,6 +645,18 @@ def change_style_for_activity(whether_set_active, style_dict=None):
     return style_dict
 
 
+def get_progress_reporter(set_progress):
+    """
+    Eigos pranešimo f-ja, kurią galima perduoti ilgai trunkančioms f-joms (pvz., `parse_file`):
+    jos kvietimai progress(atlikta, iš_viso, tekstas) paverčiami foninio Dash kvietimo set_progress((procentai, tekstas)).
+    :param set_progress: foninio Dash kvietimo (background callback) eigos f-ja
+    :return: f-ja progress(done, total, text)
+    """
+    def progress(done, total, text=""):
+        set_progress((int(100 * done / total) if total else 0, text))
+    return progress
+
+
 def snake_case_short(string):
     """
     Funkcija panaši į snake_case(), tačiau su įjungta turinio šalinimo tarp skliaustų parinktimi ir
@@ -682,18 +717,90 @@ def unidecode(string):
     return unicodedata.normalize("NFKD", string).encode('ascii', errors='ignore').decode('utf-8')
 
 
-def cleanup_old_cache(cache_dir="data-tmp", timeout=60*60*24):
+# ASCII tarpo ženklai, kuriuos Python laiko tarpais (str.strip() ir \s); Rust reguliariųjų išraiškų \s jų dalies neapima
+ASCII_WHITESPACE = " \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+
+
+def snake_case_short_expr(expr):
+    """
+    snake_case_short() atitikmuo polars išraiškomis – visas stulpelis apdorojamas be Python ciklo.
+    Rezultatas sutampa su `expr.map_elements(snake_case_short)`: tuščios (null) reikšmės lieka tuščios.
+    :param expr: polars išraiška (pvz., pl.col("column"))
+    :return: polars išraiška
+    """
+    return (
+        snake_case_expr(expr, remove_content_in_brackets=True)
+        .str.replace(r'(_identifikatorius|_identifier)$', '_id')
+        .str.replace(r'(_numeris|_number)$', '_nr')
+        .str.replace(r'_skaicius$', '_sk')
+    )
+
+
+def snake_case_expr(expr, remove_content_in_brackets=False):
+    """
+    snake_case() atitikmuo polars išraiškomis – visas stulpelis apdorojamas be Python ciklo.
+    Rezultatas sutampa su `expr.map_elements(snake_case)`: tuščios (null) reikšmės lieka tuščios.
+    :param expr: polars išraiška (pvz., pl.col("column"))
+    :param remove_content_in_brackets: ar pašalinti turinį tarp () ir [] skliaustų
+    :return: polars išraiška
+    """
+    expr = expr.cast(pl.String)
+    if remove_content_in_brackets:
+        expr = expr.str.replace_all(r'\([^)]+\)', '').str.replace_all(r'\[[^]]+\]', '')
+    return (
+        unidecode_expr(expr)
+        # _ įterpimas žodžių atskyrimui, kad nesusiplaktų viską vėliau pavertus mažosiomis raidėmis
+        .str.strip_chars(ASCII_WHITESPACE)
+        .str.replace_all(f'[{ASCII_WHITESPACE}\\-./]+', '_')
+        .str.replace_all(r'([a-z0-9])([A-Z])', '${1}_${2}')  # po mažosios arba skaičiaus prie didžiąją
+        .str.replace_all(r'([A-Z]+)([A-Z][a-z])', '${1}_${2}')  # po kelių didžiųjų eina žodis
+        # mažosiomis raidėmis, atrinkti tik lotyniškas raides ir skaičius
+        .str.to_lowercase()
+        .str.replace_all(r'[^a-z0-9_]', '')
+        .str.replace_all(r'_+', '_')  # jei šalia atsirado bent du „_“ greta - palikti tik vieną
+        .str.strip_chars('_')
+    )
+
+
+def unidecode_expr(expr):
+    """
+    unidecode() atitikmuo polars išraiškomis: ženklai išskaidomi į sudėtinius (NFKD) ir
+    pašalinami ASCII koduotėje nesantys simboliai.
+    :param expr: polars tekstinė išraiška
+    :return: polars išraiška
+    """
+    return expr.str.normalize("NFKD").str.replace_all(r'[^\x00-\x7F]', '')
+
+
+def cleanup_old_cache(
+    cache_dir="data-tmp", timeout=60*60*24, keep_dirs=("background", "parse-cache"), entry_dirs=("sessions",)
+):
     """
-    Ištrinti nurodytame podėlio kataloge (numatyta "data-tmp") esančias senas rinkmenas
+    Ištrinti nurodytame podėlio kataloge (numatyta "data-tmp") ir jo pakatalogiuose (pvz., "uploads") esančias
+    senas rinkmenas
     :param cache_dir: katalogas
     :param timeout: laikas sekundėmis, po kurio rinkmena laikoma sena (numatyta – 1 para)
+    :param keep_dirs: pakatalogių vardai, kurių neliesti; pvz., "background" turi diskcache duombazes,
+        kurios pačios tvarko savo įrašus ir kurių negalima trinti joms esant atvertoms, o "parse-cache" įrašus
+        pagal dydį šalina `utils_parse_cache.evict_parse_cache`
+    :param entry_dirs: pakatalogių vardai, kuriuose kiekvienas katalogas yra vienas įrašas (pvz., "sessions" –
+        išskleista darbo sesija); toks įrašas trinamas visas, kai sena tampa ir naujausia jo rinkmena
     """
     now = time.time()
     path = Path(cache_dir)
     if not path.exists():
         return
     for item in path.iterdir():
-        if item.is_file():
+        if item.is_dir():
+            if item.name in entry_dirs:
+                for entry in item.iterdir():
+                    if entry.is_dir():
+                        mtime = max([entry.stat().st_mtime] + [f.stat().st_mtime for f in entry.iterdir()])
+                        if now - mtime > timeout:
+                            shutil.rmtree(entry, ignore_errors=True)
+            elif item.name not in keep_dirs:
+                cleanup_old_cache(item, timeout=timeout, keep_dirs=keep_dirs, entry_dirs=entry_dirs)
+        elif item.is_file():
             mtime = item.stat().st_mtime
             if now - mtime > timeout:
                 try:
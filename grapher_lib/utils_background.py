@@ -0,0 +1,151 @@
+"""
+Foninių Dash kvietimų (background callbacks) vykdymas be išorinio tarpininko (broker).
+
+Rinkmenų nuskaitymas ir duomenų pateikimas vykdomi atskiruose procesuose per `dash.DiskcacheManager`, tad jie
+neužima serverio (pvz., gunicorn) gijos ir kitų naudotojų užklausos nelaukia eilėje. Įprastas `DiskcacheManager`
+kiekvienam darbui iškart paleidžia naują procesą neribodamas jų skaičiaus – čia darbai pirmiausia dedami į
+`BACKGROUND_WORKERS` dydžio gijų telkinio eilę, o procesas darbui paleidžiamas tik atsilaisvinus vietai.
+Darbų būsena (laukia eilėje ar vykdoma kuriame procese) laikoma tame pačiame diskcache podėlyje kaip ir rezultatai,
+tad darbą galima nutraukti (pvz., įkėlus naują rinkmeną) tiek jam laukiant, tiek vykdomą.
+"""
+"""
+(c) 2025 Mindaugas B.
+
+This code is distributed under the MIT License. For more details, see the LICENSE file in the project root.
+"""
+
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import diskcache
+import psutil
+from multiprocess import Process
+from dash import DiskcacheManager
+
+# Kiek foninių darbų vienu metu gali būti vykdoma; keičiama per aplinkos kintamąjį PDSA_GRAPHER_BACKGROUND_WORKERS
+BACKGROUND_WORKERS = int(os.environ.get("PDSA_GRAPHER_BACKGROUND_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Podėlio raktų, kuriuose laikoma darbų būsena, priešdėlis
+JOB_STATE_KEY_PREFIX = "pdsa-grapher-background-job-"
+# Po kiek sekundžių pamiršti niekieno neatsiimto darbo būseną
+JOB_STATE_EXPIRE = 24 * 60 * 60
+
+
+class BoundedDiskcacheManager(DiskcacheManager):
+    """
+    `DiskcacheManager`, vienu metu vykdantis ne daugiau kaip `workers` foninių darbų.
+    Kiekviena telkinio gija paleidžia vieno darbo procesą ir laukia jo pabaigos, tad kiti darbai laukia eilėje
+    dar neturėdami proceso. Darbo ID – ne proceso ID, o atsitiktinis identifikatorius, pagal kurį podėlyje randama
+    darbo būsena.
+    """
+
+    def __init__(self, cache_dir, workers=BACKGROUND_WORKERS, **kwargs):
+        """
+        :param cache_dir: katalogas diskcache podėliui, kuriame laikomi darbų rezultatai, eiga ir būsena
+        :param workers: kiek darbų vienu metu gali būti vykdoma
+        :param kwargs: kiti `DiskcacheManager` parametrai
+        """
+        super().__init__(diskcache.Cache(cache_dir), **kwargs)
+        self.workers = max(1, int(workers))
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pdsa-grapher-background")
+
+    def call_job_fn(self, key, job_fn, args, context):
+        """
+        Įdėti darbą į telkinio eilę; procesas jam paleidžiamas tik atsilaisvinus vietai (žr. `run_job_process`).
+        :param key: darbo rezultato podėlio raktas
+        :param job_fn: darbo f-ja
+        :param args: foninio kvietimo argumentai
+        :param context: foninio kvietimo kontekstas
+        :return: darbo ID
+        """
+        job = uuid.uuid4().hex
+        state = {"key": key, "owner": os.getpid(), "pid": None}
+        self.handle.set(JOB_STATE_KEY_PREFIX + job, state, expire=JOB_STATE_EXPIRE)
+        self.pool.submit(self.run_job_process, job, job_fn, (key, self._make_progress_key(key), args, context))
+        return job
+
+    def run_job_process(self, job, job_fn, job_args):
+        """
+        Telkinio gijoje paleisti darbo procesą ir laukti jo pabaigos, nebent darbas buvo nutrauktas dar laukdamas eilėje.
+        :param job: darbo ID
+        :param job_fn: darbo f-ja
+        :param job_args: darbo f-jos argumentai
+        """
+        state_key = JOB_STATE_KEY_PREFIX + job
+        if self.handle.get(state_key) is None:
+            return
+        process = Process(target=job_fn, args=job_args)
+        process.start()
+        with self.handle.transact():
+            state = self.handle.get(state_key)
+            if state is not None:
+                self.handle.set(state_key, dict(state, pid=process.pid), expire=JOB_STATE_EXPIRE)
+        if state is None:
+            # nutrauktas, kol buvo paleidžiamas procesas
+            kill_process_tree(process.pid)
+        process.join()
+        self.handle.delete(state_key)
+
+    def job_running(self, job):
+        """
+        Ar darbas dar laukia eilėje arba yra vykdomas.
+        :param job: darbo ID
+        :return: True arba False
+        """
+        state = self.handle.get(JOB_STATE_KEY_PREFIX + str(job)) if job else None
+        if state is None:
+            return False
+        return is_process_alive(state["pid"] or state["owner"])
+
+    def terminate_job(self, job):
+        """
+        Nutraukti darbą: laukiantis darbas išimamas iš eilės, o vykdomo darbo procesas nutraukiamas.
+        :param job: darbo ID
+        """
+        if not job:
+            return
+        state_key = JOB_STATE_KEY_PREFIX + str(job)
+        with self.handle.transact():
+            state = self.handle.get(state_key)
+            self.handle.delete(state_key)
+        if (state is not None) and (state["pid"] is not None):
+            kill_process_tree(state["pid"])
+
+    def terminate_unhealthy_job(self, job):
+        """
+        Pamiršti darbą, kurio vykdytojas nebeveikia.
+        :param job: darbo ID
+        :return: True, jei darbas buvo pamirštas
+        """
+        if job and (self.handle.get(JOB_STATE_KEY_PREFIX + str(job)) is not None) and not self.job_running(job):
+            self.handle.delete(JOB_STATE_KEY_PREFIX + str(job))
+            return True
+        return False
+
+
+def is_process_alive(pid):
+    """
+    Ar procesas dar vykdomas (nutrauktas, bet dar nesurinktas procesas laikomas nebevykdomu).
+    :param pid: proceso ID
+    :return: True arba False
+    """
+    try:
+        return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+
+
+def kill_process_tree(pid):
+    """
+    Nutraukti procesą kartu su jo vaikiniais procesais.
+    :param pid: proceso ID
+    """
+    try:
+        process = psutil.Process(pid)
+        for proc in process.children(recursive=True):
+            try:
+                proc.kill()
+            except psutil.NoSuchProcess:
+                pass
+        process.kill()
+    except psutil.NoSuchProcess:
+        pass
@@ -18,19 +18,222 @@ This code is distributed under the MIT License. For more details, see the LICENS
 import polars as pl
 import fastexcel  # noqa: būtina XLSX importavimui per polars
 import base64
+import codecs
 import io
+import os
+import re
+import secrets
 import csv
+import time
+import functools
 import charset_normalizer as chardet  # įprasta chardet kartais utf-8 klaidingai aptinka kaip Windows-1252, Johab
 import json
 import warnings
+try:
+    import orjson  # nebūtinas, bet JSON nuskaito kelis kartus greičiau
+except ImportError:
+    orjson = None
+from concurrent.futures import ThreadPoolExecutor
 from pydbml import PyDBML
+from grapher_lib import utils as gu
+from grapher_lib import utils_parse_cache as pc
+from grapher_lib import utils_session as us
 
+# Katalogas, į kurį dalimis įrašomos per `/upload` maršrutą (žr. main.py) įkeliamos rinkmenos
+UPLOAD_DIR = os.path.join("data-tmp", "uploads")
+# Kiek baitų vienu kartu skaityti iš užklausos srauto ir rašyti į diską
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+# Didžiausias vienos įkeliamos rinkmenos dydis; keičiamas per aplinkos kintamąjį PDSA_GRAPHER_MAX_UPLOAD_MB
+MAX_UPLOAD_BYTES = int(os.environ.get("PDSA_GRAPHER_MAX_UPLOAD_MB", "1024")) * 1024 * 1024
+# Po kiek sekundžių įkėlimo užraktas laikomas apleistu (pvz., užklausą vykdęs procesas nutrūko)
+UPLOAD_LOCK_STALE_SECONDS = 5 * 60
+# `save_upload_chunk` atsakymai, kai dalis neįrašoma
+UPLOAD_TOO_LARGE = -1  # rinkmena viršytų MAX_UPLOAD_BYTES
+UPLOAD_BUSY = -2  # tą pačią rinkmeną dar rašo kita užklausa
+UPLOAD_SIZE_EXCEEDED = -3  # rinkmena viršytų pradedant įkėlimą nurodytą dydį
+# Kiek eilučių nuskaityti iš skaičiuoklės lakšto įkėlimo metu; visas lakštas nuskaitomas tik jį pasirinkus
+SHEET_PREVIEW_ROWS = 10
+# Nuo kokio dydžio UTF-8 CSV rinkmenos įkeliant nuskaitomos tik iš dalies, o visos – tik prireikus per pl.scan_csv();
+# keičiamas per aplinkos kintamąjį PDSA_GRAPHER_CSV_LAZY_MB
+CSV_LAZY_MIN_BYTES = int(os.environ.get("PDSA_GRAPHER_CSV_LAZY_MB", "64")) * 1024 * 1024
+# Kiek baitų nuo CSV pradžios naudoti laukų skirtuko nustatymui
+CSV_SNIFF_SIZE = 64 * 1024
+# Pačios programos įrašomo JSON lakštai (žr. gui_callbacks_graph_extra.save_displayed_nodes_to_json)
+GRAPHER_JSON_SHEETS = {"tables", "columns", "refs"}
+GRAPHER_JSON_HEAD_PATTERN = re.compile(rb'(\xEF\xBB\xBF)?\s*\{\s*"(tables|columns|refs)"\s*:\s*\[')
+# Kiek tekstinės rinkmenos baitų naudoti koduotės nustatymui; visa rinkmena tiriama tik esant abejonių
+ENCODING_SAMPLE_SIZE = 256 * 1024
+# Koduotės nustatymo rezultatas laikomas abejotinu, jei charset_normalizer „netvarkos“ įvertis viršija šią ribą
+ENCODING_MAX_CHAOS = 0.1
+# Kiek rinkmenų vienu metu nuskaityti, kai įkeliamos kelios; keičiamas per aplinkos kintamąjį PDSA_GRAPHER_PARSE_WORKERS
+PARSE_WORKERS = int(os.environ.get("PDSA_GRAPHER_PARSE_WORKERS", "0")) or min(8, os.cpu_count() or 1)
 
-def parse_file(contents, list_of_names=None):
+
+def is_valid_upload_id(upload_id):
+    """
+    Tikrinti, ar naršyklės atsiųstas įkėlimo identifikatorius tinkamas naudoti kaip rinkmenos vardas.
+    :param upload_id: įkėlimo identifikatorius
+    :return: True arba False
+    """
+    return isinstance(upload_id, str) and bool(re.fullmatch(r"[A-Za-z0-9_-]{1,64}", upload_id))
+
+
+def get_upload_path(upload_id, upload_dir=UPLOAD_DIR):
+    """
+    Kelias iki rinkmenos, į kurią įrašomas įkėlimas.
+    :param upload_id: įkėlimo identifikatorius
+    :param upload_dir: įkėlimų katalogas
+    :return: kelias arba None, jei identifikatorius netinkamas
+    """
+    if not is_valid_upload_id(upload_id):
+        return None
+    return os.path.join(upload_dir, upload_id)
+
+
+def get_upload_offset(upload_id, upload_dir=UPLOAD_DIR):
+    """
+    Kiek baitų jau įkelta – nuo šios vietos naršyklė gali tęsti nutrūkusį įkėlimą.
+    :param upload_id: įkėlimo identifikatorius
+    :param upload_dir: įkėlimų katalogas
+    :return: įrašytų baitų skaičius arba None, jei toks įkėlimas nepradėtas
+    """
+    file_path = get_upload_path(upload_id, upload_dir)
+    if file_path and os.path.isfile(file_path):
+        return os.path.getsize(file_path)
+    return None
+
+
+def start_upload(size, upload_dir=UPLOAD_DIR, max_size=MAX_UPLOAD_BYTES):
+    """
+    Pradėti naują įkėlimą: sukurti tuščią rinkmeną serverio sugeneruotu atsitiktiniu identifikatoriumi.
+    Identifikatoriaus neįmanoma atspėti, tad skirtingų naudotojų įkėlimai nesusipainioja, net jei rinkmenos vienodos.
+    :param size: naršyklės nurodytas visos rinkmenos dydis baitais
+    :param upload_dir: įkėlimų katalogas
+    :param max_size: didžiausias leidžiamas rinkmenos dydis baitais
+    :return: įkėlimo identifikatorius arba None, jei rinkmena per didelė
+    """
+    if not (0 <= size <= max_size):
+        return None
+    upload_id = secrets.token_urlsafe(24)
+    os.makedirs(upload_dir, exist_ok=True)
+    file_path = get_upload_path(upload_id, upload_dir)
+    with open(f"{file_path}.size", "w") as f:
+        f.write(str(size))
+    open(file_path, "wb").close()
+    return upload_id
+
+
+def get_upload_declared_size(upload_id, upload_dir=UPLOAD_DIR):
+    """
+    Pradedant įkėlimą naršyklės nurodytas visos rinkmenos dydis (žr. `start_upload`).
+    :param upload_id: įkėlimo identifikatorius
+    :param upload_dir: įkėlimų katalogas
+    :return: dydis baitais arba None, jei nežinomas
+    """
+    file_path = get_upload_path(upload_id, upload_dir)
+    try:
+        with open(f"{file_path}.size") as f:
+            return int(f.read())
+    except (TypeError, OSError, ValueError):
+        return None
+
+
+def acquire_upload_lock(upload_id, upload_dir=UPLOAD_DIR):
+    """
+    Užrakinti įkėlimą, kad tos pačios rinkmenos vienu metu nerašytų kelios užklausos (pvz., naršyklei pakartojus
+    dalį, kol ankstesnė užklausa dar siunčiama). Užraktas – šalia įkėlimo sukuriama `.lock` rinkmena;
+    jos sukūrimas atominis ir veikia tarp kelių serverio procesų. Apleistas užraktas perimamas.
+    :param upload_id: įkėlimo identifikatorius
+    :param upload_dir: įkėlimų katalogas
+    :return: užrakto kelias arba None, jei įkėlimas jau užrakintas
+    """
+    lock_path = f"{get_upload_path(upload_id, upload_dir)}.lock"
+    for _attempt in range(2):
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return lock_path
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) < UPLOAD_LOCK_STALE_SECONDS:
+                    return None
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass  # ką tik atrakino kita užklausa
+    return None
+
+
+def save_upload_chunk(upload_id, offset, stream, upload_dir=UPLOAD_DIR, max_size=MAX_UPLOAD_BYTES):
+    """
+    Įrašyti vieną įkeliamos rinkmenos dalį į diską, skaitant ją iš užklausos srauto blokais (nelaikant visos atmintyje).
+    Įkėlimas turi būti pradėtas per start_upload(). Rašoma tik užrakinus įkėlimą (žr. `acquire_upload_lock`),
+    tad `offset` patikrinimas ir rašymas kitų užklausų nepertraukiami.
+    :param upload_id: įkėlimo identifikatorius
+    :param offset: nuo kurio baito ši dalis prasideda
+    :param stream: srautas su dalies turiniu, pvz., flask.request.stream
+    :param upload_dir: įkėlimų katalogas
+    :param max_size: didžiausias leidžiamas rinkmenos dydis baitais
+    :return: kiek baitų įrašyta iš viso po šios dalies; None, jei `offset` nesutampa su jau įrašytu kiekiu;
+        UPLOAD_BUSY, jei įkėlimą dar rašo kita užklausa; UPLOAD_TOO_LARGE arba UPLOAD_SIZE_EXCEEDED, jei rinkmena
+        viršytų `max_size` arba pradedant nurodytą dydį (tuomet įkėlimas ištrinamas)
+    """
+    file_path = get_upload_path(upload_id, upload_dir)
+    if file_path is None:
+        return None
+    lock_path = acquire_upload_lock(upload_id, upload_dir)
+    if lock_path is None:
+        return UPLOAD_BUSY
+    try:
+        if offset != get_upload_offset(upload_id, upload_dir):
+            return None  # Dalis ne iš eilės – naršyklė turės tęsti nuo serverio nurodytos vietos
+        declared_size = get_upload_declared_size(upload_id, upload_dir)
+        size_limit = max_size if declared_size is None else min(max_size, declared_size)
+        size = offset
+        with open(file_path, "ab") as f:
+            while True:
+                block = stream.read(UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                size += len(block)
+                if size > size_limit:
+                    break
+                f.write(block)
+                os.utime(lock_path)  # užraktas dar naudojamas
+        if size > size_limit:
+            for path in [file_path, f"{file_path}.size"]:
+                if os.path.exists(path):
+                    os.remove(path)
+            return UPLOAD_TOO_LARGE if size > max_size else UPLOAD_SIZE_EXCEEDED
+        return size
+    finally:
+        os.remove(lock_path)
+
+
+def get_uploaded_files(upload_data, upload_dir=UPLOAD_DIR):
+    """
+    Iš įkėlimo dcc.Store reikšmės (ją nustato assets/chunkedUpload.js) gauti serveryje įrašytų rinkmenų kelius ir vardus.
+    :param upload_data: žodynas {"files": [{"upload_id": "", "filename": ""}], "timestamp": 0}
+    :param upload_dir: įkėlimų katalogas
+    :return: (kelių sąrašas, vardų sąrašas); neįkeltos ar netinkamos rinkmenos praleidžiamos
+    """
+    file_paths = []
+    file_names = []
+    if isinstance(upload_data, dict) and isinstance(upload_data.get("files"), list):
+        for file_info in upload_data["files"]:
+            file_path = get_upload_path(file_info.get("upload_id"), upload_dir)
+            if file_path and os.path.isfile(file_path):
+                file_paths.append(file_path)
+                file_names.append(file_info.get("filename") or os.path.basename(file_path))
+    return file_paths, file_names
+
+
+def parse_file(contents, list_of_names=None, progress=None):
     """
     Įkelto dokumento duomenų gavimas. Jei kartais įkeliami keli, jie grąžinami skirtinguose lakštuose.
-    :param contents: XLSX, XLS, ODS, CSV, TSV, JSON, DBML turinys kaip base64 duomenys
+    :param contents: XLSX, XLS, ODS, CSV, TSV, JSON, DBML turinių sąrašas, kur kiekvienas elementas yra
+        arba kelias iki serveryje įrašytos rinkmenos, arba base64 duomenys iš dcc.Upload ("data:...;base64,...")
     :param list_of_names: įkeltų rinkmenų vardų sąrašas.
+    :param progress: (nebūtina) eigos pranešimo f-ja progress(atlikta, iš_viso, tekstas), žr. `gu.get_progress_reporter`;
+        vienai rinkmenai eiga pranešama pagal lakštus, kelioms – pagal nuskaitytas rinkmenas
     :return: nuskaitytos rinkmenos duomenų struktūra kaip žodynas XLSX atveju
         arba tekstas (string) klaidos atveju.
         Duomenų struktūros kaip žodyno pavyzdys:
@@ -40,49 +243,36 @@ def parse_file(contents, list_of_names=None):
                         {
                             "df_columns": [],      # visi stulpeliai
                             "df_columns_str": [],  # tik tekstinio tipo stulpeliai
-                            "df": []
+                            "df_profile": {},      # stulpelių aprašas, žr. `get_schema_profile`
+                            "df": polars DataFrame
                         }
                     },
             }
     """
     if not contents:
         return _("There was an error while processing file of unknown type")
-    parse_output = {"file_data": {}}
-    for content_i, header_and_content in enumerate(contents):
+    filenames = []
+    for content_i in range(len(contents)):
         if list_of_names and isinstance(list_of_names, list) and (len(list_of_names) >= content_i + 1):
-            filename = list_of_names[content_i]
+            filenames.append(list_of_names[content_i])
         else:
-            filename = f"{content_i + 1}"
-        content_base64 = header_and_content.split(",")[1]
-        content_bytestring = base64.b64decode(content_base64)
+            filenames.append(f"{content_i + 1}")
+    if len(contents) == 1:
+        # jei vienintelis - grąžinti originalų tekstą arba žodyną
+        return parse_single_file(contents[0], filenames[0], progress=progress)
 
-        # Ar tai Excel .xls (\xD0\xCF\x11\xE0) arba .zip/.xlsx/.ods (PK\x03\x04)?
-        is_excel = content_bytestring.startswith(b"\xD0\xCF\x11\xE0") or content_bytestring.startswith(b"PK\x03\x04")
-        if is_excel:
-            parse_output1 = parse_excel(content_bytestring)  # Bandyti nuskaityti tarsi Excel XLS, XLSX arba LibreOffice ODS
-        elif not filename.lower().endswith((".json", ".csv", ".tsv", ".txt", ".dbml")):
-            parse_output1 = _("Unsupported file format")  # Nepalaikomas formatas
-        else:
-            text_encoding = chardet.detect(content_bytestring)["encoding"]  # automatiškai nustatyti koduotę
-            if not text_encoding:
-                parse_output1 = _("Can not detect text encoding")
-            else:
-                content_text = content_bytestring.decode(text_encoding)  # Iškoduoti bitų eilutę į paprasto testo eilutę
-                if filename.lower().endswith(".json"):
-                    parse_output1 = parse_json(content_text, filename[:-5])  # Bandyti nuskaityti tarsi JSON
-                elif filename[-5:].lower() in [".dbml"]:
-                    parse_output1 = parse_dbml(content_text)  # Bandyti nuskaityti tarsi DBML
-                elif filename[-4:].lower() in [".csv", ".tsv"]:
-                    parse_output1 = parse_csv(content_text, filename[:-4])  # Bandyti nuskaityti tarsi CSV
-                else:
-                    # Bandyti paeiliui kaip JSON arba CSV
-                    json_parse_output = parse_json(content_text, filename)  # Bandyti nuskaityti tarsi JSON
-                    if isinstance(json_parse_output, dict):
-                        parse_output1 = json_parse_output
-                    else:
-                        parse_output1 = parse_csv(content_text, filename)  # Bandyti nuskaityti tarsi CSV
-        if len(contents) == 1:
-            return parse_output1  # jei vienintelis - grąžinti originalų tekstą arba žodyną
+    # Kelias rinkmenas nuskaityti lygiagrečiai. Naudojamos gijos, nes polars nuskaitydamas atleidžia GIL,
+    # o rezultatų (DataFrame) nereikia kopijuoti tarp procesų
+    parse_outputs = []
+    with ThreadPoolExecutor(max_workers=min(PARSE_WORKERS, len(contents))) as executor:
+        for filename, parse_output1 in zip(filenames, executor.map(parse_single_file, contents, filenames)):
+            parse_outputs.append(parse_output1)
+            if progress:
+                progress(len(parse_outputs), len(contents), get_parse_progress_text(filename, parse_output1))
+
+    # Sujungti rezultatus ta pačia tvarka, kaip buvo įkeltos rinkmenos
+    parse_output = {"file_data": {}}
+    for filename, parse_output1 in zip(filenames, parse_outputs):
         if isinstance(parse_output1, dict) and ("file_data" in parse_output1) and parse_output1["file_data"]:
             # Sėkmingai nuskaityta
             parse_output_keys = list(parse_output["file_data"].keys())
@@ -101,17 +291,274 @@ def parse_file(contents, list_of_names=None):
     return parse_output
 
 
-def parse_excel(byte_string):
+def parse_single_file(header_and_content, filename, progress=None):
+    """
+    Pagalbinė `parse_file` funkcija vienos rinkmenos nuskaitymui. Jei tokio paties turinio rinkmena jau buvo
+    nuskaityta, rezultatas imamas iš podėlio (žr. utils_parse_cache.py).
+    :param header_and_content: kelias iki serveryje įrašytos rinkmenos arba base64 duomenys iš dcc.Upload
+    :param filename: rinkmenos vardas
+    :param progress: (nebūtina) eigos pranešimo f-ja progress(atlikta, iš_viso, tekstas)
+    :return: žodynas, kaip aprašyta prie `parse_file` f-jos, arba tekstas (string) klaidos atveju
+    """
+    parse_start = time.perf_counter()
+    if progress:
+        progress(0, 1, _("Reading %s") % filename)
+    if header_and_content.startswith("data:"):
+        # dcc.Upload base64 turinys
+        file_path = None
+        content_base64 = header_and_content.split(",")[1]
+        content_bytestring = base64.b64decode(content_base64)
+        content_head = content_bytestring[:4]
+    elif os.path.isfile(header_and_content):
+        # Per /upload maršrutą serveryje įrašyta rinkmena - kol kas skaitome tik pradžią
+        file_path = header_and_content
+        content_bytestring = None
+        with open(file_path, "rb") as f:
+            content_head = f.read(4)
+    else:
+        return _("There was an error while processing file of unknown type")
+
+    # Ar jau nuskaityta anksčiau?
+    cache_key = pc.get_content_hash(file_path or content_bytestring, filename)
+    if content_head.startswith(b"PK\x03\x04") and us.is_session_file(file_path or content_bytestring):
+        # Šios programos įrašyta darbo sesija – ji ir taip greitai atkuriama, tad podėlyje nesaugoma
+        return set_parse_time(parse_session(file_path or content_bytestring, cache_key), parse_start)
+    cached_output = pc.load_parse_cache(cache_key)
+    if cached_output is not None:
+        lazy_sheets = [info for info in cached_output["file_data"].values() if "source" in info]
+        if not lazy_sheets:
+            return set_parse_time(cached_output, parse_start)
+        elif file_path:
+            for info in lazy_sheets:
+                info["source"] = file_path  # anksčiau įkeltos rinkmenos jau gali nebūti
+            return set_parse_time(cached_output, parse_start)
+
+    text_encoding = None  # tik tekstinėms rinkmenoms
+    # Ar tai Excel .xls (\xD0\xCF\x11\xE0) arba .zip/.xlsx/.ods (PK\x03\x04)?
+    is_excel = content_head.startswith(b"\xD0\xCF\x11\xE0") or content_head.startswith(b"PK\x03\x04")
+    if is_excel:
+        # Bandyti nuskaityti tarsi Excel XLS, XLSX arba LibreOffice ODS
+        parse_output1 = parse_excel(file_path or content_bytestring, cache_key=cache_key, progress=progress)
+    elif not filename.lower().endswith((".json", ".csv", ".tsv", ".txt", ".dbml")):
+        parse_output1 = _("Unsupported file format")  # Nepalaikomas formatas
+    elif filename[-4:].lower() in [".csv", ".tsv"] and file_path and is_large_utf8_file(file_path):
+        # Didelis UTF-8 CSV – kol kas nuskaityti tik pradžią, visą nuskaitys `get_sheet_df` per pl.scan_csv()
+        parse_output1 = parse_csv(file_path, filename[:-4], lazy=True, cache_key=cache_key)
+        text_encoding = "utf_8"
+    else:
+        if content_bytestring is None:
+            with open(file_path, "rb") as f:
+                content_bytestring = f.read()
+        if filename[-4:].lower() in [".csv", ".tsv"]:
+            # CSV polars skaito tiesiai iš UTF-8 baitų, nekuriant tarpinio Python teksto
+            csv_bytes, text_encoding = get_utf8_bytes(content_bytestring)
+            if text_encoding:
+                parse_output1 = parse_csv(csv_bytes, filename[:-4])  # Bandyti nuskaityti tarsi CSV
+        elif filename.lower().endswith(".json"):
+            # JSON taip pat skaitomas iš UTF-8 baitų
+            json_bytes, text_encoding = get_utf8_bytes(content_bytestring)
+            if text_encoding:
+                parse_output1 = parse_json(json_bytes, filename[:-5])  # Bandyti nuskaityti tarsi JSON
+        else:
+            # Automatiškai nustatyti koduotę ir iškoduoti bitų eilutę į paprasto testo eilutę
+            content_text, text_encoding = decode_text(content_bytestring)
+            if not text_encoding:
+                pass
+            elif filename[-5:].lower() in [".dbml"]:
+                parse_output1 = parse_dbml(content_text)  # Bandyti nuskaityti tarsi DBML
+            else:
+                # Bandyti paeiliui kaip JSON arba CSV
+                json_parse_output = parse_json(content_text, filename)  # Bandyti nuskaityti tarsi JSON
+                if isinstance(json_parse_output, dict):
+                    parse_output1 = json_parse_output
+                else:
+                    parse_output1 = parse_csv(content_text, filename)  # Bandyti nuskaityti tarsi CSV
+        if not text_encoding:
+            parse_output1 = _("Can not detect text encoding")
+    if isinstance(parse_output1, dict) and text_encoding:
+        for sheet_info in parse_output1["file_data"].values():
+            sheet_info["encoding"] = text_encoding  # parodyti naudotojui
+    pc.save_parse_cache(cache_key, parse_output1)
+    if progress:
+        progress(1, 1, get_parse_progress_text(filename, parse_output1))
+    return set_parse_time(parse_output1, parse_start)
+
+
+def get_parse_progress_text(name, parse_output):
+    """
+    Eigos užrašas apie nuskaitytą rinkmeną ar lakštą su nuskaitytų eilučių skaičiumi.
+    Dar nenuskaitytų lakštų (žr. `get_lazy_sheet_info`) eilutės neskaičiuojamos.
+    :param name: rinkmenos ar lakšto vardas
+    :param parse_output: `parse_single_file` rezultatas arba vieno lakšto informacijos žodynas
+    :return: tekstas
+    """
+    if not isinstance(parse_output, dict):
+        return name
+    sheets = parse_output["file_data"].values() if isinstance(parse_output.get("file_data"), dict) else [parse_output]
+    n_rows = sum(sheet_info["df"].height for sheet_info in sheets if isinstance(sheet_info.get("df"), pl.DataFrame))
+    return _("%s (%d rows)") % (name, n_rows)
+
+
+def set_parse_time(parse_output, parse_start):
+    """
+    Prie kiekvieno nuskaityto lakšto pažymėti, kiek sekundžių truko rinkmenos nuskaitymas (įskaitant paiešką podėlyje).
+    :param parse_output: `parse_single_file` rezultatas
+    :param parse_start: nuskaitymo pradžios laikas pagal time.perf_counter()
+    :return: tas pats parse_output
+    """
+    if isinstance(parse_output, dict) and isinstance(parse_output.get("file_data"), dict):
+        parse_time = round(time.perf_counter() - parse_start, 3)
+        for sheet_info in parse_output["file_data"].values():
+            sheet_info["parse_time"] = parse_time
+    return parse_output
+
+
+def decode_text(content_bytestring, sample_size=ENCODING_SAMPLE_SIZE):
+    """
+    Tekstinės rinkmenos koduotės nustatymas ir iškodavimas. Kad dideliems dokumentams tai netruktų ilgai,
+    pirmiausia tikrinamas BOM ir ar tekstas tinkamas UTF-8, paskui koduotė spėjama tik iš ištraukos;
+    visas dokumentas charset_normalizer tiriamas tik tada, kai spėjimas abejotinas arba su juo nepavyksta iškoduoti.
+    :param content_bytestring: rinkmenos turinys baitais
+    :param sample_size: kiek baitų naudoti spėjimui
+    :return: (tekstas, koduotė) arba (None, None), jei koduotės nustatyti nepavyko
+    """
+    # BOM; UTF-32 tikrinti anksčiau nei UTF-16, nes jų BOM pradžia sutampa
+    for bom, bom_encoding in [
+        (b"\xEF\xBB\xBF", "utf_8_sig"),
+        (b"\xFF\xFE\x00\x00", "utf_32"),
+        (b"\x00\x00\xFE\xFF", "utf_32"),
+        (b"\xFF\xFE", "utf_16"),
+        (b"\xFE\xFF", "utf_16"),
+    ]:
+        if content_bytestring.startswith(bom):
+            try:
+                return content_bytestring.decode(bom_encoding), bom_encoding
+            except UnicodeDecodeError:
+                break
+
+    # Dažniausias atvejis – UTF-8 (įskaitant ASCII); Python tai patikrina greitai
+    try:
+        return content_bytestring.decode("utf_8"), "utf_8"
+    except UnicodeDecodeError as e:
+        # Spėjimui imti ištrauką nuo eilutės, kurioje pirmą kartą pasitaikė ne UTF-8 baitas,
+        # nes ASCII pradžia (pvz., antraštė) apie koduotę nieko nepasako
+        sample_start = content_bytestring.rfind(b"\n", max(0, e.start - 1024), e.start) + 1
+
+    # Spėti iš ištraukos
+    if len(content_bytestring) > sample_size:
+        sample = content_bytestring[sample_start:sample_start + sample_size]
+        best_guess = chardet.from_bytes(sample).best()
+        if (best_guess is not None) and (best_guess.chaos <= ENCODING_MAX_CHAOS):
+            try:
+                return content_bytestring.decode(best_guess.encoding), best_guess.encoding
+            except (UnicodeDecodeError, LookupError):
+                pass  # toliau pasitaiko simbolių, netinkamų spėtai koduotei
+
+    # Tirti visą dokumentą
+    text_encoding = chardet.detect(content_bytestring)["encoding"]
+    if not text_encoding:
+        return None, None
+    try:
+        return content_bytestring.decode(text_encoding), text_encoding
+    except (UnicodeDecodeError, LookupError):
+        return None, None
+
+
+def get_utf8_bytes(content_bytestring):
+    """
+    Tekstinės rinkmenos turinį pateikti UTF-8 baitais, kuriuos tiesiogiai gali skaityti polars.
+    UTF-8 ir ASCII turinys grąžinamas nekopijuojant, kitos koduotės perkoduojamos.
+    :param content_bytestring: rinkmenos turinys baitais
+    :return: (UTF-8 baitai, pradinė koduotė) arba (None, None), jei koduotės nustatyti nepavyko
+    """
+    if content_bytestring.isascii():
+        return content_bytestring, "utf_8"
+    content_text, text_encoding = decode_text(content_bytestring)
+    if text_encoding in ["utf_8", "utf_8_sig"]:
+        return content_bytestring, text_encoding  # polars pats praleidžia UTF-8 BOM
+    elif text_encoding:
+        return content_text.encode("utf_8"), text_encoding
+    return None, None
+
+
+def is_large_utf8_file(file_path, min_size=CSV_LAZY_MIN_BYTES):
+    """
+    Ar rinkmena pakankamai didelė, kad ją verta skaityti tik prireikus per pl.scan_csv(), ir ar ji UTF-8 koduotės
+    (tik tokias polars gali skaityti tiesiai iš disko). Pirmiausia tikrinamas BOM, paskui visa rinkmena iškoduojama
+    dalimis, neįkeliant jos į atmintį ir nekuriant teksto; sustojama ties pirmu ne UTF-8 baitu.
+    :param file_path: kelias iki rinkmenos
+    :param min_size: mažiausias dydis baitais
+    :return: True arba False
+    """
+    if os.path.getsize(file_path) < min_size:
+        return False
+    decoder = codecs.getincrementaldecoder("utf_8")()
+    try:
+        with open(file_path, "rb") as f:
+            block = f.read(UPLOAD_BLOCK_SIZE)
+            if block.startswith((b"\xFF\xFE", b"\xFE\xFF", b"\x00\x00\xFE\xFF")):
+                return False  # UTF-16 ar UTF-32 BOM; UTF-8 BOM polars praleidžia pats
+            while block:
+                if not block.isascii():
+                    decoder.decode(block)
+                elif decoder.getstate()[0]:
+                    decoder.decode(block)  # užbaigti ankstesnėje dalyje perkirstą simbolį
+                block = f.read(UPLOAD_BLOCK_SIZE)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def get_parse_time(parse_output):
+    """
+    Kiek sekundžių truko rinkmenų nuskaitymas (žr. `set_parse_time`). Kelios rinkmenos skaitomos lygiagrečiai,
+    tad imamas ilgiausias laikas.
+    :param parse_output: `parse_file` rezultatas {"file_data": {...}}
+    :return: sekundės arba None, jei nežinoma
+    """
+    if isinstance(parse_output, dict) and isinstance(parse_output.get("file_data"), dict):
+        parse_times = [
+            sheet_info["parse_time"] for sheet_info in parse_output["file_data"].values() if "parse_time" in sheet_info
+        ]
+        if parse_times:
+            return max(parse_times)
+    return None
+
+
+def get_file_encodings(parse_output):
+    """
+    Tekstinių rinkmenų koduotės, nustatytos jas nuskaitant (žr. `decode_text`).
+    :param parse_output: `parse_file` rezultatas {"file_data": {...}}
+    :return: koduočių sąrašas be pasikartojimų
+    """
+    encodings = []
+    if isinstance(parse_output, dict) and isinstance(parse_output.get("file_data"), dict):
+        for sheet_info in parse_output["file_data"].values():
+            encoding = sheet_info.get("encoding")
+            if encoding and (encoding not in encodings):
+                encodings.append(encoding)
+    return encodings
+
+
+def parse_excel(source, cache_key=None, progress=None):
     """
     Pagalbinė `parse_file` funkcija skaičiuoklės dokumentų XLSX, XLS, ODS formatais nuskaitymui.
+    Jei pateiktas kelias iki rinkmenos, nuskaitomi tik lakštų vardai ir pirmosios eilutės, o visą lakštą
+    nuskaitys `get_sheet_df`, kai naudotojas tą lakštą pasirinks.
 
-    :param byte_string: dokumento turinys (jau iškoduotas su base64.b64decode)
+    :param source: kelias iki rinkmenos arba dokumento turinys (jau iškoduotas su base64.b64decode)
+    :param cache_key: nuskaitymų podėlio raktas, pagal kurį išsaugomi vėliau nuskaityti visi lakštai
+    :param progress: (nebūtina) eigos pranešimo f-ja progress(atlikta, iš_viso, tekstas), kviečiama po kiekvieno lakšto
     :return: žodynas, kaip aprašyta prie `parse_file` f-jos
     """
     xlsx_parse_output = {"file_data": {}}
 
     try:
-        xlsx_file = pl.read_excel(io.BytesIO(byte_string), sheet_id=0, raise_if_empty=False)
+        if isinstance(source, (bytes, bytearray)):
+            xlsx_file = pl.read_excel(io.BytesIO(source), sheet_id=0, raise_if_empty=False)
+        else:
+            xlsx_file = {sheet_name: None for sheet_name in fastexcel.read_excel(source).sheet_names}
     except Exception as e:
         msg = _("There was an error while processing spreadsheet file")
         warnings.warn(f"{msg}:\n {e}")
@@ -123,12 +570,18 @@ def parse_excel(byte_string):
     for sheet_name in xlsx_file.keys():
         try:
             df = xlsx_file[sheet_name]
-            info_table = {
-                "df_columns": list(df.columns),  # visi stulpeliai
-                "df_columns_str": df.select(pl.col(pl.Utf8)).columns,  # tik tekstinio tipo stulpeliai
-                "df": df.to_dicts()
-            }
+            if df is None:
+                # Tik pirmosios eilutės; visas lakštas bus nuskaitytas per get_sheet_df()
+                df_preview = pl.read_excel(
+                    source, sheet_name=sheet_name, read_options={"n_rows": SHEET_PREVIEW_ROWS}, raise_if_empty=False
+                )
+                info_table = get_lazy_sheet_info(df_preview, source, sheet_name, cache_key)
+            else:
+                info_table = get_sheet_info(df)
             xlsx_parse_output["file_data"][sheet_name] = info_table
+            if progress:
+                progress_text = get_parse_progress_text(sheet_name, info_table)
+                progress(len(xlsx_parse_output["file_data"]), len(xlsx_file), progress_text)
         except Exception as e:
             msg = _("There was an error while processing sheet \"%s\"") % sheet_name
             warnings.warn(f"{msg}:\n {e}")
@@ -139,11 +592,32 @@ def parse_excel(byte_string):
         return _("There was an error while processing spreadsheet file")
 
 
-def parse_json(content_text, filename="JSON"):
+@functools.lru_cache(maxsize=32)
+def read_excel_sheet(source, sheet_name, source_mtime=None, cache_key=None):
+    """
+    Visą skaičiuoklės lakštą nuskaityti į polars DataFrame. Rezultatas įsimenamas atmintyje ir nuskaitymų podėlyje,
+    tad pakartotinai pasirenkant tą patį lakštą ar vėl įkėlus tą pačią rinkmeną jis nebeskaitomas iš naujo.
+    :param source: kelias iki XLSX, XLS ar ODS rinkmenos
+    :param sheet_name: lakšto vardas
+    :param source_mtime: rinkmenos keitimo laikas – tik tam, kad pakeitus rinkmeną nebūtų grąžinamas senas turinys
+    :param cache_key: nuskaitymų podėlio raktas (žr. utils_parse_cache.py)
+    :return: polars DataFrame
+    """
+    df = pc.load_sheet_frame(cache_key, sheet_name) if cache_key else None
+    if df is None:
+        df = pl.read_excel(source, sheet_name=sheet_name, raise_if_empty=False)
+        if cache_key:
+            pc.save_sheet_frame(cache_key, sheet_name, df)
+    return df
+
+
+def parse_json(content, filename="JSON"):
     """
     Pagalbinė `parse_file` funkcija JSON nuskaitymui.
+    Pačios programos įrašytas JSON (žr. `save_displayed_nodes_to_json`) su "tables", "columns", "refs" sąrašais
+    iš karto verčiamas į lenteles, nenustatinėjant JSON gylio (žr. `read_grapher_json`).
 
-    :param content_text: JSON turinys kaip tekstas
+    :param content: JSON turinys kaip tekstas arba UTF-8 baitai
     :param filename: rinkmenos vardas, kuris naudojamas kaip vardas išvedimo žodyne, jei būtų maža JSON struktūra
     :return: žodynas, kaip aprašyta prie `parse_file` f-jos
     """
@@ -162,8 +636,32 @@ def parse_json(content_text, filename="JSON"):
         return level
 
     try:
-        json_data = json.loads(content_text)
-        json_depth_level = json_depth(json_data)
+        json_data = read_grapher_json(content)
+        if (json_data is None) and (orjson is not None):
+            try:
+                if isinstance(content, bytes) and content.startswith(codecs.BOM_UTF8):
+                    json_data = orjson.loads(memoryview(content)[len(codecs.BOM_UTF8):])  # be kopijavimo
+                else:
+                    json_data = orjson.loads(content)
+            except orjson.JSONDecodeError:
+                pass  # pvz., per dideli sveikieji skaičiai – bandyti su json; jei ir ten klaida, ją parodyti
+        if json_data is None:
+            json_data = json.loads(content)
+
+        if (
+            isinstance(json_data, dict) and (len(json_data) > 1) and
+            set(json_data.keys()).issubset(GRAPHER_JSON_SHEETS) and
+            all(
+                isinstance(records, pl.DataFrame) or
+                (isinstance(records, list) and all(isinstance(record, dict) and record for record in records))
+                for records in json_data.values()
+            ) and
+            any(len(records) for records in json_data.values())
+        ):
+            # Programos eksportuotas JSON – kiekvienas sąrašas yra atskiras lakštas, gylio skaičiuoti nereikia
+            json_depth_level = 4
+        else:
+            json_depth_level = json_depth(json_data)
     except Exception as e:
         msg = _("There was an error while reading file as JSON")
         msg = f"{msg}:\n {e}"
@@ -185,11 +683,7 @@ def parse_json(content_text, filename="JSON"):
                 msg = _("Unexpected JSON schema")
                 warnings.warn(f"{msg}:\n {df.schema}")
                 return msg
-            info_table = {
-                "df_columns": list(df.columns),  # visi stulpeliai
-                "df_columns_str": df.select(pl.col(pl.Utf8)).columns,  # tik tekstinio tipo stulpeliai
-                "df": df.to_dicts()
-            }
+            info_table = get_sheet_info(df)
             json_parse_output["file_data"][sheet_name] = info_table
         except Exception as e:
             msg = _("There was an error while processing sheet \"%s\"") % sheet_name
@@ -201,9 +695,40 @@ def parse_json(content_text, filename="JSON"):
         return _("There was an error while processing file as JSON")
 
 
+def read_grapher_json(content):
+    """
+    Pačios programos įrašytą JSON {"tables": [...], "columns": [...], "refs": [...]} nuskaityti polars skaitytuvu
+    tiesiai į lenteles, nekuriant Python objektų kiekvienam įrašui.
+    :param content: JSON turinys UTF-8 baitais
+    :return: žodynas {lakštas: polars DataFrame} arba None, jei tai ne tokios struktūros JSON
+    """
+    if not (isinstance(content, bytes) and GRAPHER_JSON_HEAD_PATTERN.match(content[:1024])):
+        return None
+    try:
+        df = pl.read_json(content, infer_schema_length=None)
+    except Exception:  # noqa: Mums visai nerūpi, kokia tai klaida – tada skaitysime įprastai
+        return None
+    if (len(df.columns) < 2) or not set(df.columns).issubset(GRAPHER_JSON_SHEETS) or (df.height != 1):
+        return None
+    json_data = {}
+    for sheet_name, dtype in df.schema.items():
+        if not isinstance(dtype, pl.List):
+            return None
+        elif isinstance(dtype.inner, pl.Struct):
+            json_data[sheet_name] = df.select(pl.col(sheet_name).explode()).unnest(sheet_name)
+        elif dtype.inner == pl.Null:
+            json_data[sheet_name] = pl.DataFrame()  # tuščias sąrašas
+        else:
+            return None  # sąraše ne įrašai
+    if all(df_sheet.is_empty() for df_sheet in json_data.values()):
+        return None
+    return json_data
+
+
 def parse_dbml(content_text):
     """
     Pagalbinė `parse_file` funkcija DBML nuskaitymui.
+    Lentelės, stulpeliai ir ryšiai peržiūrimi po vieną kartą, o jų reikšmės iškart kaupiamos stulpeliais.
 
     :param content_text: DBML turinys kaip tekstas
     :return: žodynas, kaip aprašyta prie `parse_file` f-jos
@@ -213,73 +738,66 @@ def parse_dbml(content_text):
         """
         Šalinti stulpelius, kuriuose visos reikšmės vienodos
         """
-        columns_to_drop = []
-        for col in pl_df.columns:
-            unique_values = pl_df[col].unique()
-            if len(unique_values) == 1:
-                columns_to_drop.append(col)
-        return pl_df.drop(columns_to_drop)
+        if pl_df.is_empty():
+            return pl_df
+        n_unique = pl_df.select(pl.all().n_unique()).row(0, named=True)
+        return pl_df.drop([col for col, n in n_unique.items() if n == 1])
 
     try:
         dbml = PyDBML(content_text)
-        tables = []
-        columns = []
-        refs = []
+        tables = {"schema": [], "table": [], "alias": [], "comment": []}
+        columns = {
+            "schema": [], "table": [], "column": [], "comment": [], "type": [],
+            "is_primary": [], "unique": [], "not_null": [],
+        }
+        refs = {"table": [], "column": [], "referenced_table": [], "referenced_column": []}
 
-        # Info apie lenteles
+        # Info apie lenteles ir jų stulpelius
         for table in dbml.tables:
             table_schema = table.schema
             table_name = table.name
-            tables.append({
-                "schema": table_schema,
-                "table": table_name,
-                "alias": table.alias,
-                "comment": f"{table.note}"  # table.note yra objektas, kurį būtina paversti tekstu
-            })
-
-            # Info apie stulpelius
-            columns.extend([{
-                "schema": table_schema,
-                "table": table_name,
-                "column": column.name,
-                "comment": f"{column.note}",  # table.note yra objektas, kurį būtina paversti tekstu
-                "type": f"{column.type}",  # column.type dažniausiai būna str tipo, bet kartais gali būti objektas, pvz., <Enum>
-                "is_primary": column.pk,
-                "unique": column.unique,
-                "not_null": column.not_null,
-            } for column in table.columns
-            ])
-
-            # Ryšiai
-            for ref in dbml.refs:
-                if all([ref.table1, ref.col1, ref.table2, ref.col2]):
-                    # Jei kryptis atvirkščia, apversti table1 ir table2
-                    source_tbl, target_tbl = (ref.table2, ref.table1) if ref.type == "<" else (ref.table1, ref.table2)
-                    source_cols, target_cols = (ref.col2, ref.col1) if ref.type == "<" else (ref.col1, ref.col2)
-                    refs.extend([{
-                        "table": source_tbl.name,
-                        "column": source_col.name,
-                        "referenced_table": target_tbl.name,
-                        "referenced_column": target_col.name,
-                    } for source_col in source_cols for target_col in target_cols
-                    ])
+            tables["schema"].append(table_schema)
+            tables["table"].append(table_name)
+            tables["alias"].append(table.alias)
+            tables["comment"].append(f"{table.note}")  # table.note yra objektas, kurį būtina paversti tekstu
+
+            for column in table.columns:
+                columns["schema"].append(table_schema)
+                columns["table"].append(table_name)
+                columns["column"].append(column.name)
+                columns["comment"].append(f"{column.note}")  # column.note yra objektas, kurį būtina paversti tekstu
+                # column.type dažniausiai būna str tipo, bet kartais gali būti objektas, pvz., <Enum>
+                columns["type"].append(f"{column.type}")
+                columns["is_primary"].append(column.pk)
+                columns["unique"].append(column.unique)
+                columns["not_null"].append(column.not_null)
+
+        # Ryšiai
+        for ref in dbml.refs:
+            if all([ref.table1, ref.col1, ref.table2, ref.col2]):
+                # Jei kryptis atvirkščia, apversti table1 ir table2
+                source_tbl, target_tbl = (ref.table2, ref.table1) if ref.type == "<" else (ref.table1, ref.table2)
+                source_cols, target_cols = (ref.col2, ref.col1) if ref.type == "<" else (ref.col1, ref.col2)
+                for source_col in source_cols:
+                    for target_col in target_cols:
+                        refs["table"].append(source_tbl.name)
+                        refs["column"].append(source_col.name)
+                        refs["referenced_table"].append(target_tbl.name)
+                        refs["referenced_column"].append(target_col.name)
 
         # Konvertuoti į Polars DataFrame ir šalinti stulpelius, kuriuose reikšmė viena ir ta pati numatytoji iš PyDBML, o ne naudotojo
-        df_tables = pl.DataFrame(tables, infer_schema_length=None)
+        df_tables = pl.DataFrame(tables, schema={col: pl.String for col in tables})
         df_tables = remove_constant_columns(df_tables)  # šalinti schemą, jei visur ji liko numatytoji
-        df_columns = pl.DataFrame(columns, infer_schema_length=None)
+        df_columns = pl.DataFrame(columns, schema={
+            col: (pl.Boolean if col in ["is_primary", "unique", "not_null"] else pl.String) for col in columns
+        })
         df_columns = remove_constant_columns(df_columns)  # šalinti savybių stulpelius, kuriuose nieko neapibrėžta
-        df_refs = pl.DataFrame(refs, infer_schema_length=None)
+        df_refs = pl.DataFrame(refs, schema={col: pl.String for col in refs})
 
         # Išvedimo struktūra
         parse_output = {"file_data": {}}
         for sheet_name, df in [("tables", df_tables), ("columns", df_columns), ("refs", df_refs)]:
-            info_table = {
-                "df_columns": list(df.columns),
-                "df_columns_str": df.select(pl.col(pl.Utf8)).columns,
-                "df": df.to_dicts()
-            }
-            parse_output["file_data"][sheet_name] = info_table
+            parse_output["file_data"][sheet_name] = get_sheet_info(df)
 
         return parse_output
 
@@ -289,58 +807,365 @@ def parse_dbml(content_text):
         return msg
 
 
-def parse_csv(content_text, filename="CSV"):
+def parse_csv(content, filename="CSV", lazy=False, cache_key=None):
     """
-    Pagalbinė `parse_file` funkcija CSV nuskaitymui, automatiškai pasirenkant skirtuką ir koduotę.
-    Standartinė polars.read_csv() komanda neaptinka koduotės ir skirtukų automatiškai.
+    Pagalbinė `parse_file` funkcija CSV nuskaitymui, automatiškai pasirenkant skirtuką.
+    Standartinė polars.read_csv() komanda neaptinka skirtukų automatiškai, tad jis nustatomas iš pradžios ištraukos,
+    o visas turinys skaitomas polars (daugiagijiškai, be tarpinio Python teksto).
 
-    :param content_text: CSV turinys (jau iškoduotas su base64.b64decode)
+    :param content: CSV turinys UTF-8 baitais, jau iškoduotas tekstas arba kelias iki UTF-8 rinkmenos (kai lazy=True)
     :param filename: rinkmenos vardas, kuris naudojamas kaip vardas išvedimo žodyne
+    :param lazy: ar nuskaityti tik pirmąsias eilutes, o visą rinkmeną per pl.scan_csv() tik prireikus (žr. `get_sheet_df`)
+    :param cache_key: nuskaitymų podėlio raktas, pagal kurį išsaugoma vėliau nuskaityta visa rinkmena (kai lazy=True)
     :return: žodynas, kaip aprašyta prie `parse_file` f-jos
     """
     try:
-        dialect = csv.Sniffer().sniff(content_text)  # automatiškai nustatyti laukų skirtuką
-        if dialect.delimiter in [";", ",", "\t"]:
-            df = pl.read_csv(io.StringIO(content_text), separator=dialect.delimiter)
+        if lazy:
+            with open(content, "rb") as f:
+                sample = f.read(CSV_SNIFF_SIZE)
+        else:
+            if isinstance(content, str):
+                content = content.encode("utf_8")
+            sample = content[:CSV_SNIFF_SIZE]
+        sample_text = sample.decode("utf_8", errors="ignore")
+        if len(sample) == CSV_SNIFF_SIZE and "\n" in sample_text:
+            sample_text = sample_text[:sample_text.rindex("\n")]  # tik pilnos eilutės
+
+        try:
+            delimiter = csv.Sniffer().sniff(sample_text).delimiter  # automatiškai nustatyti laukų skirtuką
+        except csv.Error:
+            delimiter = None
+        if delimiter in [";", ",", "\t"]:
+            delimiters = [delimiter]
         else:
             # Kartais blogai aptinka skirtuką ir vis tiek reikia tikrinti kiekvieną jų priverstinai
-            df = None
-            for delimiter in [";", ",", "\t"]:
-                if delimiter in content_text:
-                    try:
-                        df = pl.read_csv(io.StringIO(content_text), separator=delimiter)
-                        break
-                    except Exception:  # noqa: Mums visai nerūpi, kokia tai klaida
-                        pass
-            if df is None:
-                return _("There was an error while processing file of unknown type")
-        info_table = {
-            "df_columns": list(df.columns),  # visi stulpeliai
-            "df_columns_str": df.select(pl.col(pl.Utf8)).columns,  # tik tekstinio tipo stulpeliai
-            "df": df.to_dicts()
-        }
-        csv_parse_output = {"file_data": {filename: info_table}}
-        return csv_parse_output
+            delimiters = [d for d in [";", ",", "\t"] if d in sample_text]
+
+        for delimiter_i, delimiter in enumerate(delimiters):
+            try:
+                if lazy:
+                    df_preview = pl.read_csv(content, separator=delimiter, n_rows=SHEET_PREVIEW_ROWS)
+                    sheet_info = get_lazy_sheet_info(df_preview, content, filename, cache_key)
+                    sheet_info["csv_separator"] = delimiter
+                else:
+                    sheet_info = get_sheet_info(pl.read_csv(content, separator=delimiter))
+                return {"file_data": {filename: sheet_info}}
+            except Exception:  # noqa: Mums visai nerūpi, kokia tai klaida
+                if len(delimiters) == 1:
+                    raise  # skirtukas aptiktas patikimai – klaida kita
+        return _("There was an error while processing file of unknown type")
     except Exception as e:
         msg = _("There was an error while processing file as CSV")
         warnings.warn(f"{msg}:\n {e}")
         return msg
 
 
-def get_sheet_columns(dict_data, sheet, string_type=False, not_null_type=False):
+def parse_session(source, session_key):
+    """
+    Darbo sesijos (žr. utils_session.py) nuskaitymas. Lakštai "tables", "columns" ir "refs" rodomi kaip įprastai,
+    o šalia išsaugomi pateikti duomenys ir jų lakštų bei stulpelių parinkimas – jo nepakeitus,
+    `summarize_submission` duomenų iš naujo nebeapdoroja.
+    :param source: kelias iki sesijos rinkmenos arba jos turinys baitais
+    :param session_key: sesijos raktas (rinkmenos turinio maiša)
+    :return: žodynas, kaip aprašyta prie `parse_file` f-jos, papildytas "session" žodynu, arba tekstas klaidos atveju
+    """
+    session = us.load_session(source, session_key)
+    if isinstance(session, str):
+        return session  # klaida
+    data_submitted, session_name = session
+    return {
+        "file_data": {sheet: get_sheet_info(df) for sheet, df in us.get_session_sheets(data_submitted).items()},
+        "session": {
+            "key": session_key,
+            "name": session_name,
+            "mapping": us.get_session_mapping(data_submitted),
+            "data": data_submitted,
+        },
+    }
+
+
+def get_session_info(dict_data):
+    """
+    Įkeltos darbo sesijos informacija (žr. `parse_session`).
+    :param dict_data: žodynas su PDSA arba ryšių duomenimis
+    :return: žodynas {"key": "", "name": "", "mapping": {}, "data": {}} arba None, jei įkelta ne sesija
+    """
+    if isinstance(dict_data, dict) and isinstance(dict_data.get("session"), dict):
+        return dict_data["session"]
+    return None
+
+
+def get_sheet_info(df):
+    """
+    Lakšto informacijos žodyno sudarymas iš polars DataFrame, kurį naudoja `parse_file` ir pagalbinės jos f-jos.
+    Pačios lentelės nebeverčiame į eilučių žodynų sąrašą (df.to_dicts()) – ją laikome stulpelinėje polars struktūroje,
+    o serveryje saugoma per Serverside ir į naršyklę nesiunčiama.
+    :param df: polars DataFrame
+    :return: žodynas {
+            "df_columns": [],      # visi stulpeliai
+            "df_columns_str": [],  # tik tekstinio tipo stulpeliai
+            "df_profile": {},      # stulpelių tipų ir užpildymo aprašas, žr. `get_schema_profile`
+            "df": polars DataFrame
+        }
+    """
+    return {
+        "df_columns": list(df.columns),  # visi stulpeliai
+        "df_columns_str": df.select(pl.col(pl.Utf8)).columns,  # tik tekstinio tipo stulpeliai
+        "df_profile": get_schema_profile(df),
+        "df": df
+    }
+
+
+def get_schema_profile(df):
+    """
+    Lakšto stulpelių aprašas, sudaromas vieną kartą nuskaitant, kad išskleidžiamųjų meniu pasirinkimams
+    nereikėtų kaskart peržiūrėti viso lakšto. Visi rodikliai apskaičiuojami vienu polars užklausos praėjimu.
+    :param df: polars DataFrame
+    :return: žodynas {stulpelis: {
+            "dtype": "",         # polars tipas kaip tekstas
+            "is_string": False,  # ar tekstinio tipo
+            "is_numeric": False,  # ar skaitinio tipo
+            "null_count": 0,     # tuščių reikšmių skaičius
+            "n_unique": 0,       # apytikslis skirtingų reikšmių skaičius (įskaitant tuščią); None sudėtiniams tipams
+            "is_empty": False,   # ar visos reikšmės tuščios (arba stulpelis Null tipo)
+        }}
+    """
+    if not df.width:
+        return {}
+    # approx_n_unique netinka sudėtiniams tipams (List, Struct ir pan.)
+    countable_cols = [col for col, dtype in df.schema.items() if not (dtype.is_nested() or dtype == pl.Object)]
+    stats = df.select(
+        pl.all().null_count().name.prefix("null_count@"),
+        pl.col(countable_cols).approx_n_unique().name.prefix("n_unique@"),
+    ).row(0, named=True)
+    return {
+        col: {
+            "dtype": str(dtype),
+            "is_string": dtype == pl.Utf8,
+            "is_numeric": dtype.is_numeric(),
+            "null_count": stats[f"null_count@{col}"],
+            "n_unique": stats.get(f"n_unique@{col}"),
+            "is_empty": (dtype == pl.Null) or (stats[f"null_count@{col}"] == df.height),
+        }
+        for col, dtype in df.schema.items()
+    }
+
+
+def get_sheet_profile(dict_data, sheet, load=True):
+    """
+    Pasirinkto lakšto stulpelių aprašas (žr. `get_schema_profile`). Jis paprastai sudaromas jau nuskaitant rinkmeną;
+    dar nenuskaitytiems lakštams (arba senesniems įrašams be aprašo) jis sudaromas pagal visą lakštą ir įsimenamas.
+    :param dict_data: žodynas, kaip aprašyta prie `parse_file` f-jos
+    :param sheet: lakšto vardas
+    :param load: ar nuskaityti visą dar nenuskaitytą lakštą; jei False – aprašas sudaromas pagal pirmąsias eilutes
+    :return: žodynas {stulpelis: {...}}
+    """
+    if not (
+        isinstance(dict_data, dict) and isinstance(dict_data.get("file_data"), dict) and
+        isinstance(dict_data["file_data"].get(sheet), dict)
+    ):
+        return {}
+    sheet_data = dict_data["file_data"][sheet]
+    if "df_profile" in sheet_data:
+        return sheet_data["df_profile"]
+    if "source" in sheet_data:
+        if not (load or is_sheet_loaded(dict_data, sheet)):
+            return get_schema_profile(sheet_data["df_preview"])
+        try:
+            source = sheet_data["source"]
+            return read_lazy_sheet_profile(
+                source, sheet_data.get("sheet_name"), sheet_data.get("csv_separator"),
+                os.path.getmtime(source), sheet_data.get("cache_key")
+            )
+        except OSError:
+            return {}  # pvz., įkelta rinkmena jau ištrinta valant seną podėlį
+    sheet_data["df_profile"] = get_schema_profile(get_sheet_df(dict_data, sheet))
+    return sheet_data["df_profile"]
+
+
+@functools.lru_cache(maxsize=32)
+def read_lazy_sheet_profile(source, sheet_name, csv_separator=None, source_mtime=None, cache_key=None):
+    """
+    Dar nenuskaityto lakšto stulpelių aprašas pagal visą lakštą (žr. `get_sheet_df`). Rezultatas įsimenamas.
+    :param source: kelias iki rinkmenos
+    :param sheet_name: lakšto vardas rinkmenoje
+    :param csv_separator: CSV laukų skirtukas arba None skaičiuoklėms
+    :param source_mtime: rinkmenos keitimo laikas – tik tam, kad pakeitus rinkmeną nebūtų grąžinamas senas aprašas
+    :param cache_key: nuskaitymų podėlio raktas
+    :return: žodynas {stulpelis: {...}}
+    """
+    if csv_separator is not None:
+        df = read_csv_source(source, csv_separator, source_mtime, cache_key, sheet_name)
+    else:
+        df = read_excel_sheet(source, sheet_name, source_mtime, cache_key)
+    return get_schema_profile(df)
+
+
+@functools.lru_cache(maxsize=8)
+def read_csv_source(source, separator, source_mtime=None, cache_key=None, sheet_name=None):
+    """
+    Visą didelę CSV rinkmeną nuskaityti į polars DataFrame per pl.scan_csv(). Rezultatas įsimenamas atmintyje ir
+    nuskaitymų podėlyje (kaip ir `read_excel_sheet`).
+    :param source: kelias iki UTF-8 CSV rinkmenos
+    :param separator: laukų skirtukas
+    :param source_mtime: rinkmenos keitimo laikas – tik tam, kad pakeitus rinkmeną nebūtų grąžinamas senas turinys
+    :param cache_key: nuskaitymų podėlio raktas (žr. utils_parse_cache.py)
+    :param sheet_name: lakšto vardas nuskaitymų podėlyje
+    :return: polars DataFrame
+    """
+    df = pc.load_sheet_frame(cache_key, sheet_name) if (cache_key and sheet_name) else None
+    if df is None:
+        try:
+            df = pl.scan_csv(source, separator=separator, encoding="utf8").collect()
+        except pl.exceptions.ComputeError:
+            # Ne UTF-8 (pvz., rinkmena pakeista po patikrinimo `is_large_utf8_file`) – perkoduoti pagal nustatytą koduotę
+            with open(source, "rb") as f:
+                csv_bytes, text_encoding = get_utf8_bytes(f.read())
+            if not text_encoding:
+                raise
+            df = pl.read_csv(csv_bytes, separator=separator)
+        if cache_key and sheet_name:
+            pc.save_sheet_frame(cache_key, sheet_name, df)
+    return df
+
+
+def get_lazy_sheet_info(df_preview, source, sheet_name, cache_key=None):
+    """
+    Lakšto informacijos žodyno sudarymas, kai visas lakštas dar nenuskaitytas (žr. `parse_excel` ir `parse_csv`).
+    :param df_preview: polars DataFrame su pirmosiomis lakšto eilutėmis
+    :param source: kelias iki rinkmenos
+    :param sheet_name: lakšto vardas
+    :param cache_key: nuskaitymų podėlio raktas
+    :return: žodynas {
+            "df_columns": [],      # visi stulpeliai pagal pirmąsias eilutes
+            "df_columns_str": [],  # tik tekstinio tipo stulpeliai pagal pirmąsias eilutes
+            "df_preview": polars DataFrame,
+            "source": kelias iki rinkmenos,
+            "sheet_name": lakšto vardas rinkmenoje,
+            "cache_key": nuskaitymų podėlio raktas,
+        }
+    """
+    return {
+        "df_columns": list(df_preview.columns),
+        "df_columns_str": df_preview.select(pl.col(pl.Utf8)).columns,
+        "df_preview": df_preview,
+        "source": source,
+        "sheet_name": sheet_name,
+        "cache_key": cache_key,
+    }
+
+
+def get_sheet_df(dict_data, sheet, load=True):
+    """
+    Iš XLSX ar CSV turinio (kurį sukuria `parse_file` f-ja) pasirinkto lakšto lentelę gauti kaip polars DataFrame.
+    Jei įkeliant buvo nuskaitytos tik pirmosios lakšto eilutės, visas lakštas nuskaitomas dabar.
+    :param dict_data: žodynas, kaip aprašyta prie `parse_file` f-jos
+    :param sheet: pasirinkto lakšto vardas
+    :param load: ar nuskaityti visą dar nenuskaitytą lakštą; jei False – grąžinamos tik pirmosios eilutės, kol lakšto
+        fone nenuskaitė `gui_callbacks_file_upload.load_selected_sheets`
+    :return: polars DataFrame (tuščias, jei lakšto nėra)
+    """
+    if not (
+        isinstance(dict_data, dict) and "file_data" in dict_data.keys() and
+        isinstance(dict_data["file_data"], dict) and sheet in dict_data["file_data"].keys() and
+        (dict_data["file_data"][sheet] is not None)
+    ):
+        return pl.DataFrame()
+    sheet_data = dict_data["file_data"][sheet]
+    if isinstance(sheet_data, dict) and ("source" in sheet_data):
+        if not (load or is_sheet_loaded(dict_data, sheet)):
+            return sheet_data["df_preview"]
+        source = sheet_data["source"]
+        try:
+            if "csv_separator" in sheet_data:
+                return read_csv_source(
+                    source, sheet_data["csv_separator"], os.path.getmtime(source),
+                    sheet_data.get("cache_key"), sheet_data["sheet_name"]
+                )
+            return read_excel_sheet(
+                source, sheet_data["sheet_name"], os.path.getmtime(source), sheet_data.get("cache_key")
+            )
+        except Exception as e:
+            # Pvz., įkelta rinkmena jau ištrinta valant seną podėlį
+            msg = _("There was an error while processing sheet \"%s\"") % sheet
+            warnings.warn(f"{msg}:\n {e}")
+            return pl.DataFrame()
+    if isinstance(sheet_data, dict) and ("df" in sheet_data):
+        sheet_data = sheet_data["df"]
+    return gu.to_polars_df(sheet_data)
+
+
+def is_sheet_loaded(dict_data, sheet):
+    """
+    Ar visas lakštas jau nuskaitytas: įkeliant iš karto arba vėliau, kai jis įrašytas į nuskaitymų podėlį.
+    Tokį lakštą `get_sheet_df` greitai gauna iš podėlio, tad jį galima naudoti ir ne foniniuose kvietimuose.
+    :param dict_data: žodynas, kaip aprašyta prie `parse_file` f-jos
+    :param sheet: lakšto vardas
+    :return: True arba False
+    """
+    if not (
+        isinstance(dict_data, dict) and isinstance(dict_data.get("file_data"), dict) and
+        isinstance(dict_data["file_data"].get(sheet), dict) and ("source" in dict_data["file_data"][sheet])
+    ):
+        return True
+    sheet_data = dict_data["file_data"][sheet]
+    cache_key = sheet_data.get("cache_key")
+    return bool(cache_key) and os.path.isfile(pc.get_sheet_frame_path(cache_key, sheet_data["sheet_name"]))
+
+
+def get_df_page(df, page_current=0, page_size=10, sort_by=None):
+    """
+    Vienas lentelės puslapis peržiūrai (dash_table.DataTable su page_action="custom" ir sort_action="custom").
+    Rikiuojant visa lentelė nerikiuojama – atrenkama tik tiek pirmųjų eilučių, kiek reikia iki prašomo puslapio pabaigos.
+    :param df: polars DataFrame
+    :param page_current: puslapio numeris, pradedant nuo 0
+    :param page_size: eilučių skaičius puslapyje
+    :param sort_by: DataTable rikiavimo aprašas, pvz., [{"column_id": "table", "direction": "asc"}]
+    :return: (puslapio eilutės kaip žodynų sąrašas, puslapių skaičius)
+    """
+    page_size = page_size or 10
+    page_count = -(-df.height // page_size)  # apvalinant į didesnę pusę
+    page_current = min(max(page_current or 0, 0), max(page_count - 1, 0))
+    offset = page_current * page_size
+    sort_col = sort_by[0]["column_id"] if sort_by else None
+    if (sort_col in df.columns) and not df.schema[sort_col].is_nested():
+        descending = sort_by[0].get("direction") == "desc"
+        needed_rows = offset + page_size
+        df = df.top_k(needed_rows, by=sort_col) if descending else df.bottom_k(needed_rows, by=sort_col)
+        df = df.sort(sort_col, descending=descending, nulls_last=True, maintain_order=True)
+    return df.slice(offset, page_size).to_dicts(), page_count
+
+
+def is_sheet_empty(dict_data, sheet):
+    """
+    Ar lakšte nėra eilučių. Dar nenuskaitytiems lakštams užtenka pirmųjų eilučių, tad visas lakštas neskaitomas.
+    :param dict_data: žodynas, kaip aprašyta prie `parse_file` f-jos
+    :param sheet: lakšto vardas
+    :return: True, jei lakšto nėra arba jame nėra eilučių
+    """
+    if (
+        isinstance(dict_data, dict) and isinstance(dict_data.get("file_data"), dict) and
+        isinstance(dict_data["file_data"].get(sheet), dict) and ("df_preview" in dict_data["file_data"][sheet])
+    ):
+        return dict_data["file_data"][sheet]["df_preview"].is_empty()
+    return get_sheet_df(dict_data, sheet).is_empty()
+
+
+def get_sheet_columns(dict_data, sheet, string_type=False, not_null_type=False, load=True):
     """
     Iš XLSX ar CSV turinio (kurį sukuria `parse_file` f-ja) pasirinktam lakštui ištraukti jo visus stulpelius.
     :param dict_data: žodynas {
         "file_data": lakštas: {
-            "df": [],
+            "df": polars DataFrame,
             "df_columns": [],  # visų stulpelių sąrašas
             "df_columns_str": [],  # tekstinių stulpelių sąrašas
          }
     :param sheet: pasirinkto lakšto vardas
     :param string_type: ar norima gauti tik tekstinius stulpelius (numatyta: False)
-    :param not_null_type: ar norima gauti tik stulpelius, kurių polars dtype nėra Null;
+    :param not_null_type: ar norima gauti tik stulpelius, kuriuose yra bent viena netuščia reikšmė;
             paprastai kai string_type=True, neturi būti tuščių pagal tipą, bet gali būti atvejų, kai
-            visos reikšmės yra "" – tada reikia papildomai tikrinti.
+            visos reikšmės yra tuščios – tada reikia papildomai tikrinti.
+    :param load: ar nuskaityti visą dar nenuskaitytą lakštą (žr. `get_sheet_profile`)
     :return: lakšto stulpeliai
     """
     if (
@@ -348,28 +1173,21 @@ def get_sheet_columns(dict_data, sheet, string_type=False, not_null_type=False):
         isinstance(dict_data["file_data"], dict) and sheet in dict_data["file_data"].keys() and
         (dict_data["file_data"][sheet] is not None)
     ):
-        if string_type and ("df_columns_str" in dict_data["file_data"][sheet]) and (not not_null_type):
+        # Dar nenuskaitytų lakštų stulpelių sąrašai sudaryti tik pagal pirmąsias eilutes, tad jiems imame visą lakštą
+        is_lazy_sheet = "source" in dict_data["file_data"][sheet]
+        if string_type and ("df_columns_str" in dict_data["file_data"][sheet]) and not (not_null_type or is_lazy_sheet):
             sheet_columns = dict_data["file_data"][sheet]["df_columns_str"]
-        elif ("df_columns" in dict_data["file_data"][sheet]) and (not not_null_type):
+        elif ("df_columns" in dict_data["file_data"][sheet]) and not (not_null_type or is_lazy_sheet):
             sheet_columns = dict_data["file_data"][sheet]["df_columns"]
         else:
-            if "df" in dict_data["file_data"][sheet]:
-                df = dict_data["file_data"][sheet]["df"]
-            else:
-                df = dict_data["file_data"][sheet]
-            df = pl.DataFrame(df, infer_schema_length=None)
-            if string_type:
-                # Tik tekstiniai
-                sheet_columns = df.select(pl.col(pl.Utf8)).columns
-            elif not_null_type:  # netušti stulpeliai
-                # Jei parse_* f-jose stulpelyje visos reikšmės buvo tuščios (pvz., ''), tuomet
-                # pirmą kartą importuojant į polars df meta klaidą apie nežinomą dtype, bet vis tiek priskiria String
-                # Tačiau po polars df konvertavimo į dict ir po to vėl konvertavus atgal iš dict,
-                # dtype jau būna Null - būtent šį atvejį aptinkame ir jo neįtraukiame į stulpelių sąrašus
-                sheet_columns = [col for col, dtype in zip(df.columns, df.dtypes) if dtype != pl.Null]
-            else:
-                # Grąžinam visus stulpelius
-                sheet_columns = df.columns
+            # Jei parse_* f-jose stulpelyje visos reikšmės buvo tuščios, polars jam gali būti priskyręs
+            # ir String, ir Null tipą – todėl aprašas žymi ne tik tipą, bet ir ar stulpelis tuščias
+            sheet_profile = get_sheet_profile(dict_data, sheet, load)
+            sheet_columns = [
+                col for col, col_profile in sheet_profile.items()
+                if ((not not_null_type) or (not col_profile["is_empty"])) and
+                   ((not string_type) or col_profile["is_string"])
+            ]
         return sheet_columns
     return []
 
@@ -379,7 +1197,7 @@ def find_duplicates_in_group(df, group_column, test_column):
     Tikrinti, ar stulpelyje reikšmės yra unikalios grupėje; nekreipti dėmesio į pasitaikančias None.
     Pvz, patikrinti, ar parinkti PDSA stulpeliai lentelėms ir stulpeliams yra tokie, kad lentelė neturi vienodų stulpelių.
     """
-    df = pl.DataFrame(df, infer_schema_length=None)  # Užtikrinti, kad tai tikrai būtų polars df
+    df = gu.to_polars_df(df)  # Užtikrinti, kad tai tikrai būtų polars df
     if (group_column in df.columns) and (test_column in df.columns):
         return (
             df
@@ -400,13 +1218,17 @@ def select_renamed_or_add_columns(df, old_columns, new_columns):
     Pakeisti ar papildyti stulpelių vardus pagal nurodytus naujus vardus.
     Jei stulpelio vardas yra tuščias, sukurti tuščią nauju vardu.
     Jei stulpelis yra, bet vardas skiriasi, tada pervadinti.
+    Pirmiausia sudaromas visas stulpelių atitikmenų žodynas, o tada pritaikomas vienas .select() per LazyFrame.
 
-    :param df: polars DataFrame
+    :param df: polars DataFrame arba LazyFrame
     :param old_columns: sąrašas iš senų stulpelio vardų (pervadinimui) arba None (pridėjimui)
     :param new_columns: nauji stulpelio vardai pervadinimui arba pridėjimui
-    :return: polars DataFrame su pervadintais arba pridėtais stulpeliais
+    :return: polars DataFrame su pervadintais arba pridėtais stulpeliais; jei paduotas LazyFrame – LazyFrame
     """
-    df = pl.DataFrame(df, infer_schema_length=None)  # užtikrinti, kad df yra polars tipo
+    is_lazy = isinstance(df, pl.LazyFrame)
+    if not is_lazy:
+        df = gu.to_polars_df(df)  # užtikrinti, kad df yra polars tipo
+    df_columns = df.collect_schema().names() if is_lazy else df.columns
 
     # Stulpelių sąrašo tikrinimas
     if old_columns and (len(old_columns) != len(new_columns)):
@@ -414,33 +1236,39 @@ def select_renamed_or_add_columns(df, old_columns, new_columns):
         old_columns = None
     if not old_columns:  # Jei nėra pateikti seni stulpeliai
         old_columns = [
-            col if col in df.columns else None   # tiesiog imti esamus arba dėti None, kad kurtų tuščius stulpelius
+            col if col in df_columns else None   # tiesiog imti esamus arba dėti None, kad kurtų tuščius stulpelius
             for col in new_columns
         ]
 
+    # Kiekvienam vardui – išraiška, iš kurio originalaus stulpelio imti turinį (arba tuščia reikšmė)
+    expressions = {col: pl.col(col) for col in df_columns}
+
     # Reikia užtikrinti tinkamą stulpelių pervadinimą  iš anksto persivadinant konfliktuojančiuosius, kai naudotojas
     # a) sukeičia stulpelių pavadinimus vietomis ar b) tą patį stulpelį kelis kartus naudoja skirtingomis prasmėmis:
     # tuomet vien paprastas pervadinimas .rename() ir .alias() gali supainioti stulpelius.
     renames = {}
     for col, alias in zip(old_columns, new_columns):
-        if (alias in df.columns) and (col != alias):
-            # jei tarp senų stulpelių yra naujas prašomas, negalime naudoti .alias(), nes perrašytų turinį!
+        if (alias in expressions) and (alias not in renames) and (col != alias):
+            # jei tarp senų stulpelių yra naujas prašomas, jo turinį prisimename laikinu vardu, kad neperrašytų
             temp_name = f"{alias}__orig__"
-            while temp_name in df.columns:
+            while temp_name in expressions:
                 temp_name = f"{temp_name}_"
-            df = df.rename({alias: temp_name})
+            expressions[temp_name] = expressions.pop(alias)
             renames[alias] = temp_name
 
     # Sukurti alias arba naujus stulpelius
     for col, alias in zip(old_columns, new_columns):
         if col in renames:
             # senas stulpelis yra, tik laikinai pervadintas
-            df = df.with_columns(pl.col(renames[col]).alias(alias))
-        elif (col not in df.columns) or (not col):
+            expressions[alias] = expressions[renames[col]]
+        elif (col not in expressions) or (not col):
             # jei seno stulpelio dar nebuvo, sukurti tuščią nauju vardu
-            df = df.with_columns(pl.lit(None).alias(alias))
+            expressions[alias] = pl.repeat(None, pl.len())  # ne pl.lit(None), kad išliktų eilučių skaičius
         elif col != alias:
             # pervadinti, jei senas stulpelis yra, o naujas vardas skiriasi
-            df = df.with_columns(pl.col(col).alias(alias))
+            expressions[alias] = expressions[col]
 
-    return df.select(new_columns)
+    selection = [expressions[alias].alias(alias) for alias in new_columns]
+    if is_lazy:
+        return df.select(selection)
+    return df.lazy().select(selection).collect()
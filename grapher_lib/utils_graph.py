@@ -0,0 +1,537 @@
+"""
+Ryšių tarp lentelių grafo indeksas.
+
+Indeksas sudaromas vieną kartą pateikiant duomenis (žr. `gui_callbacks_file_submit.prepare_refs_sheet`) ir laikomas
+kartu su ryšiais kaip CSR (compressed sparse row) struktūra iš trijų polars lentelių, tad jį galima įrašyti ir
+nuskaityti kaip bet kurią kitą pateiktų duomenų lentelę (Arrow IPC, darbo sesija):
+- "graph_nodes": lentelės (mazgai), surikiuotos pagal vardą; mazgo ID yra jo eilutės numeris; kiekvienam mazgui
+  nurodyta, kurioje "graph_out" ir "graph_in" eilučių atkarpoje yra jo išeinantys ir įeinantys ryšiai;
+- "graph_out": ryšių eilučių numeriai ryšių lentelėje ("edge_row") ir ryšio galo mazgo ID ("neighbor"),
+  surikiuoti pagal ryšio pradžios mazgą;
+- "graph_in": tas pats, tik "neighbor" yra ryšio pradžios mazgo ID, surikiuota pagal ryšio galo mazgą.
+Tad mazgo kaimynai ir ryšiai randami per O(laipsnis), o ne filtruojant visą ryšių lentelę.
+Kartu "graph_nodes" lentelėje apskaičiuojami ir mazgų rodikliai (žr. `get_node_stats`): laipsniai, silpnai jungiosios
+komponentės ir bendruomenės numeriai, PageRank ir eilės vieta pagal svarbą, kuriais remiantis parenkamos lentelės
+braižymui, o didelės schemos skaidomos į nubraižomas dalis.
+"""
+"""
+(c) 2025 Mindaugas B.
+
+This code is distributed under the MIT License. For more details, see the LICENSE file in the project root.
+"""
+
+import os
+import polars as pl
+
+# Pateiktų duomenų "edge_data" raktai, kuriuose laikomas indeksas
+GRAPH_INDEX_KEYS = ["graph_nodes", "graph_out", "graph_in"]
+# Mazgų rodikliai "graph_nodes" lentelėje (žr. `get_node_stats`)
+GRAPH_NODE_STATS = ["out_degree", "in_degree", "degree", "component", "community", "pagerank", "rank"]
+# PageRank slopinimo koeficientas, didžiausias iteracijų skaičius ir tikslumas
+PAGERANK_DAMPING = 0.85
+PAGERANK_MAX_ITER = 100
+PAGERANK_TOL = 1e-6
+# Didžiausias žymių sklidimo (label propagation) iteracijų skaičius ieškant bendruomenių
+COMMUNITIES_MAX_ITER = 20
+# Kiek daugiausia lentelių gali būti ieškant kaimynų per kelis žingsnius (žr. `expand_neighbourhood`);
+# keičiama per aplinkos kintamąjį PDSA_GRAPHER_NEIGHBOURS_MAX_TABLES
+NEIGHBOURS_MAX_TABLES = int(os.environ.get("PDSA_GRAPHER_NEIGHBOURS_MAX_TABLES", "300"))
+
+
+def build_graph_index(df_edges):
+    """
+    Sudaryti ryšių grafo indeksą.
+    :param df_edges: ryšių lentelė su "source_tbl" ir "target_tbl" stulpeliais; indekse "edge_row" yra šios lentelės
+        eilučių numeriai, tad vėliau ji neturi būti perrikiuojama
+    :return: žodynas {"graph_nodes": pl.DataFrame, "graph_out": pl.DataFrame, "graph_in": pl.DataFrame}
+    """
+    df = (
+        df_edges.select(["source_tbl", "target_tbl"])
+        .with_row_index("edge_row")
+        .drop_nulls(["source_tbl", "target_tbl"])
+    )
+    tables = pl.concat([df["source_tbl"], df["target_tbl"]]).unique().sort().alias("table")
+    df = df.select(
+        "edge_row",
+        tables.search_sorted(df["source_tbl"]).alias("source"),
+        tables.search_sorted(df["target_tbl"]).alias("target"),
+    )
+    node_ids = pl.Series("node", range(tables.len()), dtype=df.schema["source"])
+    graph_nodes = {"table": tables}
+    index = {}
+    for direction, node_col, neighbor_col in [("out", "source", "target"), ("in", "target", "source")]:
+        df_dir = df.sort([node_col, "edge_row"])
+        graph_nodes[f"{direction}_start"] = df_dir[node_col].search_sorted(node_ids, side="left").cast(pl.Int64)
+        graph_nodes[f"{direction}_end"] = df_dir[node_col].search_sorted(node_ids, side="right").cast(pl.Int64)
+        index[f"graph_{direction}"] = df_dir.select("edge_row", pl.col(neighbor_col).alias("neighbor"))
+    index["graph_nodes"] = pl.concat(
+        [pl.DataFrame(graph_nodes), get_node_stats(df.select("source", "target"), tables)], how="horizontal"
+    )
+    return index
+
+
+def scatter_to_nodes(n_nodes, df, node_col, value_col, default=0):
+    """
+    Pagal mazgus sugrupuotas reikšmes išdėstyti į visų mazgų Series (mazgo ID yra eilutės numeris).
+    :param n_nodes: mazgų skaičius
+    :param df: pl.DataFrame su mazgų ID ir reikšmėmis
+    :param node_col: mazgų ID stulpelis
+    :param value_col: reikšmių stulpelis
+    :param default: reikšmė mazgams, kurių nėra `df`
+    :return: pl.Series
+    """
+    values = pl.Series(value_col, [default] * n_nodes, dtype=df.schema[value_col])
+    return values.scatter(df[node_col], df[value_col]) if df.height else values
+
+
+def get_weak_components(pairs, n_nodes):
+    """
+    Silpnai jungiosios komponentės: kiekvienam mazgui mažiausias jo komponentės mazgo ID. Žymės sklinda per ryšius
+    nepaisant krypties, o po kiekvieno žingsnio sutrumpinamos (žymė := žymės žymė), tad žingsnių reikia nedaug.
+    :param pairs: unikalios ryšių poros be nuorodų į save, stulpeliai "source" ir "target"
+    :param n_nodes: mazgų skaičius
+    :return: pl.Series, kiek mazgų
+    """
+    undirected = pl.concat([
+        pairs.select(pl.col("source").alias("node"), pl.col("target").alias("neighbor")),
+        pairs.select(pl.col("target").alias("node"), pl.col("source").alias("neighbor")),
+    ])
+    labels = pl.Series("label", range(n_nodes), dtype=pl.UInt32)
+    while True:
+        neighbor_min = (
+            undirected.with_columns(labels.gather(undirected["neighbor"]).alias("label"))
+            .group_by("node").agg(pl.col("label").min())
+        )
+        neighbor_labels = scatter_to_nodes(n_nodes, neighbor_min, "node", "label", default=n_nodes)
+        new_labels = labels.zip_with(labels <= neighbor_labels, neighbor_labels)
+        new_labels = new_labels.gather(new_labels)
+        if new_labels.equals(labels):
+            return labels
+        labels = new_labels
+
+
+def get_communities(pairs, n_nodes):
+    """
+    Bendruomenės žymių sklidimo (label propagation) būdu: kiekvienas mazgas perima dažniausią savo ir kaimynų žymę
+    (vienodo dažnio atveju – mažiausią), kol žymės nebesikeičia arba pasiekiamas `COMMUNITIES_MAX_ITER`.
+    Mazgo paties žymė irgi skaičiuojama, kad žymės nešokinėtų tarp kaimynų kas žingsnį. Žymės sklinda tik ryšiais,
+    tad bendruomenė visada yra vienos silpnai jungiosios komponentės dalis.
+    :param pairs: unikalios ryšių poros be nuorodų į save, stulpeliai "source" ir "target"
+    :param n_nodes: mazgų skaičius
+    :return: pl.Series, kiek mazgų; bendruomenės žymė yra kurio nors jos mazgo ID
+    """
+    undirected = pl.concat([
+        pairs.select(pl.col("source").alias("node"), pl.col("target").alias("neighbor")),
+        pairs.select(pl.col("target").alias("node"), pl.col("source").alias("neighbor")),
+    ]).unique()
+    nodes = pl.Series("node", range(n_nodes), dtype=pl.UInt32)
+    labels = nodes.alias("label")
+    for _i in range(COMMUNITIES_MAX_ITER):
+        votes = pl.concat([
+            undirected.select("node", labels.gather(undirected["neighbor"]).alias("label")),
+            pl.DataFrame([nodes, labels]),
+        ])
+        best = (
+            votes.group_by(["node", "label"]).agg(pl.len().alias("n"))
+            .filter(pl.col("n") == pl.col("n").max().over("node"))
+            .group_by("node").agg(pl.col("label").min())
+        )
+        new_labels = scatter_to_nodes(n_nodes, best, "node", "label")
+        if new_labels.equals(labels):
+            break
+        labels = new_labels
+    return labels
+
+
+def number_by_size(labels, name):
+    """
+    Pakeisti žymes eilės numeriais nuo didžiausios grupės (0), vienodo dydžio grupes rikiuojant pagal žymę.
+    :param labels: žymių pl.Series
+    :param name: grąžinamo pl.Series vardas
+    :return: UInt32 pl.Series, tokio pat ilgio kaip `labels`
+    """
+    df = pl.DataFrame({"label": labels})
+    df_numbers = (
+        df.group_by("label").agg(pl.len().alias("size"))
+        .sort(["size", "label"], descending=[True, False])
+        .with_row_index(name)
+        .select(pl.col(name).cast(pl.UInt32), "label")
+    )
+    return df.join(df_numbers, on="label", how="left", maintain_order="left")[name]
+
+
+def get_pagerank(pairs, n_nodes, out_degree):
+    """
+    PageRank ryšių kryptimi (nuo lentelės su išoriniu raktu į lentelę, į kurią jis rodo), tad svarbesnės lentelės,
+    į kurias rodo daug kitų svarbių lentelių. Mazgų be išeinančių ryšių svoris paskirstomas tolygiai.
+    :param pairs: unikalios ryšių poros be nuorodų į save, stulpeliai "source" ir "target"
+    :param n_nodes: mazgų skaičius
+    :param out_degree: išeinančių ryšių skaičius kiekvienam mazgui, pl.Series
+    :return: pl.Series, kiek mazgų; reikšmių suma lygi 1
+    """
+    if not n_nodes:
+        return pl.Series("pagerank", [], dtype=pl.Float64)
+    out_degree = out_degree.cast(pl.Float64)
+    dangling = out_degree == 0
+    pagerank = pl.Series("pagerank", [1 / n_nodes] * n_nodes, dtype=pl.Float64)
+    for _i in range(PAGERANK_MAX_ITER):
+        contributions = (
+            pairs.with_columns(
+                (pagerank.gather(pairs["source"]) / out_degree.gather(pairs["source"])).alias("pagerank")
+            )
+            .group_by("target").agg(pl.col("pagerank").sum())
+        )
+        dangling_sum = pagerank.filter(dangling).sum()
+        new_pagerank = (
+            (1 - PAGERANK_DAMPING) / n_nodes + PAGERANK_DAMPING * dangling_sum / n_nodes +
+            PAGERANK_DAMPING * scatter_to_nodes(n_nodes, contributions, "target", "pagerank", default=0.0)
+        ).alias("pagerank")
+        converged = (new_pagerank - pagerank).abs().sum() < PAGERANK_TOL
+        pagerank = new_pagerank
+        if converged:
+            break
+    return pagerank
+
+
+def get_node_stats(df, tables):
+    """
+    Mazgų rodikliai, apskaičiuojami vieną kartą pateikiant duomenis. Laipsniai skaičiuojami pagal skirtingas
+    kaimynines lenteles, neįskaitant nuorodų į save (kaip ir anksčiau ryšių dažnis parenkant lenteles braižymui).
+    :param df: ryšiai su mazgų ID stulpeliuose "source" ir "target"
+    :param tables: surikiuotas lentelių vardų pl.Series (mazgo ID yra vieta jame)
+    :return: pl.DataFrame su stulpeliais:
+        "out_degree" – į kiek kitų lentelių rodo ryšiai iš šios lentelės;
+        "in_degree" – iš kiek kitų lentelių rodo ryšiai į šią lentelę;
+        "degree" – "out_degree" ir "in_degree" suma;
+        "component" – silpnai jungiosios komponentės numeris, 0 – didžiausia komponentė;
+        "community" – bendruomenės (žr. `get_communities`) numeris, 0 – didžiausia bendruomenė;
+        "pagerank" – PageRank (žr. `get_pagerank`);
+        "rank" – vieta pagal "degree", paskui "pagerank" mažėjančia tvarka, 0 – svarbiausia lentelė
+    """
+    n_nodes = tables.len()
+    pairs = df.filter(pl.col("source") != pl.col("target")).unique(maintain_order=True)
+    out_degree = scatter_to_nodes(
+        n_nodes, pairs.group_by("source").agg(pl.len().alias("out_degree")), "source", "out_degree"
+    )
+    in_degree = scatter_to_nodes(
+        n_nodes, pairs.group_by("target").agg(pl.len().alias("in_degree")), "target", "in_degree"
+    )
+    df_stats = pl.DataFrame({
+        "table": tables,
+        "out_degree": out_degree,
+        "in_degree": in_degree,
+        "component": number_by_size(get_weak_components(pairs, n_nodes), "component"),
+        "community": number_by_size(get_communities(pairs, n_nodes), "community"),
+        "pagerank": get_pagerank(pairs, n_nodes, out_degree),
+    }).with_columns((pl.col("out_degree") + pl.col("in_degree")).alias("degree"))
+    order = df_stats.select(
+        pl.arg_sort_by(["degree", "pagerank", "table"], descending=[True, True, False]).cast(pl.UInt32)
+    ).to_series()
+    rank = scatter_to_nodes(
+        n_nodes, pl.DataFrame({"node": order, "rank": pl.Series(range(n_nodes), dtype=pl.UInt32)}), "node", "rank"
+    )
+    return df_stats.with_columns(rank).select(GRAPH_NODE_STATS)
+
+
+def get_graph_index(edge_data):
+    """
+    Gauti ryšių grafo indeksą iš pateiktų duomenų; jei jo nėra (pvz., darbo sesija įrašyta ankstesne versija),
+    sudaryti iš naujo.
+    :param edge_data: pateiktų duomenų "edge_data" žodynas (žr. `summarize_submission`)
+    :return: žodynas {"graph_nodes": pl.DataFrame, "graph_out": pl.DataFrame, "graph_in": pl.DataFrame}
+    """
+    if (
+        all(isinstance(edge_data.get(key), pl.DataFrame) for key in GRAPH_INDEX_KEYS) and
+        set(GRAPH_NODE_STATS).issubset(edge_data["graph_nodes"].columns)
+    ):
+        return {key: edge_data[key] for key in GRAPH_INDEX_KEYS}
+    df_edges = edge_data.get("ref_sheet_data")
+    if not (isinstance(df_edges, pl.DataFrame) and {"source_tbl", "target_tbl"}.issubset(df_edges.columns)):
+        df_edges = pl.DataFrame(schema={"source_tbl": pl.Utf8, "target_tbl": pl.Utf8})
+    return build_graph_index(df_edges)
+
+
+def tables_to_ids(index, tables):
+    """
+    Lentelių vardus paversti mazgų ID; indekse nesančios (ryšių neturinčios) lentelės praleidžiamos.
+    :param index: ryšių grafo indeksas (žr. `build_graph_index`)
+    :param tables: lentelių vardų sąrašas
+    :return: unikalių mazgų ID pl.Series (UInt32)
+    """
+    index_tables = index["graph_nodes"]["table"]
+    names = pl.Series("table", list(tables or []), dtype=pl.Utf8).drop_nulls().unique()
+    if index_tables.is_empty() or names.is_empty():
+        return pl.Series("node", [], dtype=pl.UInt32)
+    ids = index_tables.search_sorted(names).clip(upper_bound=index_tables.len() - 1).cast(pl.UInt32)
+    # search_sorted grąžina ir nesančio vardo įterpimo vietą, tad tikrinti, ar vardas iš tiesų sutampa
+    return ids.filter(index_tables.gather(ids) == names).alias("node")
+
+
+def ids_to_tables(index, ids):
+    """
+    Mazgų ID paversti lentelių vardais.
+    :param index: ryšių grafo indeksas (žr. `build_graph_index`)
+    :param ids: mazgų ID pl.Series
+    :return: lentelių vardų sąrašas
+    """
+    return index["graph_nodes"]["table"].gather(ids).to_list()
+
+
+def gather_ranges(df_index, node_ids, starts, ends):
+    """
+    Paimti `df_index` eilutes atkarpose [starts[i], ends[i]), pažymint, kuriam mazgui jos priklauso.
+    :param df_index: "graph_out" arba "graph_in" lentelė
+    :param node_ids: mazgų ID pl.Series
+    :param starts: atkarpų pradžių pl.Series
+    :param ends: atkarpų pabaigų pl.Series
+    :return: pl.DataFrame su "node", "edge_row" ir "neighbor" stulpeliais
+    """
+    positions = (
+        pl.DataFrame({"node": node_ids, "start": starts, "end": ends})
+        .select("node", pl.int_ranges("start", "end").alias("pos"))
+        .explode("pos")
+        .drop_nulls("pos")  # tuščios atkarpos po explode virsta null
+    )
+    return pl.concat([positions.select("node"), df_index[positions["pos"]]], how="horizontal")
+
+
+def get_incident_edges(index, node_ids, direction="all"):
+    """
+    Mazgų ryšiai ir kaimynai, randami per indeksą, neperžiūrint visų ryšių.
+    :param index: ryšių grafo indeksas (žr. `build_graph_index`)
+    :param node_ids: mazgų ID pl.Series
+    :param direction: "out" – išeinantys ryšiai (kaimynai yra ryšių galai), "in" – įeinantys ryšiai
+        (kaimynai yra ryšių pradžios), "all" – abu
+    :return: pl.DataFrame su "node" (kurio mazgo ryšys), "edge_row" ir "neighbor" stulpeliais
+        (ryšys gali kartotis, jei abu jo galai tarp mazgų)
+    """
+    node_ids = node_ids.cast(pl.UInt32).alias("node")
+    df_nodes = index["graph_nodes"][node_ids]
+    parts = []
+    for direction_i in ["out", "in"]:
+        if direction in [direction_i, "all"]:
+            parts.append(gather_ranges(
+                index[f"graph_{direction_i}"], node_ids,
+                df_nodes[f"{direction_i}_start"], df_nodes[f"{direction_i}_end"]
+            ))
+    return pl.concat(parts)
+
+
+def get_incident_edge_rows(index, tables, direction="all"):
+    """
+    Ryšių lentelės eilučių numeriai tų ryšių, kurie prasideda ir/ar baigiasi nurodytose lentelėse.
+    :param index: ryšių grafo indeksas (žr. `build_graph_index`)
+    :param tables: lentelių vardų sąrašas
+    :param direction: "out" – ryšiai iš šių lentelių, "in" – ryšiai į šias lenteles, "all" – abu
+    :return: didėjančia tvarka surikiuotų unikalių eilučių numerių pl.Series
+    """
+    edges = get_incident_edges(index, tables_to_ids(index, tables), direction=direction)
+    return edges["edge_row"].unique().sort()
+
+
+def get_induced_edge_rows(index, tables):
+    """
+    Ryšių lentelės eilučių numeriai tų ryšių, kurių abu galai yra tarp nurodytų lentelių.
+    :param index: ryšių grafo indeksas (žr. `build_graph_index`)
+    :param tables: lentelių vardų sąrašas
+    :return: didėjančia tvarka surikiuotų unikalių eilučių numerių pl.Series
+    """
+    node_ids = tables_to_ids(index, tables)
+    edges = get_incident_edges(index, node_ids, direction="out")
+    return edges.filter(pl.col("neighbor").is_in(node_ids.implode()))["edge_row"].unique().sort()
+
+
+def expand_neighbourhood(index, tables, direction="all", depth=1, max_tables=None, excluded_tables=None):
+    """
+    Kaimynų paieška į plotį (BFS) per kelis žingsnius nuo nurodytų lentelių.
+    Kiekviename žingsnyje kaimynai randami tik per naujai pasiektų lentelių ryšius (žr. `get_incident_edges`).
+    Pirmasis žingsnis atliekamas visada; tolesnis žingsnis neatliekamas, jei po jo lentelių būtų daugiau nei
+    `max_tables` – tuomet paieška sustoja ties paskutiniu visu žingsniu, kad grafikas liktų nubraižomas.
+    :param index: ryšių grafo indeksas (žr. `build_graph_index`)
+    :param tables: lentelių, nuo kurių ieškoma, vardų sąrašas
+    :param direction: "out" – ryšių kryptimi (galų lentelės), "in" – prieš ryšių kryptį (pradžių lentelės), "all" – abi
+    :param depth: kiek žingsnių daryti
+    :param max_tables: kiek daugiausia lentelių (įskaitant pradines) gali būti rezultate; None – neriboti
+    :param excluded_tables: lentelės, kurios nelaikomos kaimynais ir per kurias toliau neieškoma
+    :return: (pasiektų lentelių vardų sąrašas, įskaitant pradines turinčias ryšių; atliktų žingsnių skaičius;
+        ar paieška sustabdyta dėl `max_tables`)
+    """
+    visited = tables_to_ids(index, tables)
+    excluded = tables_to_ids(index, excluded_tables or [])
+    frontier = visited
+    reached_depth = 0
+    truncated = False
+    while (reached_depth < depth) and not frontier.is_empty():
+        neighbors = get_incident_edges(index, frontier, direction=direction)["neighbor"].unique()
+        neighbors = neighbors.filter(~neighbors.is_in(visited.implode()) & ~neighbors.is_in(excluded.implode()))
+        if neighbors.is_empty():
+            break
+        if reached_depth and (max_tables is not None) and (visited.len() + neighbors.len() > max_tables):
+            truncated = True
+            break
+        visited = pl.concat([visited, neighbors])
+        frontier = neighbors
+        reached_depth += 1
+    return ids_to_tables(index, visited), reached_depth, truncated
+
+
+def find_paths_to_nearest_terminals(index, tree, terminals, excluded):
+    """
+    Paieška į plotį nuo viso medžio vienu metu, nepaisant ryšių krypties, kol pasiekiama bent viena galinė lentelė.
+    :param index: ryšių grafo indeksas (žr. `build_graph_index`)
+    :param tree: jau sujungtų mazgų ID aibė
+    :param terminals: dar nesujungtų galinių mazgų ID aibė
+    :param excluded: mazgų ID pl.Series, per kuriuos neieškoma
+    :return: keliai (mazgų ID sąrašai nuo galinio mazgo iki pat medžio, be medžio mazgo) iki visų galinių mazgų,
+        pasiektų tame pačiame žingsnyje; tuščias sąrašas, jei nė vienas galinis mazgas nepasiekiamas
+    """
+    frontier = pl.Series("node", sorted(tree), dtype=pl.UInt32)
+    visited = pl.concat([frontier, excluded.cast(pl.UInt32)])
+    terminals_series = pl.Series("node", sorted(terminals), dtype=pl.UInt32).implode()
+    parents = {}  # mazgas -> mazgas, iš kurio jis pasiektas
+    while not frontier.is_empty():
+        edges = (
+            get_incident_edges(index, frontier, direction="all")
+            .filter(~pl.col("neighbor").is_in(visited.implode()))
+            .unique("neighbor", keep="first", maintain_order=True)
+        )
+        if edges.is_empty():
+            break
+        parents.update(zip(edges["neighbor"].to_list(), edges["node"].to_list()))
+        frontier = edges["neighbor"]
+        visited = pl.concat([visited, frontier])
+        reached = frontier.filter(frontier.is_in(terminals_series)).sort().to_list()
+        if reached:
+            paths = []
+            for node in reached:
+                path = [node]
+                while path[-1] in parents:
+                    path.append(parents[path[-1]])
+                paths.append(path[:-1])  # paskutinis kelio mazgas jau yra medyje
+            return paths
+    return []
+
+
+def get_connecting_tables(index, tables, excluded_tables=None):
+    """
+    Apytikslis Šteinerio medis: lentelės, per kurias nurodytos lentelės sujungiamos trumpiausiais ryšių keliais,
+    nepaisant ryšių krypties. Medis auginamas nuo pirmosios lentelės, kiekvieną kartą prijungiant artimiausias
+    dar neprijungtas lenteles (Takahashi-Matsuyama euristika); kiekvienas žingsnis – viena paieška į plotį per indeksą.
+    Jei kai kurios lentelės nepasiekiamos (kitoje grafo jungiojoje komponentėje), jos jungiamos tarpusavyje atskirai.
+    :param index: ryšių grafo indeksas (žr. `build_graph_index`)
+    :param tables: lentelių, kurias reikia sujungti, vardų sąrašas
+    :param excluded_tables: lentelės, per kurias jungti negalima
+    :return: surikiuotas tarpinių lentelių (be pačių `tables`) vardų sąrašas
+    """
+    terminals = set(tables_to_ids(index, tables).to_list())
+    excluded = tables_to_ids(index, excluded_tables or [])
+    excluded = excluded.filter(~excluded.is_in(pl.Series(sorted(terminals), dtype=pl.UInt32).implode()))
+    remaining = set(terminals)
+    connecting = set()
+    while remaining:
+        start = min(remaining)
+        remaining.discard(start)
+        tree = {start}
+        while remaining:
+            paths = find_paths_to_nearest_terminals(index, tree, remaining, excluded)
+            if not paths:
+                break  # likusios lentelės kitoje jungiojoje komponentėje
+            for path in paths:
+                tree.update(path)
+                remaining.difference_update(path)
+        connecting.update(tree - terminals)
+    return ids_to_tables(index, pl.Series(sorted(connecting), dtype=pl.UInt32))
+
+
+def get_top_connected_tables(index, candidate_tables=None, excluded_tables=None, n=10):
+    """
+    Svarbiausios tarpusavyje susijungiančios lentelės pagal iš anksto apskaičiuotą eilės vietą ("rank", žr.
+    `get_node_stats`): pradedama nuo svarbiausios lentelės ir godžiai pridedama svarbiausia lentelė, tiesiogiai
+    susijusi su jau parinktomis, kol parenkama `n` lentelių. Jei svarbiausia lentelė neturi tinkamų kaimynų,
+    grąžinamos dvi svarbiausios lentelės.
+    :param index: ryšių grafo indeksas (žr. `build_graph_index`)
+    :param candidate_tables: lentelės, iš kurių galima rinktis; None – visos ryšius turinčios lentelės
+    :param excluded_tables: lentelės, kurių negalima rinktis
+    :param n: kiek daugiausia lentelių parinkti
+    :return: lentelių vardų sąrašas
+    """
+    df_nodes = index["graph_nodes"].with_row_index("node").filter(pl.col("degree") > 0)
+    if candidate_tables is not None:
+        df_nodes = df_nodes.filter(pl.col("node").is_in(tables_to_ids(index, candidate_tables).implode()))
+    if excluded_tables:
+        df_nodes = df_nodes.filter(~pl.col("node").is_in(tables_to_ids(index, excluded_tables).implode()))
+    if df_nodes.is_empty():
+        return []
+    node_rank = dict(zip(df_nodes["node"].to_list(), df_nodes["rank"].to_list()))  # galimi mazgai ir jų vietos
+    seed = min(node_rank, key=node_rank.get)
+    selected = [seed]
+    reachable = {}  # su parinktaisiais susiję dar neparinkti galimi mazgai ir jų vietos
+    while len(selected) < n:
+        neighbors = get_incident_edges(index, pl.Series([selected[-1]], dtype=pl.UInt32))["neighbor"].unique()
+        reachable.update(
+            (node, node_rank[node]) for node in neighbors.to_list() if (node in node_rank) and (node not in selected)
+        )
+        if not reachable:
+            break
+        node = min(reachable, key=reachable.get)
+        del reachable[node]
+        selected.append(node)
+    if len(selected) < 2:
+        selected = sorted(node_rank, key=node_rank.get)[:2]
+    return ids_to_tables(index, pl.Series(selected, dtype=pl.UInt32))
+
+
+def remove_orphaned_tables(index, tables):
+    """
+    Pašalinti lenteles, kurios neturi tiesioginių ryšių su kitomis išvardintomis lentelėmis (nuoroda į save tinka),
+    kaip `utils.remove_orphaned_nodes_from_sublist`, tik per indeksą.
+    :param index: ryšių grafo indeksas (žr. `build_graph_index`)
+    :param tables: lentelių vardų sąrašas
+    :return: tik tarpusavyje tiesioginių ryšių turinčių lentelių sąrašas, išlaikant pradinę tvarką
+    """
+    node_ids = tables_to_ids(index, tables)
+    edges = get_incident_edges(index, node_ids, direction="out").filter(pl.col("neighbor").is_in(node_ids.implode()))
+    related = set(ids_to_tables(index, pl.concat([edges["node"], edges["neighbor"]]).unique()))
+    return [table for table in tables if table in related]
+
+
+def get_partitions(index):
+    """
+    Grafo dalys, kurias galima braižyti atskirai: silpnai jungiosios komponentės, turinčios bent dvi lenteles,
+    ir bendruomenės tų komponenčių, kurios skyla į kelias bendruomenes.
+    :param index: ryšių grafo indeksas (žr. `build_graph_index`)
+    :return: pl.DataFrame su stulpeliais "partition" ("component" arba "community"), "number" ir "size",
+        surikiuota: pirma komponentės, paskui bendruomenės, kiekvienos nuo didžiausios
+    """
+    df_nodes = index["graph_nodes"]
+    df_components = (
+        df_nodes.group_by("component")
+        .agg(pl.len().alias("size"), pl.col("community").n_unique().alias("n_communities"))
+    )
+    components = df_components.filter(pl.col("size") > 1)
+    communities = (
+        df_nodes.filter(
+            pl.col("component").is_in(df_components.filter(pl.col("n_communities") > 1)["component"].implode())
+        )
+        .group_by("community").agg(pl.len().alias("size"))
+        .filter(pl.col("size") > 1)
+    )
+    return pl.concat([
+        components.select(pl.lit("component").alias("partition"), pl.col("component").alias("number"), "size")
+        .sort("number"),
+        communities.select(pl.lit("community").alias("partition"), pl.col("community").alias("number"), "size")
+        .sort("number"),
+    ])
+
+
+def get_partition_tables(index, partition, number):
+    """
+    Silpnai jungiosios komponentės arba bendruomenės lentelės.
+    :param index: ryšių grafo indeksas (žr. `build_graph_index`)
+    :param partition: "component" arba "community"
+    :param number: komponentės arba bendruomenės numeris (žr. `get_node_stats`)
+    :return: lentelių vardų sąrašas
+    """
+    if partition not in ["component", "community"]:
+        return []
+    return index["graph_nodes"].filter(pl.col(partition) == number)["table"].to_list()
@@ -0,0 +1,213 @@
+"""
+Nuskaitytų rinkmenų podėlis serveryje.
+
+Tas pats dokumentas (pvz., kas naktį sugeneruojamas PDSA) dažnai įkeliamas daug kartų – kad kiekvieną kartą nereikėtų
+jo nuskaityti iš naujo, `parse_file` rezultatas įrašomas į podėlį pagal rinkmenos turinio maišos reikšmę.
+Kiekvienas įrašas yra atskiras katalogas: lentelės (polars DataFrame) saugomos Parquet formatu,
+o kita informacija – manifest.json. Viršijus leistiną podėlio dydį, šalinami seniausiai naudoti įrašai.
+"""
+"""
+(c) 2025 Mindaugas B.
+
+This code is distributed under the MIT License. For more details, see the LICENSE file in the project root.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import warnings
+import polars as pl
+
+# Podėlio katalogas
+PARSE_CACHE_DIR = os.path.join("data-tmp", "parse-cache")
+# Didžiausias leistinas podėlio dydis baitais; keičiamas per aplinkos kintamąjį PDSA_GRAPHER_PARSE_CACHE_MB
+PARSE_CACHE_MAX_BYTES = int(os.environ.get("PDSA_GRAPHER_PARSE_CACHE_MB", "512")) * 1024 * 1024
+# Pakeitus nuskaitymo logiką ar įrašo struktūrą, padidinti – tada seni įrašai nebebus naudojami
+PARSE_CACHE_VERSION = "4"
+MANIFEST_NAME = "manifest.json"
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def get_content_hash(content, filename=""):
+    """
+    Rinkmenos turinio maišos reikšmė podėlio raktui. Įtraukiamas ir rinkmenos vardas, nes nuo jo priklauso
+    nuskaitymo būdas ir CSV/JSON lakšto vardas.
+    :param content: rinkmenos turinys baitais arba kelias iki rinkmenos
+    :param filename: rinkmenos vardas
+    :return: šešioliktainė maišos reikšmė
+    """
+    hasher = hashlib.sha256()
+    hasher.update(f"{PARSE_CACHE_VERSION}\0{filename}\0".encode("utf-8"))
+    if isinstance(content, (bytes, bytearray)):
+        hasher.update(content)
+    else:
+        with open(content, "rb") as f:
+            while block := f.read(HASH_BLOCK_SIZE):
+                hasher.update(block)
+    return hasher.hexdigest()
+
+
+def get_cache_entry_dir(key, cache_dir=PARSE_CACHE_DIR):
+    """
+    Podėlio įrašo katalogas.
+    :param key: podėlio raktas (žr. `get_content_hash`)
+    :param cache_dir: podėlio katalogas
+    :return: kelias
+    """
+    return os.path.join(cache_dir, key)
+
+
+def touch_cache_entry(entry_dir):
+    """
+    Pažymėti, kad podėlio įrašas ką tik naudotas – tai lemia šalinimo eilę (LRU, žr. `evict_parse_cache`).
+    :param entry_dir: podėlio įrašo katalogas
+    """
+    now = time.time()
+    os.utime(entry_dir, (now, now))
+
+
+def load_parse_cache(key, cache_dir=PARSE_CACHE_DIR):
+    """
+    Gauti anksčiau nuskaitytos rinkmenos rezultatą iš podėlio.
+    :param key: podėlio raktas (žr. `get_content_hash`)
+    :param cache_dir: podėlio katalogas
+    :return: {"file_data": {...}} kaip `parse_file` arba None, jei podėlyje nėra
+    """
+    entry_dir = get_cache_entry_dir(key, cache_dir)
+    manifest_path = os.path.join(entry_dir, MANIFEST_NAME)
+    if not os.path.isfile(manifest_path):
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        file_data = {}
+        for sheet in manifest["sheets"]:
+            sheet_info = dict(sheet["info"])
+            for info_key, frame_file in sheet["frames"].items():
+                sheet_info[info_key] = pl.read_parquet(os.path.join(entry_dir, frame_file))
+            file_data[sheet["name"]] = sheet_info
+        touch_cache_entry(entry_dir)
+        return {"file_data": file_data}
+    except Exception as e:
+        # Sugadintas ar iš dalies ištrintas įrašas – geriau nuskaityti iš naujo
+        warnings.warn(f"Parse cache entry {key} is not usable: {e}")
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return None
+
+
+def save_parse_cache(key, parse_output, cache_dir=PARSE_CACHE_DIR, max_bytes=PARSE_CACHE_MAX_BYTES):
+    """
+    Įrašyti nuskaitytos rinkmenos rezultatą į podėlį.
+    polars DataFrame reikšmės lakštų žodynuose įrašomos kaip Parquet, kitos reikšmės turi tikti JSON.
+    :param key: podėlio raktas (žr. `get_content_hash`)
+    :param parse_output: `parse_file` rezultatas {"file_data": {...}}
+    :param cache_dir: podėlio katalogas
+    :param max_bytes: didžiausias leistinas podėlio dydis baitais
+    """
+    if not (isinstance(parse_output, dict) and isinstance(parse_output.get("file_data"), dict)):
+        return  # Klaidų (tekstų) nesaugome
+    entry_dir = get_cache_entry_dir(key, cache_dir)
+    tmp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(tmp_dir, exist_ok=True)
+        sheets = []
+        for sheet_i, (sheet_name, sheet_info) in enumerate(parse_output["file_data"].items()):
+            info = {}
+            frames = {}
+            for info_key, value in sheet_info.items():
+                if isinstance(value, pl.DataFrame):
+                    frame_file = f"{sheet_i}-{info_key}.parquet"
+                    value.write_parquet(os.path.join(tmp_dir, frame_file))
+                    frames[info_key] = frame_file
+                else:
+                    info[info_key] = value
+            sheets.append({"name": sheet_name, "info": info, "frames": frames})
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump({"version": PARSE_CACHE_VERSION, "sheets": sheets}, f, ensure_ascii=False)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)  # įrašas atsiranda tik pilnai sukurtas
+    except Exception as e:
+        warnings.warn(f"Parse cache entry {key} was not saved: {e}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+    evict_parse_cache(cache_dir, max_bytes)
+
+
+def get_sheet_frame_path(key, sheet_name, cache_dir=PARSE_CACHE_DIR):
+    """
+    Kelias iki podėlio įrašo papildomos rinkmenos visam lakštui, kuris įkeliant nebuvo nuskaitytas
+    (žr. `parse_excel` ir `parse_csv`).
+    :param key: podėlio raktas
+    :param sheet_name: lakšto vardas
+    :param cache_dir: podėlio katalogas
+    :return: kelias
+    """
+    sheet_hash = hashlib.sha256(sheet_name.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(get_cache_entry_dir(key, cache_dir), f"sheet-{sheet_hash}.parquet")
+
+
+def load_sheet_frame(key, sheet_name, cache_dir=PARSE_CACHE_DIR):
+    """
+    Gauti visą lakštą iš podėlio, jei jis anksčiau jau buvo nuskaitytas.
+    :param key: podėlio raktas
+    :param sheet_name: lakšto vardas
+    :param cache_dir: podėlio katalogas
+    :return: polars DataFrame arba None
+    """
+    frame_path = get_sheet_frame_path(key, sheet_name, cache_dir)
+    if not os.path.isfile(frame_path):
+        return None
+    try:
+        return pl.read_parquet(frame_path)
+    except Exception as e:
+        warnings.warn(f"Parse cache sheet {sheet_name} of {key} is not usable: {e}")
+        return None
+
+
+def save_sheet_frame(key, sheet_name, df, cache_dir=PARSE_CACHE_DIR, max_bytes=PARSE_CACHE_MAX_BYTES):
+    """
+    Įrašyti visą lakštą į jau esamą podėlio įrašą.
+    :param key: podėlio raktas
+    :param sheet_name: lakšto vardas
+    :param df: polars DataFrame
+    :param cache_dir: podėlio katalogas
+    :param max_bytes: didžiausias leistinas podėlio dydis baitais
+    """
+    if not os.path.isdir(get_cache_entry_dir(key, cache_dir)):
+        return  # įrašo nėra (pvz., jau išmestas) – nekurti pusinio
+    frame_path = get_sheet_frame_path(key, sheet_name, cache_dir)
+    tmp_path = f"{frame_path}.{os.getpid()}.tmp"
+    try:
+        df.write_parquet(tmp_path)
+        os.replace(tmp_path, frame_path)
+    except Exception as e:
+        warnings.warn(f"Parse cache sheet {sheet_name} of {key} was not saved: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    evict_parse_cache(cache_dir, max_bytes)
+
+
+def evict_parse_cache(cache_dir=PARSE_CACHE_DIR, max_bytes=PARSE_CACHE_MAX_BYTES):
+    """
+    Šalinti seniausiai naudotus podėlio įrašus, kol bendras podėlio dydis neviršija leistino.
+    :param cache_dir: podėlio katalogas
+    :param max_bytes: didžiausias leistinas podėlio dydis baitais
+    """
+    if not os.path.isdir(cache_dir):
+        return
+    entries = []  # (paskutinio naudojimo laikas, dydis, kelias)
+    total_size = 0
+    for entry in os.scandir(cache_dir):
+        if not entry.is_dir() or entry.name.endswith(".tmp"):
+            continue
+        entry_size = sum(item.stat().st_size for item in os.scandir(entry.path) if item.is_file())
+        entries.append((entry.stat().st_mtime, entry_size, entry.path))
+        total_size += entry_size
+    for _mtime, entry_size, entry_path in sorted(entries):
+        if total_size <= max_bytes:
+            break
+        shutil.rmtree(entry_path, ignore_errors=True)
+        total_size -= entry_size
@@ -0,0 +1,125 @@
+"""
+Serverside podėlis (žr. dash_extensions.enrich.ServersideOutputTransform), lenteles saugantis Arrow IPC formatu.
+
+Įprastas `FileSystemBackend` visą reikšmę (pvz., pateiktų duomenų žodyną su visomis lentelėmis) įrašo kaip vieną
+pickle rinkmeną, tad kiekviena f-ja, gaunanti tokią reikšmę per Input/State, iš naujo nuskaito ir atkuria visas lenteles.
+Čia kiekviena polars DataFrame reikšmė įrašoma į atskirą nesuspaustą Arrow IPC rinkmeną, o likusi (nedidelė)
+struktūra – į pickle rinkmeną su nuorodomis į jas. Nuskaitant lentelės atvaizduojamos į atmintį (memory_map),
+tad duomenys iš disko skaitomi tik tų lentelių, kurias f-ja iš tiesų naudoja.
+Visos įrašo rinkmenos yra viename kataloge, tad senas jų ištrina ir `utils.cleanup_old_cache`.
+"""
+"""
+(c) 2025 Mindaugas B.
+
+This code is distributed under the MIT License. For more details, see the LICENSE file in the project root.
+"""
+
+import os
+import pickle
+import warnings
+import polars as pl
+from dash_extensions.enrich import ServersideBackend
+
+
+class ArrowFrameFile:
+    """
+    Nuoroda į Arrow IPC rinkmeną, kurioje įrašyta lentelė, vietoj pačios lentelės įrašo struktūroje.
+    """
+
+    def __init__(self, file_name):
+        """
+        :param file_name: rinkmenos vardas podėlio kataloge
+        """
+        self.file_name = file_name
+
+
+class ArrowFileSystemBackend(ServersideBackend):
+    """
+    Serverside podėlis diske: lentelės – Arrow IPC rinkmenos, likusi struktūra – pickle.
+    """
+
+    def __init__(self, cache_dir):
+        """
+        :param cache_dir: podėlio katalogas
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def uid(self):
+        return f"{self.__class__.__name__}:{self.cache_dir}"
+
+    def get_manifest_path(self, key):
+        """
+        Įrašo struktūros rinkmena; ji įrašoma paskutinė, tad jei ji yra, yra ir visos įrašo lentelės.
+        :param key: įrašo raktas
+        :return: kelias
+        """
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def set(self, key, value):
+        """
+        Įrašyti reikšmę: lenteles atskirai Arrow IPC rinkmenose, likusią struktūrą – pickle.
+        :param key: įrašo raktas
+        :param value: bet kokia reikšmė; lentelės ieškomos žodynuose, sąrašuose ir kortežuose
+        """
+        frame_files = []
+
+        def dump_frames(obj):
+            if isinstance(obj, pl.DataFrame):
+                file_name = f"{key}.{len(frame_files)}.arrow"
+                try:
+                    obj.write_ipc(os.path.join(self.cache_dir, file_name), compression="uncompressed")
+                except Exception as e:
+                    # Pvz., Object tipo stulpeliai – tokią lentelę palikti pickle struktūroje
+                    warnings.warn(f"Serverside frame was not saved as Arrow IPC: {e}")
+                    return obj
+                frame_files.append(file_name)
+                return ArrowFrameFile(file_name)
+            if isinstance(obj, dict):
+                return {k: dump_frames(v) for k, v in obj.items()}
+            if isinstance(obj, (list, tuple)):
+                return type(obj)(dump_frames(v) for v in obj)
+            return obj
+
+        manifest_path = self.get_manifest_path(key)
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(dump_frames(value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, manifest_path)
+
+    def get(self, key, ignore_expired=False):
+        """
+        Gauti įrašytą reikšmę; lentelės atvaizduojamos į atmintį, o ne nuskaitomos.
+        :param key: įrašo raktas
+        :param ignore_expired: nenaudojama, yra tik dėl suderinamumo su `ServersideBackend`
+        :return: reikšmė arba None, jei įrašo nėra
+        """
+
+        def load_frames(obj):
+            if isinstance(obj, ArrowFrameFile):
+                return pl.read_ipc(os.path.join(self.cache_dir, obj.file_name), memory_map=True)
+            if isinstance(obj, dict):
+                return {k: load_frames(v) for k, v in obj.items()}
+            if isinstance(obj, (list, tuple)):
+                return type(obj)(load_frames(v) for v in obj)
+            return obj
+
+        if key is None:
+            return None
+        try:
+            with open(self.get_manifest_path(key), "rb") as f:
+                return load_frames(pickle.load(f))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            warnings.warn(f"Serverside entry {key} is not usable: {e}")
+            return None
+
+    def has(self, key):
+        """
+        Ar yra toks įrašas.
+        :param key: įrašo raktas
+        :return: True arba False
+        """
+        return os.path.isfile(self.get_manifest_path(key))
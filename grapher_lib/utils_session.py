@@ -0,0 +1,189 @@
+"""
+Darbo sesijos įrašymas ir atkūrimas dvejetainiu formatu.
+
+Sesija yra ZIP rinkmena, kurioje yra:
+- manifest.json – formato žymė, versija, vardas ir visos pateiktų duomenų (žr. `summarize_submission`) reikšmės,
+  kurios nėra lentelės (lakštų ir stulpelių parinkimai, lentelių sąrašai);
+- kiekviena pateiktų duomenų lentelė atskira Arrow IPC rinkmena (be suspaudimo, kad atkuriant ją būtų galima
+  atvaizduoti į atmintį – memory_map; pati ZIP rinkmena suspausta).
+Lentelėse jau yra ir žymimųjų langelių žymėjimai („checkbox“), ir pasirinktos lentelės („selected“),
+tad atkūrus sesiją juos parenka įprasta grafiko kortelės logika.
+
+Čia naudojama „_“ funkcija vertimams yra apibrėžiama ir globaliai jos kalba keičiama programos lygiu.
+Jei kaip biblioteką naudojate kitoms reikmėms, tuomet reikia įsikelti ir/arba konfigūruoti gettext, pvz.:
+from gettext import gettext as _
+ARBA
+from gettext import translation
+translation("pdsa-grapher", "locale", languages=["lt"]).install()
+"""
+"""
+(c) 2025 Mindaugas B.
+
+This code is distributed under the MIT License. For more details, see the LICENSE file in the project root.
+"""
+
+import os
+import io
+import json
+import shutil
+import zipfile
+import polars as pl
+from grapher_lib import utils as gu
+
+# Katalogas, į kurį išskleidžiamos atkuriamos sesijos, kad jų lenteles būtų galima atvaizduoti į atmintį
+SESSION_DIR = os.path.join("data-tmp", "sessions")
+SESSION_FORMAT = "pdsa-grapher-session"
+SESSION_VERSION = 1
+SESSION_MANIFEST_NAME = "manifest.json"
+SESSION_EXTENSION = ".pdsa-grapher.zip"
+# Lakštai, kuriais atkurtos sesijos lentelės rodomos rinkmenų įkėlimo kortelėje
+SESSION_SHEETS = {"tbl_sheet_data": "tables", "col_sheet_data": "columns", "ref_sheet_data": "refs"}
+
+
+def is_session_file(source):
+    """
+    Ar rinkmena yra šios programos įrašyta darbo sesija.
+    :param source: kelias iki rinkmenos arba jos turinys baitais
+    :return: True arba False
+    """
+    try:
+        with zipfile.ZipFile(source if isinstance(source, str) else io.BytesIO(source)) as zf:
+            if SESSION_MANIFEST_NAME not in zf.namelist():
+                return False
+            manifest = json.loads(zf.read(SESSION_MANIFEST_NAME))
+        return isinstance(manifest, dict) and manifest.get("format") == SESSION_FORMAT
+    except (zipfile.BadZipFile, ValueError, OSError):
+        return False
+
+
+def mark_session_selections(data_submitted, viz_selection_dict=None, selected_tables=None):
+    """
+    Žymimųjų langelių žymėjimus ir pasirinktas lenteles įrašyti į pateiktų duomenų lenteles – taip pat, kaip
+    eksportuojant į JSON (žr. `save_displayed_nodes_to_json`).
+    :param data_submitted: žodynas su PDSA ("node_data") ir ryšių ("edge_data") duomenimis
+    :param viz_selection_dict: visų sužymėtų langelių simboliai žodyne {lentelė: {stulpelis: simbolis}}
+    :param selected_tables: braižymui pasirinktų lentelių sąrašas
+    :return: naujas žodynas su PDSA ("node_data") ir ryšių ("edge_data") duomenimis
+    """
+    node_data = dict(data_submitted["node_data"])
+    node_data["tbl_sheet_renamed_cols"] = dict(node_data["tbl_sheet_renamed_cols"])
+    node_data["col_sheet_renamed_cols"] = dict(node_data["col_sheet_renamed_cols"])
+
+    df_tbl = node_data["tbl_sheet_data"]
+    if selected_tables and ("table" in df_tbl.columns):
+        node_data["tbl_sheet_data"] = df_tbl.with_columns(pl.col("table").is_in(selected_tables).alias("selected"))
+        node_data["tbl_sheet_renamed_cols"]["selected"] = "selected"
+
+    df_col = node_data["col_sheet_data"]
+    df_checkboxes = gu.convert_nested_dict2df(viz_selection_dict, ["table", "column", "checkbox"])
+    if (not df_checkboxes.is_empty()) and ("table" in df_col.columns) and ("column" in df_col.columns):
+        if "checkbox" in df_col.columns:
+            df_col = df_col.drop("checkbox")  # išmesti seną stulpelį, nes prijungsim naujas reikšmes
+        node_data["col_sheet_data"] = df_col.join(df_checkboxes, on=["table", "column"], how="left")
+        node_data["col_sheet_renamed_cols"]["checkbox"] = "checkbox"
+
+    return {**data_submitted, "node_data": node_data}
+
+
+def save_session(data_submitted, name=""):
+    """
+    Pateiktus duomenis įrašyti kaip darbo sesiją.
+    :param data_submitted: žodynas su PDSA ("node_data") ir ryšių ("edge_data") duomenimis,
+        paprastai jau papildytas per `mark_session_selections`
+    :param name: dokumento vardas
+    :return: ZIP rinkmenos turinys baitais
+    """
+    manifest = {"format": SESSION_FORMAT, "version": SESSION_VERSION, "name": name, "data": {}, "frames": {}}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for section, section_data in data_submitted.items():
+            if not isinstance(section_data, dict):
+                manifest["data"][section] = section_data
+                continue
+            manifest["data"][section] = {}
+            manifest["frames"][section] = {}
+            for key, value in section_data.items():
+                if isinstance(value, pl.DataFrame):
+                    frame_file = f"{section}.{key}.arrow"
+                    frame_buffer = io.BytesIO()
+                    value.write_ipc(frame_buffer, compression="uncompressed")  # kad būtų galima memory_map
+                    zf.writestr(frame_file, frame_buffer.getvalue())
+                    manifest["frames"][section][key] = frame_file
+                else:
+                    manifest["data"][section][key] = value
+        zf.writestr(SESSION_MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False))
+    return buffer.getvalue()
+
+
+def load_session(source, session_key):
+    """
+    Atkurti darbo sesiją. Lentelės išskleidžiamos į `SESSION_DIR` ir nuskaitomos atvaizduojant į atmintį.
+    :param source: kelias iki sesijos rinkmenos arba jos turinys baitais
+    :param session_key: sesijos raktas (pvz., rinkmenos turinio maiša), naudojamas kaip katalogo vardas
+    :return: (pateiktų duomenų žodynas kaip `summarize_submission`, sesijos vardas) arba tekstas klaidos atveju
+    """
+    session_dir = os.path.join(SESSION_DIR, session_key)
+    try:
+        with zipfile.ZipFile(source if isinstance(source, str) else io.BytesIO(source)) as zf:
+            manifest = json.loads(zf.read(SESSION_MANIFEST_NAME))
+            if manifest.get("version", 0) > SESSION_VERSION:
+                return _("This session file was saved by a newer version of the application")
+            shutil.rmtree(session_dir, ignore_errors=True)
+            os.makedirs(session_dir, exist_ok=True)
+            data_submitted = {}
+            for section, section_data in manifest["data"].items():
+                if section not in manifest["frames"]:
+                    data_submitted[section] = section_data
+                    continue
+                data_submitted[section] = dict(section_data)
+                for key, frame_file in manifest["frames"][section].items():
+                    # Išskleisti tik žinomas lenteles ir tik į sesijos katalogą
+                    frame_path = os.path.join(session_dir, os.path.basename(frame_file))
+                    with zf.open(frame_file) as src, open(frame_path, "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+                    data_submitted[section][key] = pl.read_ipc(frame_path, memory_map=True)
+        return data_submitted, manifest.get("name", "")
+    except Exception as e:  # noqa: Mums visai nerūpi, kokia tai klaida
+        return f'{_("There was an error while processing session file")}: {e}'
+
+
+def get_session_sheets(data_submitted):
+    """
+    Atkurtos sesijos lentelės kaip lakštai rinkmenų įkėlimo kortelei: lentelių, stulpelių ir ryšių lakštuose
+    stulpeliai jau pervadinti vidiniais vardais.
+    :param data_submitted: žodynas su PDSA ("node_data") ir ryšių ("edge_data") duomenimis
+    :return: žodynas {lakštas: polars DataFrame}
+    """
+    return {
+        sheet_name: data_submitted["edge_data" if key == "ref_sheet_data" else "node_data"][key]
+        for key, sheet_name in SESSION_SHEETS.items()
+    }
+
+
+def get_session_mapping(data_submitted):
+    """
+    Lakštų ir stulpelių parinkimas, atitinkantis atkurtos sesijos lakštus (žr. `get_session_sheets`):
+    kiekvienas anksčiau parinktas stulpelis dabar vadinasi savo vidiniu vardu.
+    :param data_submitted: žodynas su PDSA ("node_data") ir ryšių ("edge_data") duomenimis
+    :return: žodynas {
+            "sheet_tbl": "", "sheet_col": "", "ref_sheet_name": "",
+            "tbl_sheet_renamed_cols": {}, "col_sheet_renamed_cols": {}, "ref_renamed_cols": {}
+        }
+    """
+    node_data = data_submitted["node_data"]
+    edge_data = data_submitted["edge_data"]
+    return {
+        "sheet_tbl": SESSION_SHEETS["tbl_sheet_data"] if node_data["sheet_tbl"] else None,
+        "sheet_col": SESSION_SHEETS["col_sheet_data"] if node_data["sheet_col"] else None,
+        "ref_sheet_name": SESSION_SHEETS["ref_sheet_data"] if edge_data["ref_sheet_name"] else None,
+        "tbl_sheet_renamed_cols": {
+            key: (key if value else None) for key, value in node_data["tbl_sheet_renamed_cols"].items()
+        },
+        "col_sheet_renamed_cols": {
+            key: (key if value else None) for key, value in node_data["col_sheet_renamed_cols"].items()
+        },
+        "ref_renamed_cols": {
+            key: (key[4:] if edge_data[key] else None)  # "ref_source_tbl" -> "source_tbl"
+            for key in ["ref_source_tbl", "ref_source_col", "ref_target_tbl", "ref_target_col"]
+        },
+    }
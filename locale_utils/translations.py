@@ -11,6 +11,9 @@ This code is distributed under the MIT License. For more details, see the LICENS
 import os
 from gettext import translation
 
+# Dabartinės programos kalbos kodas, nustatomas per set_gettext_locale()
+CURRENT_LANGUAGE = None
+
 
 def refresh_gettext_locale(lang: str="lt"):
     """
@@ -27,11 +30,21 @@ def set_gettext_locale(lang: str="lt"):
     :param lang: pasirinktos kalbos kodas
     :return: GNUTranslations objektas
     """
+    global CURRENT_LANGUAGE
     lang_trans = translation("pdsa-grapher", "locale", languages=[lang])
     lang_trans.install()
+    CURRENT_LANGUAGE = lang
     return lang_trans
 
 
+def get_gettext_locale():
+    """
+    Dabartinės programos kalbos, kuria verčiami pranešimai per _(), kodas
+    :return: kalbos kodas, pvz., "lt"
+    """
+    return CURRENT_LANGUAGE
+
+
 # Apsirašyti savo pgettext vietoj gettext.pgettext, nes jo neatnaujina gettext .install()
 def pgettext(context: str, message: str) -> str:
     """
@@ -10,7 +10,7 @@ This code is distributed under the MIT License. For more details, see the LICENS
 """
 
 import os
-from flask import Flask
+from flask import Flask, request, jsonify
 from dash_extensions.enrich import (
     # Podėlis serverio pusėje, žr. https://www.dash-extensions.com/transforms/serverside_output_transform
     DashProxy, ServersideOutputTransform, FileSystemBackend,
@@ -24,6 +24,7 @@ from locale_utils.translations import refresh_gettext_locale
 from grapher_lib.gui_layout_file_upload import file_uploading_tab_layout  # GUI elementų kūrimas rinkmenų įkėlimo kortelėje
 from grapher_lib.gui_layout_graph import graph_tab_layout  # GUI elementų kūrimas grafiko kortelėje
 from grapher_lib import gui_components as gc  # GUI elementų kūrimui pavieniai elementai
+from grapher_lib import utils_file_upload as fu  # Rinkmenų įkėlimas ir nuskaitymas
 from grapher_lib import ( # noqa
     gui_callbacks_file_upload,  # Rinkmenų įkėlimo kortelei, pats įkėlimas ir parinktys
     gui_callbacks_file_submit,  # Rinkmenų įkėlimo kortelei, tikrinimas ir patvirtinimas
@@ -33,6 +34,8 @@ from grapher_lib import ( # noqa
     gui_callbacks_graph_extra,  # Su grafiko duomenimis susiję ir kiti įvairūs papildomi kvietimai
 )
 from grapher_lib.utils import cleanup_old_cache
+from grapher_lib.utils_background import BoundedDiskcacheManager
+from grapher_lib.utils_serverside import ArrowFileSystemBackend
 
 # ========================================
 # Pradinė konfigūracija
@@ -43,6 +46,12 @@ log = logging.getLogger("werkzeug")
 log.setLevel(logging.WARNING)
 # Podėlio vieta
 CACHE_DIR = "data-tmp"
+# Foninių kvietimų (background callbacks) rezultatų ir eigos podėlis. Foniniai kvietimai vykdomi atskiruose procesuose,
+# tad ilgas rinkmenų nuskaitymas ar pateikimas neužima serverio gijos; žr. utils_background ir
+# utils.cleanup_old_cache(keep_dirs). Vienu metu vykdomų darbų skaičius – PDSA_GRAPHER_BACKGROUND_WORKERS
+BACKGROUND_CACHE_DIR = os.path.join(CACHE_DIR, "background", "callbacks")
+# Serverside podėlis, kuriame lentelės laikomos Arrow IPC rinkmenose ir nuskaitomos atvaizduojant į atmintį
+SERVERSIDE_DIR = os.path.join(CACHE_DIR, "serverside")
 
 # ========================================
 # Kalbos
@@ -106,6 +115,8 @@ def app_layout():
             #   QuotaExceededError: Failed to execute 'setItem' on 'Storage': Setting the value of 'memory-submitted-data' exceeded the quota.
             dcc.Store(id="memory-uploaded-pdsa", storage_type="memory"),  # žodynas su PDSA duomenimis
             dcc.Store(id="memory-uploaded-refs", storage_type="memory"),  # žodynas su ryšių tarp lentelių duomenimis
+            dcc.Store(id="memory-loaded-pdsa-sheets", storage_type="memory"),  # fone visiškai nuskaityti PDSA lakštai
+            dcc.Store(id="memory-loaded-refs-sheets", storage_type="memory"),  # fone visiškai nuskaityti ryšių lakštai
             dcc.Store(id="memory-submitted-data", storage_type="memory"),  # Rinkmenų kortelėje patvirtinti duomenys
             dcc.Store(id="memory-selected-tables", storage_type="session"),  # Pasirinktos lentelės (be kaimynų)
             dcc.Store(id="memory-filtered-data", storage_type="memory"),   # Grafiko piešimui atrinkti duomenys
@@ -196,10 +207,56 @@ app = DashProxy(
     routes_pathname_prefix="/pdsa_grapher/",
     requests_pathname_prefix="/pdsa_grapher/",
     update_title=None,  # noqa nerodyti antraštė „Updating...“ įkėlimo metu; ji vėliau keičiama pagal nuo sąsajos kalbą
-    transforms=[ServersideOutputTransform(backends = [FileSystemBackend(cache_dir=CACHE_DIR)])],
+    transforms=[ServersideOutputTransform(backends = [
+        ArrowFileSystemBackend(SERVERSIDE_DIR),  # numatytasis
+        FileSystemBackend(cache_dir=CACHE_DIR),  # anksčiau įrašytiems, dar atvertose naršyklės kortelėse naudojamiems
+    ])],
+    background_callback_manager=BoundedDiskcacheManager(BACKGROUND_CACHE_DIR),
 )
 app.layout = app_layout
 
+
+# ========================================
+# Rinkmenų įkėlimas dalimis
+# ========================================
+
+@server.route(f"{app.config.routes_pathname_prefix}upload", methods=["GET", "POST"])
+def upload_file_chunk():
+    """
+    Rinkmenos įkėlimas dalimis (žr. assets/chunkedUpload.js), kiekvieną dalį iš karto rašant į diską.
+    POST ?size=<n> pradeda naują įkėlimą ir grąžina serverio sugeneruotą `upload_id`; per didelei rinkmenai – 413.
+    GET ?upload_id=<id> grąžina jau įkeltų baitų skaičių, kad nutrūkusį įkėlimą būtų galima pratęsti.
+    POST ?upload_id=<id>&offset=<n> su dalies turiniu užklausos kūne; jei `offset` nesutampa su jau įkeltu kiekiu,
+    grąžinamas 409 ir serverio turimas kiekis (su "busy": true, jei tą rinkmeną dar rašo kita užklausa),
+    o rinkmenai viršijus PDSA_GRAPHER_MAX_UPLOAD_MB arba pradedant nurodytą dydį – 413.
+    :return: JSON {"offset": n} arba {"upload_id": id, "offset": 0}
+    """
+    too_large_msg = _("File is too large, the maximum allowed size is %d MB") % (fu.MAX_UPLOAD_BYTES // 1024 ** 2)
+    upload_id = request.args.get("upload_id")
+    if (request.method == "POST") and (upload_id is None):
+        upload_id = fu.start_upload(request.args.get("size", default=-1, type=int))
+        if upload_id is None:
+            return jsonify(error=too_large_msg), 413
+        return jsonify(upload_id=upload_id, offset=0)
+    if not fu.is_valid_upload_id(upload_id):
+        return jsonify(error="Invalid upload_id"), 400
+    if fu.get_upload_offset(upload_id) is None:
+        return jsonify(error="Unknown upload_id"), 404
+    if request.method == "GET":
+        return jsonify(offset=fu.get_upload_offset(upload_id))
+    offset = request.args.get("offset", default=-1, type=int)
+    new_offset = fu.save_upload_chunk(upload_id, offset, request.stream)
+    if new_offset == fu.UPLOAD_TOO_LARGE:
+        return jsonify(error=too_large_msg), 413
+    if new_offset == fu.UPLOAD_SIZE_EXCEEDED:
+        return jsonify(error="Upload exceeds the declared size"), 413
+    if new_offset == fu.UPLOAD_BUSY:
+        return jsonify(offset=fu.get_upload_offset(upload_id), busy=True), 409
+    if new_offset is None:
+        return jsonify(offset=fu.get_upload_offset(upload_id)), 409
+    return jsonify(offset=new_offset)
+
+
 # Viz atvaizdavimo varikliui: perpiešti sugeneravus naują Graphviz DOT sintaksę
 app.clientside_callback(
     ClientsideFunction(namespace="clientside", function_name="runRenderFunction"),
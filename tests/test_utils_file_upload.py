@@ -0,0 +1,150 @@
+"""
+utils_file_upload.select_renamed_or_add_columns(), is_large_utf8_file(), read_csv_source() ir
+save_upload_chunk() testai.
+Paleidimas iš projekto katalogo:
+python -m pytest tests
+"""
+"""
+(c) 2025 Mindaugas B.
+
+This code is distributed under the MIT License. For more details, see the LICENSE file in the project root.
+"""
+
+import io
+import os
+import sys
+import polars as pl
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from grapher_lib.utils_file_upload import (  # noqa: E402
+    UPLOAD_BLOCK_SIZE, UPLOAD_BUSY, UPLOAD_SIZE_EXCEEDED, UPLOAD_TOO_LARGE,
+    acquire_upload_lock, is_large_utf8_file, read_csv_source, save_upload_chunk, select_renamed_or_add_columns,
+    start_upload
+)
+
+
+@pytest.fixture(params=["DataFrame", "LazyFrame"])
+def frame_type(request):
+    """
+    Tie patys testai vykdomi paduodant ir pl.DataFrame, ir pl.LazyFrame.
+    :return: pl.DataFrame arba pl.LazyFrame klasė
+    """
+    return getattr(pl, request.param)
+
+
+def apply(frame_type, data, old_columns, new_columns):
+    """
+    Pritaikyti select_renamed_or_add_columns() nurodyto tipo lentelei ir patikrinti grąžinamą tipą.
+    :param frame_type: pl.DataFrame arba pl.LazyFrame klasė
+    :param data: lentelės duomenų žodynas
+    :param old_columns: seni stulpelių vardai arba None
+    :param new_columns: nauji stulpelių vardai
+    :return: rezultatas kaip pl.DataFrame
+    """
+    result = select_renamed_or_add_columns(frame_type(data), old_columns, new_columns)
+    assert type(result) is frame_type
+    return result.collect() if isinstance(result, pl.LazyFrame) else result
+
+
+def test_swap_column_names(frame_type):
+    df = apply(frame_type, {"a": [1, 2], "b": ["x", "y"]}, ["b", "a"], ["a", "b"])
+    assert df.columns == ["a", "b"]
+    assert df["a"].to_list() == ["x", "y"]
+    assert df["b"].to_list() == [1, 2]
+
+
+def test_one_column_under_several_names(frame_type):
+    df = apply(frame_type, {"a": [1, 2], "b": [3, 4]}, ["a", "a", "a"], ["b", "a", "c"])
+    assert df.columns == ["b", "a", "c"]
+    assert df["b"].to_list() == [1, 2]
+    assert df["a"].to_list() == [1, 2]
+    assert df["c"].to_list() == [1, 2]
+
+
+def test_none_and_missing_columns_are_empty(frame_type):
+    df = apply(frame_type, {"a": [1, 2, 3]}, ["a", None, "missing"], ["x", "y", "z"])
+    assert df.columns == ["x", "y", "z"]
+    assert df.height == 3
+    assert df["x"].to_list() == [1, 2, 3]
+    assert df["y"].to_list() == [None, None, None]
+    assert df["z"].to_list() == [None, None, None]
+
+
+def test_without_old_columns(frame_type):
+    df = apply(frame_type, {"a": [1, 2], "b": [3, 4]}, None, ["b", "c"])
+    assert df.columns == ["b", "c"]
+    assert df["b"].to_list() == [3, 4]
+    assert df["c"].to_list() == [None, None]
+
+
+# Didelė CSV rinkmena su ASCII pradžia ir pabaiga; viduryje – lietuviškos raidės
+CSV_HEAD = b"name,comment\n" + b"ascii,row\n" * (UPLOAD_BLOCK_SIZE // 10 + 1)
+CSV_MIDDLE = "Ąžuolas,Žalias šaltinis ąžuolyne\n"
+
+
+def write_csv(tmp_path, middle_encoding, prefix=b""):
+    """
+    Įrašyti bandomąją CSV rinkmeną, kurios vidurys užkoduotas nurodyta koduote.
+    :param tmp_path: pytest laikinas katalogas
+    :param middle_encoding: vidurinės eilutės koduotė
+    :param prefix: baitai rinkmenos pradžioje (pvz., BOM)
+    :return: kelias iki rinkmenos
+    """
+    file_path = tmp_path / f"{middle_encoding}.csv"
+    file_path.write_bytes(prefix + CSV_HEAD + CSV_MIDDLE.encode(middle_encoding) + CSV_HEAD[13:])
+    return str(file_path)
+
+
+@pytest.mark.parametrize("middle_encoding, prefix, expected", [
+    ("utf_8", b"", True),
+    ("utf_8", b"\xEF\xBB\xBF", True),
+    ("cp1250", b"", False),
+    ("cp1257", b"", False),
+    ("utf_8", b"\xFF\xFE", False),
+])
+def test_is_large_utf8_file(tmp_path, middle_encoding, prefix, expected):
+    assert is_large_utf8_file(write_csv(tmp_path, middle_encoding, prefix), min_size=1) is expected
+
+
+def test_is_large_utf8_file_character_across_blocks(tmp_path):
+    file_path = tmp_path / "split.csv"
+    file_path.write_bytes(b"a" * (UPLOAD_BLOCK_SIZE - 1) + "ą".encode("utf_8") + b"\n")
+    assert is_large_utf8_file(str(file_path), min_size=1)
+
+
+def test_is_large_utf8_file_small_file(tmp_path):
+    assert not is_large_utf8_file(write_csv(tmp_path, "utf_8"), min_size=2 ** 40)
+
+
+@pytest.mark.parametrize("middle_encoding", ["utf_8", "cp1250"])
+def test_read_csv_source_keeps_text(tmp_path, middle_encoding):
+    df = read_csv_source(write_csv(tmp_path, middle_encoding), ",")
+    assert df.filter(df["name"] != "ascii").rows() == [("Ąžuolas", "Žalias šaltinis ąžuolyne")]
+
+
+def test_save_upload_chunk_in_order(tmp_path):
+    upload_id = start_upload(8, str(tmp_path))
+    assert save_upload_chunk(upload_id, 0, io.BytesIO(b"abcd"), str(tmp_path)) == 4
+    assert save_upload_chunk(upload_id, 0, io.BytesIO(b"abcd"), str(tmp_path)) is None  # ne iš eilės
+    assert save_upload_chunk(upload_id, 4, io.BytesIO(b"efgh"), str(tmp_path)) == 8
+    assert (tmp_path / upload_id).read_bytes() == b"abcdefgh"
+
+
+def test_save_upload_chunk_busy(tmp_path):
+    upload_id = start_upload(8, str(tmp_path))
+    lock_path = acquire_upload_lock(upload_id, str(tmp_path))  # tarsi dar vykdoma ankstesnė užklausa
+    assert save_upload_chunk(upload_id, 0, io.BytesIO(b"abcd"), str(tmp_path)) == UPLOAD_BUSY
+    assert (tmp_path / upload_id).read_bytes() == b""
+    os.remove(lock_path)
+    assert save_upload_chunk(upload_id, 0, io.BytesIO(b"abcd"), str(tmp_path)) == 4
+
+
+@pytest.mark.parametrize("declared_size, max_size, expected", [
+    (4, 100, UPLOAD_SIZE_EXCEEDED),
+    (100, 4, UPLOAD_TOO_LARGE),
+])
+def test_save_upload_chunk_too_large(tmp_path, declared_size, max_size, expected):
+    upload_id = start_upload(declared_size, str(tmp_path))
+    assert save_upload_chunk(upload_id, 0, io.BytesIO(b"12345"), str(tmp_path), max_size) == expected
+    assert not (tmp_path / upload_id).exists()
@@ -0,0 +1,237 @@
+"""
+utils_graph ryšių grafo indekso testai: indeksu grįstos paieškos rezultatai lyginami su anksčiau naudotais polars
+filtrais per visą ryšių lentelę, kad pakeitus indeksą nepasikeistų braižomos lentelės.
+Paleidimas iš projekto katalogo:
+python -m pytest tests
+"""
+"""
+(c) 2025 Mindaugas B.
+
+This code is distributed under the MIT License. For more details, see the LICENSE file in the project root.
+"""
+
+import os
+import sys
+import random
+import polars as pl
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from grapher_lib import utils as gu  # noqa: E402
+from grapher_lib import utils_graph as ug  # noqa: E402
+
+
+@pytest.fixture(params=[0, 1, 2, 3])
+def graph(request):
+    """
+    Atsitiktinis ryšių grafas su nuorodomis į save, pasikartojančiais ryšiais ir ryšiais be lentelės.
+    :return: (ryšių pl.DataFrame, ryšių grafo indeksas, atsitiktinių skaičių generatorius)
+    """
+    rng = random.Random(request.param)
+    tables = [f"T{i}" for i in range(40)]
+    n_edges = 80
+    df_edges = pl.DataFrame({
+        "source_tbl": [rng.choice(tables + [None]) for _i in range(n_edges)],
+        "source_col": [f"c{i}" for i in range(n_edges)],
+        "target_tbl": [rng.choice(tables + [None]) for _i in range(n_edges)],
+        "target_col": ["id"] * n_edges,
+    }, schema=gu.EDGES_SCHEMA)
+    return df_edges, ug.build_graph_index(df_edges), rng
+
+
+def sample_tables(rng, k=6):
+    """
+    Atsitiktinės pasirinktos lentelės; tarp jų gali būti ir ryšių neturinčių ar nesamų.
+    :param rng: atsitiktinių skaičių generatorius
+    :param k: kiek lentelių parinkti
+    :return: lentelių vardų sąrašas
+    """
+    return rng.sample([f"T{i}" for i in range(45)], k)
+
+
+def filter_incident(df_edges, tables, direction="all"):
+    """
+    Ankstesnė ryšių atranka kaimynų paieškai: ryšiai, kurie prasideda ir/ar baigiasi nurodytose lentelėse.
+    Ryšiai be lentelės viename gale sąmoningai neindeksuojami (anksčiau jie kaimynuose pridėdavo None).
+    :param df_edges: ryšių lentelė
+    :param tables: lentelių vardų sąrašas
+    :param direction: "out", "in" arba "all", kaip `ug.get_incident_edge_rows`
+    :return: atrinkti ryšiai pradine tvarka
+    """
+    source_in = pl.col("source_tbl").is_in(tables)
+    target_in = pl.col("target_tbl").is_in(tables)
+    return df_edges.filter(
+        {"out": source_in, "in": target_in, "all": source_in | target_in}[direction],
+        pl.col("source_tbl").is_not_null(), pl.col("target_tbl").is_not_null()
+    )
+
+
+def filter_induced(df_edges, tables):
+    """
+    Ankstesnė ryšių atranka braižymui: ryšiai, kurių abu galai yra tarp nurodytų lentelių.
+    :param df_edges: ryšių lentelė
+    :param tables: lentelių vardų sąrašas
+    :return: atrinkti ryšiai pradine tvarka
+    """
+    return df_edges.filter(pl.col("source_tbl").is_in(tables) & pl.col("target_tbl").is_in(tables))
+
+
+def neighbours_by_filter(df_edges, tables, direction="all", excluded_tables=()):
+    """
+    Ankstesnė kaimynų paieška (vienas žingsnis): visos atrinktų ryšių lentelės, išskyrus šalintinas.
+    :param df_edges: ryšių lentelė
+    :param tables: lentelių, kurių kaimynų ieškoma, vardų sąrašas
+    :param direction: "out", "in" arba "all"
+    :param excluded_tables: lentelės, kurios nelaikomos kaimynais
+    :return: pradinių ir kaimyninių lentelių aibė
+    """
+    df = filter_incident(df_edges, tables, direction)
+    return (set(df["source_tbl"].to_list() + df["target_tbl"].to_list()) - set(excluded_tables)) | set(tables)
+
+
+def test_build_graph_index_ranges(graph):
+    df_edges, index, _rng = graph
+    for node in index["graph_nodes"].iter_rows(named=True):
+        for direction, node_col in [("out", "source_tbl"), ("in", "target_tbl")]:
+            rows = index[f"graph_{direction}"]["edge_row"][node[f"{direction}_start"]:node[f"{direction}_end"]]
+            expected = (
+                df_edges.with_row_index("edge_row").drop_nulls(["source_tbl", "target_tbl"])
+                .filter(pl.col(node_col) == node["table"])["edge_row"]
+            )
+            assert rows.to_list() == expected.to_list()
+
+
+@pytest.mark.parametrize("direction", ["out", "in", "all"])
+def test_incident_edge_rows_match_filter(graph, direction):
+    df_edges, index, rng = graph
+    tables = sample_tables(rng)
+    result = df_edges[ug.get_incident_edge_rows(index, tables, direction)]
+    assert result.equals(filter_incident(df_edges, tables, direction))
+
+
+def test_induced_edge_rows_match_filter(graph):
+    df_edges, index, rng = graph
+    tables = sample_tables(rng, 15)
+    assert df_edges[ug.get_induced_edge_rows(index, tables)].equals(filter_induced(df_edges, tables))
+
+
+@pytest.mark.parametrize("direction", ["out", "in", "all"])
+def test_expand_neighbourhood_one_step_matches_filter(graph, direction):
+    df_edges, index, rng = graph
+    tables = sample_tables(rng)
+    excluded = sample_tables(rng, 3)
+    reached, _depth, truncated = ug.expand_neighbourhood(index, tables, direction, excluded_tables=excluded)
+    # Pradinės lentelės be ryšių indekse nėra, bet braižant jos lieka (žr. get_filtered_data_for_network)
+    assert set(reached) | set(tables) == neighbours_by_filter(df_edges, tables, direction, excluded)
+    assert not truncated
+
+
+@pytest.mark.parametrize("depth", [2, 3])
+def test_expand_neighbourhood_several_steps(graph, depth):
+    df_edges, index, rng = graph
+    tables = sample_tables(rng, 2)
+    excluded = sample_tables(rng, 3)
+    expected = set(tables)
+    for _i in range(depth):
+        expected = neighbours_by_filter(df_edges, list(expected), "all", excluded)
+    reached, _depth, _truncated = ug.expand_neighbourhood(index, tables, "all", depth, excluded_tables=excluded)
+    assert set(reached) | set(tables) == expected
+
+
+def test_expand_neighbourhood_max_tables(graph):
+    _df_edges, index, rng = graph
+    tables = sample_tables(rng, 2)
+    one_step, _depth, _truncated = ug.expand_neighbourhood(index, tables, "all", 1)
+    two_steps, _depth, _truncated = ug.expand_neighbourhood(index, tables, "all", 2)
+    reached, reached_depth, truncated = ug.expand_neighbourhood(index, tables, "all", 5, max_tables=len(one_step))
+    assert set(reached) == set(one_step)  # pirmasis žingsnis atliekamas visada, tolesni – tik neviršijant ribos
+    assert reached_depth <= 1
+    assert truncated == (len(two_steps) > len(one_step))
+
+
+def test_remove_orphaned_tables_matches_filter(graph):
+    df_edges, index, rng = graph
+    tables = sample_tables(rng, 15)
+    assert ug.remove_orphaned_tables(index, tables) == gu.remove_orphaned_nodes_from_sublist(tables, df_edges)
+
+
+def get_components(df_edges, tables=None):
+    """
+    Nekryptinio grafo jungiosios komponentės per sąjungų-radimo (union-find) struktūrą.
+    :param df_edges: ryšių lentelė
+    :param tables: jei nurodyta – tik šių lentelių tarpusavio ryšiai
+    :return: žodynas {lentelė: komponentės atstovas}
+    """
+    parent = {}
+
+    def find(table):
+        parent.setdefault(table, table)
+        while parent[table] != table:
+            table = parent[table]
+        return table
+
+    df = df_edges.drop_nulls(["source_tbl", "target_tbl"])
+    if tables is not None:
+        df = filter_induced(df, tables)
+    for source, target in df.select("source_tbl", "target_tbl").iter_rows():
+        parent[find(source)] = find(target)
+    return {table: find(table) for table in list(parent)}
+
+
+def test_get_connecting_tables_connects(graph):
+    df_edges, index, rng = graph
+    tables = [table for table in sample_tables(rng, 4) if table in index["graph_nodes"]["table"]]
+    excluded = sample_tables(rng, 3)
+    connecting = ug.get_connecting_tables(index, tables, excluded)
+    assert not (set(connecting) & set(tables))
+    assert not (set(connecting) & (set(excluded) - set(tables)))
+    # Jei lentelės jungiamos neaplenkiant šalintinų, tai jas sujungia ir parinktos tarpinės lentelės
+    allowed = [table for table in index["graph_nodes"]["table"] if table in tables or table not in excluded]
+    all_components = get_components(df_edges, allowed)
+    drawn_components = get_components(df_edges, tables + connecting)
+    for table_a in tables:
+        for table_b in tables:
+            if all_components.get(table_a, table_a) == all_components.get(table_b, table_b):
+                assert drawn_components.get(table_a, table_a) == drawn_components.get(table_b, table_b)
+
+
+def test_get_connecting_tables_path():
+    df_edges = pl.DataFrame({
+        "source_tbl": ["A", "B", "C", "A", "X"], "target_tbl": ["B", "C", "D", "X", "Y"],
+    })
+    index = ug.build_graph_index(df_edges)
+    assert ug.get_connecting_tables(index, ["A", "D"]) == ["B", "C"]
+    assert ug.get_connecting_tables(index, ["A", "D"], excluded_tables=["C"]) == []
+    assert ug.get_connecting_tables(index, ["D", "Y"]) == ["A", "B", "C", "X"]
+
+
+def test_get_top_connected_tables(graph):
+    df_edges, index, rng = graph
+    excluded = sample_tables(rng, 3)
+    selected = ug.get_top_connected_tables(index, excluded_tables=excluded, n=8)
+    df_nodes = index["graph_nodes"].filter(pl.col("degree") > 0, ~pl.col("table").is_in(excluded))
+    assert 2 <= len(selected) <= 8
+    assert selected[0] == df_nodes.sort("rank")["table"][0]  # pradedama nuo svarbiausios
+    assert not (set(selected) & set(excluded))
+    if len(set(get_components(df_edges, selected).values())) > 1:
+        # Nesusijungia tik tada, kai svarbiausia lentelė neturi tinkamų kaimynų
+        assert selected == df_nodes.sort("rank")["table"][:2].to_list()
+
+
+def test_get_partitions_match_components(graph):
+    df_edges, index, _rng = graph
+    components = get_components(df_edges.filter(pl.col("source_tbl") != pl.col("target_tbl")))
+    df_nodes = index["graph_nodes"]
+    node_component = dict(zip(df_nodes["table"].to_list(), df_nodes["component"].to_list()))
+    for table_a in node_component:
+        for table_b in node_component:
+            same = components.get(table_a, table_a) == components.get(table_b, table_b)
+            assert same == (node_component[table_a] == node_component[table_b])
+    partitions = ug.get_partitions(index)
+    df_components = partitions.filter(pl.col("partition") == "component")
+    sizes = df_nodes.group_by("component").len().filter(pl.col("len") > 1).sort("component")
+    assert df_components["number"].to_list() == sizes["component"].to_list()
+    assert df_components["size"].to_list() == sizes["len"].to_list()
+    assert df_components["size"].to_list() == sorted(df_components["size"].to_list(), reverse=True)
+    for row in partitions.iter_rows(named=True):
+        assert len(ug.get_partition_tables(index, row["partition"], row["number"])) == row["size"]